@@ -0,0 +1,211 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Sequence
+from postgrest.exceptions import APIError
+from .colunar import VendasColunares, numpy_disponivel
+from .dinheiro import para_centavos
+from .metricas import etapa
+
+# Agregação no banco via RPC sobre a consolidação diária vendas_diarias
+# (migrations/0001_funcoes_analytics.sql e 0002_vendas_diarias.sql).
+# Desative com ANALYTICS_AGREGACAO_SQL=false para usar o caminho em Python.
+AGREGACAO_SQL = os.getenv("ANALYTICS_AGREGACAO_SQL", "true").lower() != "false"
+
+# Linhas por requisição nas leituras de analytics; não pode passar do
+# db-max-rows do PostgREST (padrão do Supabase: 1000), que trunca sem erro
+ANALYTICS_PAGINA = int(os.getenv("ANALYTICS_PAGINA", "1000"))
+
+# Várias dimensões em uma única chamada (migrations/0003_analytics_dimensoes.sql)
+_AGREGACAO_MULTIPLA = True
+
+# Códigos PostgREST/Postgres de função inexistente
+_FUNCAO_INEXISTENTE = {"PGRST202", "42883"}
+
+DIMENSOES = ("item", "data", "mes", "dia_semana", "categoria")
+
+
+def _novo_grupo() -> dict:
+    return {"quantidade": 0, "vendas": 0, "centavos": 0}
+
+
+def _chave(v: dict, dimensao: str) -> str:
+    if dimensao == "item":
+        return v["item"]
+    if dimensao == "data":
+        return v["data"]
+    if dimensao == "mes":
+        return v["data"][:7]  # YYYY-MM
+    if dimensao == "dia_semana":
+        return str(date.fromisoformat(v["data"]).weekday())
+    return v.get("categoria") or "Sem Categoria"
+
+
+def agrupar_linhas(linhas, dimensoes: Sequence[str]) -> Dict[str, Dict[str, dict]]:
+    """
+    Agrupa vendas em Python (caminho de fallback sem NumPy), em uma única
+    passada para todas as dimensões pedidas.
+    Retorna {dimensao: {chave: {"quantidade", "vendas", "centavos"}}}, onde
+    quantidade soma as unidades, vendas conta as linhas e centavos soma
+    preco * quantidade em centavos (inteiro, sem erro de arredondamento).
+    """
+    grupos = {dimensao: defaultdict(_novo_grupo) for dimensao in dimensoes}
+
+    for v in linhas:
+        qtd = v.get("quantidade") or 1
+        valor = para_centavos(v["preco"]) * qtd
+
+        for dimensao, por_chave in grupos.items():
+            grupo = por_chave[_chave(v, dimensao)]
+            grupo["quantidade"] += qtd
+            grupo["vendas"] += 1
+            grupo["centavos"] += valor
+
+    return {dimensao: dict(por_chave) for dimensao, por_chave in grupos.items()}
+
+
+async def _linhas_rpc(supabase, funcao: str, parametros: dict, ordem: str) -> List[dict]:
+    """
+    Todas as linhas de uma função RPC, em páginas de ANALYTICS_PAGINA
+    ordenadas por `ordem`, até uma página incompleta.
+    """
+    linhas = []
+    while True:
+        builder = await supabase.rpc(funcao, parametros)
+        builder.params = builder.params\
+            .add("order", ordem)\
+            .add("offset", len(linhas))\
+            .add("limit", ANALYTICS_PAGINA)
+        response = await builder.execute()
+        linhas.extend(response.data)
+        if len(response.data) < ANALYTICS_PAGINA:
+            return linhas
+
+
+async def _agrupar_rpc(supabase, dimensao: str, inicio: date, fim: date) -> Dict[str, dict]:
+    linhas = await _linhas_rpc(supabase, "analytics_agrupar", {
+        "p_inicio": inicio.isoformat(),
+        "p_fim": fim.isoformat(),
+        "p_dimensao": dimensao,
+    }, "chave")
+
+    return {
+        linha["chave"]: {
+            "quantidade": int(linha["quantidade"]),
+            "vendas": int(linha["vendas"]),
+            "centavos": para_centavos(linha["faturamento"]),
+        }
+        for linha in linhas
+    }
+
+
+async def _agrupar_rpc_multiplo(supabase, dimensoes: Sequence[str], inicio: date, fim: date) -> Dict[str, Dict[str, dict]]:
+    linhas = await _linhas_rpc(supabase, "analytics_agrupar_dimensoes", {
+        "p_inicio": inicio.isoformat(),
+        "p_fim": fim.isoformat(),
+        "p_dimensoes": list(dimensoes),
+    }, "dimensao,chave")
+
+    grupos = {dimensao: {} for dimensao in dimensoes}
+    for linha in linhas:
+        grupos[linha["dimensao"]][linha["chave"]] = {
+            "quantidade": int(linha["quantidade"]),
+            "vendas": int(linha["vendas"]),
+            "centavos": para_centavos(linha["faturamento"]),
+        }
+    return grupos
+
+
+async def _agrupar_sql(supabase, dimensoes: Sequence[str], inicio: date, fim: date) -> Dict[str, Dict[str, dict]]:
+    global _AGREGACAO_MULTIPLA
+
+    if len(dimensoes) > 1 and _AGREGACAO_MULTIPLA:
+        try:
+            return await _agrupar_rpc_multiplo(supabase, dimensoes, inicio, fim)
+        except APIError as e:
+            if e.code not in _FUNCAO_INEXISTENTE:
+                raise
+            print("⚠️ Função analytics_agrupar_dimensoes não encontrada, usando uma chamada por dimensão")
+            _AGREGACAO_MULTIPLA = False
+
+    resultados = await asyncio.gather(
+        *(_agrupar_rpc(supabase, dimensao, inicio, fim) for dimensao in dimensoes)
+    )
+    return dict(zip(dimensoes, resultados))
+
+
+async def _agrupar_python(supabase, dimensoes: Sequence[str], inicio: date, fim: date) -> Dict[str, Dict[str, dict]]:
+    origem, selecao = "vendas", "id, data, item, preco, quantidade, created_at"
+    if "categoria" in dimensoes:
+        origem, selecao = "vendas_completas", f"{selecao}, categoria"
+
+    linhas, ultima = [], None
+    while True:
+        query = supabase.table(origem)\
+            .select(selecao)\
+            .gte("data", inicio.isoformat())\
+            .lte("data", fim.isoformat())
+        if ultima is not None:
+            data, criado, venda_id = ultima["data"], ultima["created_at"], ultima["id"]
+            # Keyset na ordem do índice (data, created_at, id), como a listagem de vendas
+            query.params = query.params.add(
+                "or",
+                f'(data.gt."{data}",'
+                f'and(data.eq."{data}",created_at.gt."{criado}"),'
+                f'and(data.eq."{data}",created_at.eq."{criado}",id.gt."{venda_id}"))'
+            )
+        response = await query\
+            .order("data")\
+            .order("created_at")\
+            .order("id")\
+            .limit(ANALYTICS_PAGINA)\
+            .execute()
+        linhas.extend(response.data)
+        if len(response.data) < ANALYTICS_PAGINA:
+            break
+        ultima = response.data[-1]
+
+    # Server-Timing: tempo de agregação em Python separado do banco
+    with etapa("agregacao"):
+        if numpy_disponivel():
+            colunas = VendasColunares.de_linhas(linhas, com_categoria="categoria" in dimensoes)
+            return colunas.agrupar(dimensoes)
+        return agrupar_linhas(linhas, dimensoes)
+
+
+async def agrupar_dimensoes(
+    supabase,
+    dimensoes: Sequence[str],
+    inicio: date,
+    fim: date
+) -> Dict[str, Dict[str, dict]]:
+    """
+    Agrupa as vendas do período [inicio, fim] por cada dimensão informada.
+    Usa as funções SQL de agregação quando disponíveis, que leem da tabela
+    vendas_diarias e trafegam só as linhas agregadas (todas as dimensões em
+    uma única chamada); se não existirem no banco, busca as linhas brutas
+    uma única vez e agrupa em Python.
+    """
+    global AGREGACAO_SQL
+
+    for dimensao in dimensoes:
+        if dimensao not in DIMENSOES:
+            raise ValueError(f"Dimensão inválida: {dimensao}")
+
+    if AGREGACAO_SQL:
+        try:
+            return await _agrupar_sql(supabase, dimensoes, inicio, fim)
+        except APIError as e:
+            if e.code not in _FUNCAO_INEXISTENTE:
+                raise
+            print("⚠️ Função analytics_agrupar não encontrada, usando agregação em Python")
+            AGREGACAO_SQL = False
+
+    return await _agrupar_python(supabase, dimensoes, inicio, fim)
+
+
+async def agrupar_periodo(supabase, dimensao: str, inicio: date, fim: date) -> Dict[str, dict]:
+    """Atalho de agrupar_dimensoes para uma única dimensão"""
+    grupos = await agrupar_dimensoes(supabase, (dimensao,), inicio, fim)
+    return grupos[dimensao]
@@ -0,0 +1,218 @@
+import asyncio
+import functools
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, Dict, Tuple
+
+# TTL (segundos) para períodos que incluem hoje e para períodos já fechados
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_CACHE_TTL_PASSADO = float(os.getenv("ANALYTICS_CACHE_TTL_PASSADO", "86400"))
+ANALYTICS_CACHE_MAX_MB = float(os.getenv("ANALYTICS_CACHE_MAX_MB", "32"))
+
+
+class _Entrada:
+    __slots__ = ("valor", "expira_em", "inicio", "fim", "tamanho")
+
+    def __init__(self, valor, expira_em: float, inicio: date, fim: date, tamanho: int):
+        self.valor = valor
+        self.expira_em = expira_em
+        self.inicio = inicio
+        self.fim = fim
+        self.tamanho = tamanho
+
+
+class CacheRespostas:
+    """
+    Cache LRU em memória para respostas de endpoints de leitura.
+
+    Cada entrada guarda o período [inicio, fim] que cobre, para que uma
+    escrita em uma data invalide só as respostas afetadas. Períodos
+    inteiramente no passado recebem um TTL maior, já que não mudam
+    (a não ser por edições explícitas, que invalidam a entrada).
+    O cache é por processo: com vários workers, o TTL limita a defasagem.
+
+    Cada invalidação avança uma geração e registra em que geração cada data
+    foi invalidada; uma resposta calculada enquanto sua data era invalidada
+    não é guardada (poderia ter lido o banco antes da escrita).
+    """
+
+    def __init__(self, ttl: float, ttl_passado: float, max_bytes: int):
+        self.ttl = ttl
+        self.ttl_passado = ttl_passado
+        self.max_bytes = max_bytes
+        self._entradas: "OrderedDict[tuple, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._em_voo: Dict[tuple, asyncio.Task] = {}
+        self._geracao = 0
+        self._invalidada_em: Dict[date, int] = {}
+        self._limpo_em = 0
+        self._consultas_lider = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidacoes = 0
+        self.coalescidas = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def obter(self, chave: tuple):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            self.misses += 1
+            return None
+        if entrada.expira_em <= time.monotonic():
+            self._remover(chave)
+            self.misses += 1
+            return None
+        self._entradas.move_to_end(chave)
+        self.hits += 1
+        return entrada
+
+    def guardar(self, chave: tuple, valor, inicio: date, fim: date) -> None:
+        tamanho = len(json.dumps(valor, default=str))
+        if tamanho > self.max_bytes:
+            return
+
+        ttl = self.ttl_passado if fim < date.today() else self.ttl
+        if chave in self._entradas:
+            self._remover(chave)
+        self._entradas[chave] = _Entrada(valor, time.monotonic() + ttl, inicio, fim, tamanho)
+        self._bytes += tamanho
+
+        # Evicção LRU até caber no limite de memória
+        while self._bytes > self.max_bytes:
+            antiga = next(iter(self._entradas))
+            self._remover(antiga)
+            self.evictions += 1
+
+    def invalidar_data(self, data: date) -> None:
+        """Remove as respostas cujo período contém a data alterada"""
+        self._geracao += 1
+        self._invalidada_em[data] = self._geracao
+        afetadas = [c for c, e in self._entradas.items() if e.inicio <= data <= e.fim]
+        for chave in afetadas:
+            self._remover(chave)
+        self.invalidacoes += len(afetadas)
+
+    def limpar(self) -> None:
+        """Remove todas as respostas (ex.: mudança no catálogo de produtos)"""
+        self._geracao += 1
+        self._limpo_em = self._geracao
+        self._invalidada_em.clear()
+        self.invalidacoes += len(self._entradas)
+        self._entradas.clear()
+        self._bytes = 0
+
+    def estatisticas(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "entradas": len(self._entradas),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / consultas, 4) if consultas else 0.0,
+            "evictions": self.evictions,
+            "invalidacoes": self.invalidacoes,
+            "coalescidas": self.coalescidas,
+        }
+
+    def _invalidado_desde(self, geracao: int, inicio: date, fim: date) -> bool:
+        """Se o período [inicio, fim] foi invalidado depois da geração informada"""
+        if self._limpo_em > geracao:
+            return True
+        return any(
+            g > geracao and inicio <= data <= fim
+            for data, g in self._invalidada_em.items()
+        )
+
+    def _remover(self, chave: tuple) -> None:
+        entrada = self._entradas.pop(chave)
+        self._bytes -= entrada.tamanho
+
+    async def _uma_vez(self, chave: tuple, func, kwargs: dict):
+        """
+        Executa func(**kwargs) uma vez por chave: requisições idênticas que
+        chegam enquanto a primeira ainda consulta o banco recebem o mesmo
+        resultado (ou a mesma exceção). A consulta roda em uma tarefa
+        própria, então não é cancelada se o primeiro cliente desconectar.
+        """
+        tarefa = self._em_voo.get(chave)
+        if tarefa is not None:
+            self.coalescidas += 1
+            return await asyncio.shield(tarefa)
+
+        def terminar(t: asyncio.Task) -> None:
+            if self._em_voo.get(chave) is t:
+                del self._em_voo[chave]
+            if not t.cancelled():
+                t.exception()  # evita o aviso de exceção não lida se ninguém mais esperar
+
+        tarefa = asyncio.ensure_future(func(**kwargs))
+        self._em_voo[chave] = tarefa
+        tarefa.add_done_callback(terminar)
+        return await asyncio.shield(tarefa)
+
+    def cacheado(self, periodo: Callable[..., Tuple[date, date]]):
+        """
+        Decorator para endpoints async. `periodo` recebe os mesmos argumentos
+        do endpoint e retorna o período (inicio, fim) coberto pela resposta.
+        A chave é o nome do endpoint + parâmetros (sem o cliente do banco)
+        + período resolvido. Só respostas bem-sucedidas são guardadas, e
+        não se o período foi invalidado durante a consulta.
+        Requisições idênticas simultâneas compartilham uma única execução,
+        mesmo com o cache desativado.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                try:
+                    inicio, fim = periodo(**kwargs)
+                except ValueError:
+                    # Parâmetro inválido: o endpoint devolve o erro apropriado
+                    return await func(**kwargs)
+
+                parametros = tuple(sorted((k, v) for k, v in kwargs.items() if k != "supabase"))
+                chave = (func.__name__, parametros, inicio, fim)
+
+                if self.habilitado:
+                    entrada = self.obter(chave)
+                    if entrada is not None:
+                        return entrada.valor
+
+                if chave in self._em_voo:
+                    return await self._uma_vez(chave, func, kwargs)
+
+                geracao = self._geracao
+                self._consultas_lider += 1
+                try:
+                    valor = await self._uma_vez(chave, func, kwargs)
+                    if self.habilitado and not self._invalidado_desde(geracao, inicio, fim):
+                        self.guardar(chave, valor, inicio, fim)
+                    return valor
+                finally:
+                    self._consultas_lider -= 1
+                    if not self._consultas_lider:
+                        # Nenhuma consulta pendente compara com as gerações anteriores
+                        self._invalidada_em.clear()
+            return wrapper
+        return decorator
+
+
+cache_analytics = CacheRespostas(
+    ttl=ANALYTICS_CACHE_TTL,
+    ttl_passado=ANALYTICS_CACHE_TTL_PASSADO,
+    max_bytes=int(ANALYTICS_CACHE_MAX_MB * 1024 * 1024),
+)
+
+
+def invalidar_vendas(data) -> None:
+    """Chamado pelas escritas em vendas com a data da venda alterada"""
+    if isinstance(data, str):
+        data = date.fromisoformat(data)
+    cache_analytics.invalidar_data(data)
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from uuid import UUID
+
+# Intervalo (segundos) para recarregar o catálogo mesmo sem escritas locais.
+# Limita a defasagem entre workers, já que cada processo tem sua cópia.
+CATALOGO_TTL = float(os.getenv("CATALOGO_TTL", "300"))
+
+# Produtos por página na recarga (max-rows padrão do Supabase: 1000)
+CATALOGO_PAGINA = int(os.getenv("CATALOGO_PAGINA", "1000"))
+
+
+class CatalogoProdutos:
+    """
+    Cópia em memória da tabela produtos, indexada por id, nome e categoria.
+
+    O catálogo muda poucas vezes por semana, então as leituras de produtos
+    são servidas daqui sem ir ao banco. A cópia é recarregada por inteiro
+    depois de cada escrita em produtos feita por este processo e quando
+    passa de CATALOGO_TTL segundos.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._produtos: List[dict] = []
+        self._por_id: Dict[str, dict] = {}
+        self._por_nome: Dict[str, dict] = {}
+        self._por_categoria: Dict[str, List[dict]] = {}
+        self._categorias: List[str] = []
+        self._expira_em = 0.0
+        self._lock = asyncio.Lock()
+        self.recargas = 0
+
+    @property
+    def valido(self) -> bool:
+        return self._expira_em > time.monotonic()
+
+    async def recarregar(self, supabase) -> None:
+        """Busca todos os produtos (ordem de nome) e troca os índices"""
+        produtos, ultimo = [], None
+        while True:
+            # Keyset por nome (único): o max-rows do PostgREST truncaria
+            # um select sem limite sem avisar
+            query = supabase.table("produtos").select("*")
+            if ultimo is not None:
+                query = query.gt("nome", ultimo)
+            response = await query.order("nome").limit(CATALOGO_PAGINA).execute()
+            produtos.extend(response.data)
+            if len(response.data) < CATALOGO_PAGINA:
+                break
+            ultimo = response.data[-1]["nome"]
+
+        por_categoria = defaultdict(list)
+        for p in produtos:
+            if p.get("categoria"):
+                por_categoria[p["categoria"]].append(p)
+
+        # Troca tudo de uma vez (sem await no meio): leitores nunca veem
+        # índices de versões diferentes
+        self._produtos = produtos
+        self._por_id = {p["id"]: p for p in produtos}
+        self._por_nome = {p["nome"]: p for p in produtos}
+        self._por_categoria = dict(por_categoria)
+        self._categorias = sorted(por_categoria)
+        self._expira_em = time.monotonic() + self.ttl
+        self.recargas += 1
+
+    async def garantir(self, supabase) -> None:
+        """Carrega o catálogo se ainda não carregado ou expirado"""
+        if self.valido:
+            return
+        async with self._lock:
+            # Outra requisição pode ter recarregado enquanto esperávamos
+            if not self.valido:
+                await self.recarregar(supabase)
+
+    async def apos_escrita(self, supabase) -> None:
+        """
+        Chamado depois de uma escrita em produtos. Se a recarga falhar, o
+        catálogo é marcado como expirado e a próxima leitura tenta de novo.
+        """
+        try:
+            async with self._lock:
+                await self.recarregar(supabase)
+        except Exception as e:
+            print(f"⚠️ Erro ao recarregar catálogo de produtos: {e}")
+            self.invalidar()
+
+    def invalidar(self) -> None:
+        self._expira_em = 0.0
+
+    # ==================== LEITURAS ====================
+
+    def listar(self, apenas_ativos: bool = True, categoria: Optional[str] = None) -> List[dict]:
+        produtos = self._por_categoria.get(categoria, []) if categoria else self._produtos
+        if apenas_ativos:
+            produtos = [p for p in produtos if p.get("ativo")]
+        return list(produtos)
+
+    def por_id(self, produto_id: str) -> Optional[dict]:
+        try:
+            return self._por_id.get(str(UUID(produto_id)))
+        except ValueError:
+            return None
+
+    async def obter(self, supabase, produto_id: str) -> Optional[dict]:
+        """
+        Produto pelo id. Um id ausente da cópia (criado por outro worker
+        depois da última recarga) é buscado no banco antes de virar 404.
+        """
+        produto = self.por_id(produto_id)
+        if produto is not None:
+            return produto
+        try:
+            UUID(produto_id)
+        except ValueError:
+            return None
+        response = await supabase.table("produtos")\
+            .select("*")\
+            .eq("id", produto_id)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def por_nome(self, nome: str) -> Optional[dict]:
+        return self._por_nome.get(nome)
+
+    def categorias(self) -> List[str]:
+        return list(self._categorias)
+
+
+catalogo = CatalogoProdutos(ttl=CATALOGO_TTL)
@@ -0,0 +1,137 @@
+"""
+Agregação colunar das vendas com NumPy (caminho de fallback em Python).
+
+As linhas vindas do banco são convertidas uma única vez em arrays: datas
+como dias desde 1970-01-01, preços em centavos, itens e categorias como
+códigos inteiros. Os agrupamentos viram np.bincount sobre esses códigos,
+sem laço por linha. NumPy é uma dependência opcional: sem ele,
+agregacoes.py continua com o laço de agrupar_linhas.
+
+NumPy só é importado na primeira chamada de numpy_disponivel(), e não no
+startup da aplicação: o caminho em Python é só o fallback da agregação.
+"""
+from typing import Dict, List, Sequence
+
+np = None
+_importacao_tentada = False
+
+
+def numpy_disponivel() -> bool:
+    global np, _importacao_tentada
+    if not _importacao_tentada:
+        _importacao_tentada = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+    return np is not None
+
+
+def _codificar(valores) -> tuple:
+    """Internamento: cada valor distinto recebe um código inteiro"""
+    codigos: Dict[str, int] = {}
+    indices = [codigos.setdefault(valor, len(codigos)) for valor in valores]
+    return np.array(indices, dtype=np.int32), list(codigos)
+
+
+class VendasColunares:
+    """Vendas de um período em formato colunar"""
+
+    def __init__(
+        self,
+        dias,
+        centavos,
+        quantidades,
+        itens,
+        nomes_itens: List[str],
+        categorias=None,
+        nomes_categorias: List[str] = None
+    ):
+        self.dias = dias
+        self.centavos = centavos
+        self.quantidades = quantidades
+        self.itens = itens
+        self.nomes_itens = nomes_itens
+        self.categorias = categorias
+        self.nomes_categorias = nomes_categorias
+
+    @classmethod
+    def de_linhas(cls, linhas: List[dict], com_categoria: bool = False) -> "VendasColunares":
+        """Converte o resultado do PostgREST (lista de dicts) em colunas"""
+        n = len(linhas)
+        datas = np.array([v["data"] for v in linhas], dtype="datetime64[D]")
+        precos = np.fromiter((v["preco"] for v in linhas), dtype=np.float64, count=n)
+        quantidades = np.fromiter((v.get("quantidade") or 1 for v in linhas), dtype=np.int64, count=n)
+        itens, nomes_itens = _codificar(v["item"] for v in linhas)
+
+        categorias, nomes_categorias = None, None
+        if com_categoria:
+            categorias, nomes_categorias = _codificar(v.get("categoria") or "Sem Categoria" for v in linhas)
+
+        return cls(
+            dias=datas.astype(np.int64),
+            centavos=np.rint(precos * 100).astype(np.int64),
+            quantidades=quantidades,
+            itens=itens,
+            nomes_itens=nomes_itens,
+            categorias=categorias,
+            nomes_categorias=nomes_categorias,
+        )
+
+    def __len__(self) -> int:
+        return len(self.dias)
+
+    # ==================== AGRUPAMENTO ====================
+
+    def _somar(self, codigos, nomes) -> Dict[str, dict]:
+        """Soma quantidade, vendas e centavos por código com bincount"""
+        tamanho = len(nomes)
+        vendas = np.bincount(codigos, minlength=tamanho)
+        quantidade = np.bincount(codigos, weights=self.quantidades, minlength=tamanho)
+        centavos = np.bincount(codigos, weights=self.centavos * self.quantidades, minlength=tamanho)
+
+        return {
+            nomes[i]: {
+                "quantidade": int(quantidade[i]),
+                "vendas": int(vendas[i]),
+                "centavos": int(centavos[i]),
+            }
+            for i in np.flatnonzero(vendas)
+        }
+
+    def _por_data(self) -> Dict[str, dict]:
+        base = int(self.dias.min())
+        codigos = self.dias - base
+        nomes = np.arange(base, base + int(codigos.max()) + 1).astype("datetime64[D]").astype(str).tolist()
+        return self._somar(codigos, nomes)
+
+    def _por_mes(self) -> Dict[str, dict]:
+        meses = self.dias.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        base = int(meses.min())
+        codigos = meses - base
+        nomes = np.arange(base, base + int(codigos.max()) + 1).astype("datetime64[M]").astype(str).tolist()
+        return self._somar(codigos, nomes)
+
+    def _por_dia_semana(self) -> Dict[str, dict]:
+        # 1970-01-01 foi uma quinta-feira (weekday 3); 0 = segunda
+        return self._somar((self.dias + 3) % 7, [str(d) for d in range(7)])
+
+    def agrupar(self, dimensoes: Sequence[str]) -> Dict[str, Dict[str, dict]]:
+        """Mesmo formato de agregacoes.agrupar_linhas"""
+        if not len(self):
+            return {dimensao: {} for dimensao in dimensoes}
+
+        grupos = {}
+        for dimensao in dimensoes:
+            if dimensao == "item":
+                grupos[dimensao] = self._somar(self.itens, self.nomes_itens)
+            elif dimensao == "data":
+                grupos[dimensao] = self._por_data()
+            elif dimensao == "mes":
+                grupos[dimensao] = self._por_mes()
+            elif dimensao == "dia_semana":
+                grupos[dimensao] = self._por_dia_semana()
+            else:
+                grupos[dimensao] = self._somar(self.categorias, self.nomes_categorias)
+        return grupos
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import zlib
+from typing import Optional
+
+# Respostas menores que COMPRESSAO_MIN_BYTES vão sem compressão (o ganho não
+# paga o custo). Brotli é usado quando o cliente aceita e o pacote opcional
+# brotli está instalado; senão, gzip
+COMPRESSAO_ATIVA = os.getenv("COMPRESSAO_ATIVA", "true").lower() != "false"
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", "1024"))
+COMPRESSAO_GZIP_NIVEL = int(os.getenv("COMPRESSAO_GZIP_NIVEL", "6"))
+COMPRESSAO_BROTLI_QUALIDADE = int(os.getenv("COMPRESSAO_BROTLI_QUALIDADE", "4"))
+
+# Tipos que comprimem bem. text/event-stream fica de fora: cada evento tem
+# de chegar ao cliente assim que é enviado, e o buffer do compressor o seguraria
+TIPOS_COMPRESSIVEIS = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"text/csv",
+    b"text/plain",
+    b"text/html",
+)
+TIPOS_EXCLUIDOS = (b"text/event-stream",)
+
+# Corpos a partir deste tamanho são comprimidos fora do event loop
+# (zlib e brotli liberam o GIL)
+_COMPRIMIR_EM_THREAD = 256 * 1024
+
+brotli = None
+_importacao_tentada = False
+
+
+def brotli_disponivel() -> bool:
+    global brotli, _importacao_tentada
+    if not _importacao_tentada:
+        _importacao_tentada = True
+        try:
+            import brotli as modulo
+            brotli = modulo
+        except ImportError:
+            brotli = None
+    return brotli is not None
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """br ou gzip conforme o Accept-Encoding (respeitando q=0), ou None"""
+    aceitas = {}
+    for parte in accept_encoding.lower().split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        aceitas[nome.strip()] = q
+    for codificacao in ("br", "gzip"):
+        q = aceitas.get(codificacao, aceitas.get("*", 0.0))
+        if q > 0 and (codificacao != "br" or brotli_disponivel()):
+            return codificacao
+    return None
+
+
+class _Compressor:
+    """Compressor incremental com a mesma interface para gzip e brotli"""
+
+    def __init__(self, codificacao: str):
+        if codificacao == "br":
+            self._objeto = brotli.Compressor(quality=COMPRESSAO_BROTLI_QUALIDADE)
+            self._comprimir = self._objeto.process
+            self._descarregar = self._objeto.flush
+            self._terminar = self._objeto.finish
+        else:
+            self._objeto = zlib.compressobj(COMPRESSAO_GZIP_NIVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._comprimir = self._objeto.compress
+            self._descarregar = lambda: self._objeto.flush(zlib.Z_SYNC_FLUSH)
+            self._terminar = self._objeto.flush
+
+    def parte(self, dados: bytes, final: bool) -> bytes:
+        """Comprime um pedaço; sem final, descarrega para o cliente receber já"""
+        saida = self._comprimir(dados)
+        return saida + (self._terminar() if final else self._descarregar())
+
+
+async def _comprimir(compressor: _Compressor, dados: bytes, final: bool) -> bytes:
+    if len(dados) >= _COMPRIMIR_EM_THREAD:
+        return await asyncio.to_thread(compressor.parte, dados, final)
+    return compressor.parte(dados, final)
+
+
+class MiddlewareCompressao:
+    """
+    Middleware ASGI de compressão (br/gzip) das respostas de
+    TIPOS_COMPRESSIVEIS. Respostas completas abaixo de
+    COMPRESSAO_MIN_BYTES passam sem alteração; respostas em streaming
+    (ndjson, exportação CSV) são comprimidas pedaço a pedaço, sem esperar o
+    fim do corpo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSAO_ATIVA or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = escolher_codificacao(dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1"))
+        inicio = None
+        compressor = None
+
+        async def enviar(mensagem):
+            nonlocal inicio, compressor
+
+            if mensagem["type"] == "http.response.start":
+                headers = dict(mensagem.get("headers", []))
+                tipo = headers.get(b"content-type", b"")
+                compressivel = (
+                    mensagem["status"] not in (204, 304)
+                    and b"content-encoding" not in headers
+                    and tipo.startswith(TIPOS_COMPRESSIVEIS)
+                    and not tipo.startswith(TIPOS_EXCLUIDOS)
+                )
+                if not compressivel:
+                    await send(mensagem)
+                    return
+                if codificacao is None:
+                    await send({**mensagem, "headers": list(mensagem.get("headers", [])) + [(b"vary", b"Accept-Encoding")]})
+                    return
+                # Espera o primeiro pedaço do corpo para decidir
+                inicio = mensagem
+                return
+
+            if mensagem["type"] != "http.response.body" or inicio is None:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+
+            if compressor is None:
+                if not mais and len(corpo) < COMPRESSAO_MIN_BYTES:
+                    headers = list(inicio.get("headers", [])) + [(b"vary", b"Accept-Encoding")]
+                    await send({**inicio, "headers": headers})
+                    inicio = None
+                    await send(mensagem)
+                    return
+                compressor = _Compressor(codificacao)
+                headers = [
+                    (chave, valor) for chave, valor in inicio.get("headers", [])
+                    if chave != b"content-length"
+                ]
+                headers += [(b"content-encoding", codificacao.encode()), (b"vary", b"Accept-Encoding")]
+                comprimido = await _comprimir(compressor, corpo, not mais)
+                if not mais:
+                    headers.append((b"content-length", str(len(comprimido)).encode()))
+                await send({**inicio, "headers": headers})
+                await send({"type": "http.response.body", "body": comprimido, "more_body": mais})
+                return
+
+            comprimido = await _comprimir(compressor, corpo, not mais)
+            await send({"type": "http.response.body", "body": comprimido, "more_body": mais})
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,49 @@
+"""
+Reconstrução da consolidação diária de vendas (vendas_diarias).
+
+A tabela é mantida por triggers no banco; este comando serve para o backfill
+inicial ou para corrigir um período.
+
+Uso (a partir de backend/):
+    python -m app.consolidacao
+    python -m app.consolidacao --inicio 2026-01-01 --fim 2026-01-31
+"""
+import argparse
+import asyncio
+from datetime import date
+from typing import Optional
+from .database import close_supabase_client, init_supabase_client
+
+
+async def reconstruir_vendas_diarias(
+    supabase,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None
+) -> int:
+    """
+    Reconstrói vendas_diarias a partir de vendas no período informado
+    (ou inteira, sem período). Retorna o número de linhas geradas.
+    """
+    builder = await supabase.rpc("vendas_diarias_reconstruir", {
+        "p_inicio": inicio.isoformat() if inicio else None,
+        "p_fim": fim.isoformat() if fim else None,
+    })
+    response = await builder.execute()
+    return int(response.data or 0)
+
+
+async def _main(inicio: Optional[date], fim: Optional[date]) -> None:
+    try:
+        linhas = await reconstruir_vendas_diarias(init_supabase_client(), inicio, fim)
+        print(f"✅ vendas_diarias reconstruída: {linhas} linhas")
+    finally:
+        await close_supabase_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstrói a consolidação diária de vendas")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Data final (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    asyncio.run(_main(args.inicio, args.fim))
@@ -1,32 +1,163 @@
+import asyncio
 import os
-from supabase import create_client, Client
+import time
+import httpx
+from postgrest import AsyncPostgrestClient
 from typing import Optional
+from .metricas import METRICAS_ATIVAS, TransporteMedido
 
 # Variáveis de ambiente
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Pool de conexões HTTP (keep-alive) compartilhado pelo processo
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_POOL_KEEPALIVE = int(os.getenv("SUPABASE_POOL_KEEPALIVE", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "5"))
 
-def get_supabase_client() -> Client:
+# Ping de prontidão (GET /ready): tempo máximo e validade do resultado
+PRONTIDAO_TIMEOUT = float(os.getenv("PRONTIDAO_TIMEOUT", "2"))
+PRONTIDAO_CACHE_TTL = float(os.getenv("PRONTIDAO_CACHE_TTL", "5"))
+
+_client: Optional["AsyncPooledPostgrestClient"] = None
+
+
+class AsyncPooledPostgrestClient(AsyncPostgrestClient):
+    """
+    Cliente PostgREST assíncrono com pool de conexões keep-alive limitado.
+    Uma única instância é reaproveitada por todas as requisições do processo,
+    e as consultas (await ... .execute()) não bloqueiam o event loop.
+    """
+
+    def create_session(self, base_url, headers, timeout) -> httpx.AsyncClient:
+        transporte = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=SUPABASE_POOL_SIZE,
+                max_keepalive_connections=SUPABASE_POOL_KEEPALIVE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+        )
+        # Cada chamada ao banco entra nas métricas da requisição (metricas.py)
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=TransporteMedido(transporte) if METRICAS_ATIVAS else transporte,
+        )
+
+
+def create_supabase_client() -> AsyncPooledPostgrestClient:
     """
-    Retorna uma instância do cliente Supabase.
+    Cria um novo cliente para a API REST do Supabase.
+    Prefira init_supabase_client(), que reaproveita a instância do processo.
     """
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError("SUPABASE_URL e SUPABASE_KEY devem estar configurados")
-    
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
+    return AsyncPooledPostgrestClient(
+        f"{SUPABASE_URL}/rest/v1",
+        headers={
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "apiKey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+        },
+        timeout=httpx.Timeout(
+            SUPABASE_TIMEOUT,
+            connect=SUPABASE_CONNECT_TIMEOUT,
+            pool=SUPABASE_POOL_TIMEOUT,
+        ),
+    )
 
-async def test_connection() -> bool:
+
+def init_supabase_client() -> AsyncPooledPostgrestClient:
     """
-    Testa conexão com Supabase.
-    Retorna True se conectou, False caso contrário.
+    Inicializa o cliente compartilhado do processo.
+    Chamado no startup da aplicação.
+    """
+    global _client
+    if _client is None:
+        _client = create_supabase_client()
+    return _client
+
+
+async def close_supabase_client() -> None:
+    """
+    Fecha as conexões do pool do cliente compartilhado.
+    Chamado no shutdown da aplicação.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get_supabase_client() -> AsyncPooledPostgrestClient:
+    """
+    Retorna o cliente Supabase compartilhado pelo processo.
+    Usado como dependência do FastAPI (Depends) nos routers.
+    Assíncrona para não ocupar uma thread do threadpool a cada requisição.
     """
+    return init_supabase_client()
+
+
+class _Prontidao:
+    """Último ping ao banco e o lock que serializa os pings"""
+
+    def __init__(self):
+        self.resultado: Optional[dict] = None
+        self.verificado_em = 0.0
+        self.lock = asyncio.Lock()
+
+
+_prontidao = _Prontidao()
+
+
+async def _ping(timeout: float) -> dict:
+    inicio = time.perf_counter()
     try:
-        supabase = get_supabase_client()
-        # Tenta fazer uma query simples
-        supabase.table("vendas").select("id").limit(1).execute()
-        return True
+        supabase = init_supabase_client()
+        await asyncio.wait_for(
+            supabase.table("produtos").select("id").limit(1).execute(),
+            timeout=timeout
+        )
+        return {"ok": True, "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+    except asyncio.TimeoutError:
+        return {"ok": False, "erro": f"Sem resposta do banco em {timeout:g}s"}
     except Exception as e:
-        print(f"Erro ao conectar no Supabase: {str(e)}")
-        return False
\ No newline at end of file
+        return {"ok": False, "erro": str(e)}
+
+
+async def verificar_banco(usar_cache: bool = True) -> dict:
+    """
+    Ping ao banco para o probe de prontidão: uma consulta mínima limitada
+    a PRONTIDAO_TIMEOUT segundos. O resultado vale por PRONTIDAO_CACHE_TTL
+    segundos e probes simultâneos esperam o mesmo ping, então o probe não
+    multiplica a carga no banco nem fica preso a um banco travado.
+    """
+    if usar_cache and _prontidao.resultado is not None \
+            and time.monotonic() - _prontidao.verificado_em < PRONTIDAO_CACHE_TTL:
+        return _prontidao.resultado
+
+    async with _prontidao.lock:
+        # Outro probe pode ter feito o ping enquanto esperávamos
+        if usar_cache and _prontidao.resultado is not None \
+                and time.monotonic() - _prontidao.verificado_em < PRONTIDAO_CACHE_TTL:
+            return _prontidao.resultado
+        _prontidao.resultado = await _ping(PRONTIDAO_TIMEOUT)
+        _prontidao.verificado_em = time.monotonic()
+        return _prontidao.resultado
+
+
+async def test_connection() -> bool:
+    """
+    Testa conexão com Supabase (sem cache, limitado a PRONTIDAO_TIMEOUT).
+    Retorna True se conectou, False caso contrário.
+    """
+    resultado = await verificar_banco(usar_cache=False)
+    if not resultado["ok"]:
+        print(f"Erro ao conectar no Supabase: {resultado['erro']}")
+    return resultado["ok"]
@@ -0,0 +1,39 @@
+"""
+Valores monetários como inteiros em centavos.
+
+Somas e médias são feitas em centavos (int), sem erro de arredondamento
+acumulado; a conversão para reais (float) acontece uma vez, na resposta.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+# Até aqui um float com 2 casas vezes 100 fica a menos de meio centavo do
+# inteiro correto, então round() é exato (numeric(14, 2) cabe com folga)
+_LIMITE_FLOAT = 2 ** 52 / 100
+
+
+def para_centavos(valor) -> int:
+    """
+    Converte um valor em reais (Decimal, str, int ou float vindo do JSON)
+    para centavos, arredondando para o centavo mais próximo.
+    """
+    if isinstance(valor, int):
+        return valor * 100
+    if isinstance(valor, float) and abs(valor) < _LIMITE_FLOAT:
+        return round(valor * 100)
+    return int((Decimal(str(valor)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def para_reais(centavos: int) -> float:
+    """
+    Centavos para reais nas respostas e escritas em JSON. A divisão por 100
+    dá o float mais próximo do valor decimal, e o repr desse float (usado
+    na serialização) é exatamente o valor com até 2 casas.
+    """
+    return centavos / 100
+
+
+def media_centavos(total: int, quantidade: int) -> int:
+    """Média em centavos, arredondando meio centavo para cima"""
+    if quantidade <= 0:
+        return 0
+    return (2 * total + quantidade) // (2 * quantidade)
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import time
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .dinheiro import para_centavos, para_reais
+from .models import VendaResponse
+
+# Comentário enviado a cada N segundos sem eventos (mantém proxies e o
+# navegador com a conexão aberta) e intervalo para recarregar os totais do
+# banco, que cobre escritas feitas por outros workers
+VENDAS_STREAM_HEARTBEAT = float(os.getenv("VENDAS_STREAM_HEARTBEAT", "15"))
+VENDAS_STREAM_RESYNC = float(os.getenv("VENDAS_STREAM_RESYNC", "60"))
+# Eventos pendentes por assinante (um cliente lento demais é desconectado e
+# reconecta com o total atualizado) e assinantes por processo
+VENDAS_STREAM_FILA = int(os.getenv("VENDAS_STREAM_FILA", "100"))
+VENDAS_STREAM_MAX = int(os.getenv("VENDAS_STREAM_MAX", "1000"))
+
+CarregarDia = Callable[[date], Awaitable[List[dict]]]
+
+
+class LimiteAssinantes(Exception):
+    pass
+
+
+def _evento(nome: str, dados: dict) -> bytes:
+    return f"event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n".encode()
+
+
+def _payload_venda(venda: dict) -> dict:
+    try:
+        return VendaResponse.model_validate(venda).model_dump(mode="json")
+    except ValueError:
+        # Exclusão pela sincronização: só o id é conhecido
+        return {"id": str(venda["id"])}
+
+
+class _Assinante:
+    __slots__ = ("fila",)
+
+    def __init__(self):
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=VENDAS_STREAM_FILA)
+
+
+class _Dia:
+    """Vendas de um dia acompanhado (id -> centavos, unidades) e seus totais"""
+
+    def __init__(self, dia: date):
+        self.dia = dia
+        self.vendas: Dict[str, tuple] = {}
+        self.centavos = 0
+        self.quantidade = 0
+        self.assinantes: Set[_Assinante] = set()
+        self.carregado_em: Optional[float] = None
+        # Escritas que chegam durante uma carga, aplicadas quando ela termina
+        self.pendentes: Optional[list] = None
+        self.lock = asyncio.Lock()
+
+    @property
+    def expirado(self) -> bool:
+        return self.carregado_em is None or time.monotonic() - self.carregado_em > VENDAS_STREAM_RESYNC
+
+    def total(self) -> dict:
+        return {
+            "data": self.dia.isoformat(),
+            "total_faturado": para_reais(self.centavos),
+            "quantidade_itens": self.quantidade,
+        }
+
+    def remover(self, venda_id: str) -> bool:
+        anterior = self.vendas.pop(venda_id, None)
+        if anterior is None:
+            return False
+        self.centavos -= anterior[0]
+        self.quantidade -= anterior[1]
+        return True
+
+    def gravar(self, venda: dict) -> None:
+        quantidade = venda.get("quantidade") or 1
+        self.remover(str(venda["id"]))
+        self.vendas[str(venda["id"])] = (para_centavos(venda["preco"]) * quantidade, quantidade)
+        self.centavos += para_centavos(venda["preco"]) * quantidade
+        self.quantidade += quantidade
+
+    def substituir(self, vendas: List[dict]) -> None:
+        self.vendas.clear()
+        self.centavos = self.quantidade = 0
+        for venda in vendas:
+            self.gravar(venda)
+
+
+class CanalVendas:
+    """
+    Totais do dia ao vivo para GET /vendas/stream (server-sent events).
+
+    Só os dias com assinantes são acompanhados: na primeira assinatura as
+    vendas do dia são lidas uma vez do banco, e depois cada escrita feita
+    por este processo (registrar, chamado pelos endpoints de vendas) ajusta
+    o total em memória e é enviada a todos os assinantes do dia, com a
+    mensagem codificada uma única vez. Escritas em lote (registrar_lote)
+    enviam um único evento total por dia afetado, para não encher a fila
+    dos assinantes. Sem assinantes, registrar não faz nada. Com vários workers, cada um vê as próprias escritas e recarrega
+    o dia a cada VENDAS_STREAM_RESYNC segundos.
+    """
+
+    def __init__(self):
+        self._dias: Dict[date, _Dia] = {}
+        self.eventos = 0
+        self.desconectados = 0
+
+    @property
+    def assinantes(self) -> int:
+        return sum(len(d.assinantes) for d in self._dias.values())
+
+    async def assinar(self, dia: date, carregar: CarregarDia) -> _Assinante:
+        """Registra um assinante do dia; o primeiro evento é o total atual"""
+        if self.assinantes >= VENDAS_STREAM_MAX:
+            raise LimiteAssinantes()
+        acompanhado = self._dias.setdefault(dia, _Dia(dia))
+        assinante = _Assinante()
+        acompanhado.assinantes.add(assinante)
+        try:
+            if not await self._carregar(acompanhado, carregar):
+                assinante.fila.put_nowait(_evento("total", acompanhado.total()))
+        except BaseException:
+            self.cancelar(dia, assinante)
+            raise
+        return assinante
+
+    def cancelar(self, dia: date, assinante: _Assinante) -> None:
+        acompanhado = self._dias.get(dia)
+        if acompanhado is None:
+            return
+        acompanhado.assinantes.discard(assinante)
+        self._soltar(acompanhado)
+
+    def _soltar(self, acompanhado: _Dia) -> None:
+        """Deixa de acompanhar um dia sem assinantes, se não há carga em andamento"""
+        if acompanhado.assinantes or acompanhado.lock.locked():
+            return
+        if self._dias.get(acompanhado.dia) is acompanhado:
+            del self._dias[acompanhado.dia]
+
+    async def _carregar(self, acompanhado: _Dia, carregar: CarregarDia) -> bool:
+        """Relê as vendas do dia se expirou; True se recarregou (e avisou todos)"""
+        try:
+            async with acompanhado.lock:
+                if not acompanhado.expirado:
+                    return False
+                acompanhado.pendentes = []
+                try:
+                    vendas = await carregar(acompanhado.dia)
+                    acompanhado.substituir(vendas)
+                    for tipo, venda in acompanhado.pendentes:
+                        self._aplicar(acompanhado, tipo, venda)
+                finally:
+                    acompanhado.pendentes = None
+                acompanhado.carregado_em = time.monotonic()
+        finally:
+            # O último assinante pode ter saído durante a carga
+            self._soltar(acompanhado)
+        self._publicar(acompanhado, _evento("total", acompanhado.total()))
+        return True
+
+    def registrar(self, tipo: str, venda: dict) -> None:
+        """
+        Chamado pelas escritas em vendas com a venda como ficou no banco
+        (tipo criada ou atualizada) ou como era (excluida).
+        """
+        self.registrar_lote([(tipo, venda)])
+
+    def registrar_lote(self, eventos: Iterable[Tuple[str, dict]]) -> None:
+        """
+        Como registrar, para várias escritas de uma vez (lote, sincronização).
+        Um dia com uma única venda afetada recebe o evento venda; com mais,
+        um só evento total: um lote grande não conta como assinante lento.
+        """
+        if not self._dias:
+            return
+        eventos = list(eventos)
+        for acompanhado in list(self._dias.values()):
+            afetadas = []
+            for tipo, venda in eventos:
+                do_dia = tipo != "excluida" and venda.get("data") == acompanhado.dia.isoformat()
+                if not do_dia and str(venda["id"]) not in acompanhado.vendas and acompanhado.pendentes is None:
+                    continue
+                if acompanhado.pendentes is not None:
+                    acompanhado.pendentes.append((tipo, venda))
+                    continue
+                # Venda que mudou de dia sai do total do dia antigo
+                evento = tipo if do_dia else "excluida"
+                self._aplicar(acompanhado, evento, venda)
+                afetadas.append((evento, venda))
+
+            if len(afetadas) == 1:
+                evento, venda = afetadas[0]
+                self._publicar(acompanhado, _evento("venda", {
+                    "tipo": evento,
+                    "venda": _payload_venda(venda),
+                    "total": acompanhado.total(),
+                }))
+            elif afetadas:
+                self._publicar(acompanhado, _evento("total", acompanhado.total()))
+
+    @staticmethod
+    def _aplicar(acompanhado: _Dia, tipo: str, venda: dict) -> None:
+        if tipo != "excluida" and venda.get("data") == acompanhado.dia.isoformat():
+            acompanhado.gravar(venda)
+        else:
+            acompanhado.remover(str(venda["id"]))
+
+    def _publicar(self, acompanhado: _Dia, mensagem: bytes) -> None:
+        for assinante in list(acompanhado.assinantes):
+            try:
+                assinante.fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                # Cliente que não acompanha: encerra o stream; ao reconectar
+                # ele recebe o total atualizado
+                while not assinante.fila.empty():
+                    assinante.fila.get_nowait()
+                assinante.fila.put_nowait(None)
+                acompanhado.assinantes.discard(assinante)
+                self.desconectados += 1
+        self.eventos += 1
+
+    async def transmitir(self, dia: date, assinante: _Assinante, carregar: CarregarDia):
+        """Corpo text/event-stream de um assinante, até o cliente desconectar"""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(assinante.fila.get(), timeout=VENDAS_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    mensagem = b": ping\n\n"
+                if mensagem is None:
+                    return
+                yield mensagem
+
+                acompanhado = self._dias.get(dia)
+                if acompanhado is not None and acompanhado.expirado:
+                    try:
+                        await self._carregar(acompanhado, carregar)
+                    except Exception:
+                        # Banco indisponível: mantém o total em memória e tenta no próximo ciclo
+                        acompanhado.carregado_em = time.monotonic()
+        finally:
+            self.cancelar(dia, assinante)
+
+    def estatisticas(self) -> dict:
+        return {
+            "dias": len(self._dias),
+            "assinantes": self.assinantes,
+            "eventos": self.eventos,
+            "desconectados": self.desconectados,
+        }
+
+
+canal_vendas = CanalVendas()
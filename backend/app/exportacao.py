@@ -0,0 +1,130 @@
+"""
+Codificação incremental de vendas para exportação (CSV e Parquet).
+Cada página vinda do banco é convertida e entregue em seguida, então o
+uso de memória depende do tamanho da página, não do período exportado.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, List
+
+COLUNAS_EXPORTACAO = ["id", "data", "item", "preco", "quantidade", "created_at", "updated_at"]
+
+
+def parquet_disponivel() -> bool:
+    """O formato Parquet depende do pacote opcional pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def csv_vendas(paginas: AsyncIterator[List[dict]], colunas: List[str]) -> AsyncIterator[bytes]:
+    """CSV em UTF-8 com BOM (para o Excel reconhecer a acentuação)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    buffer.write("\ufeff")
+    escritor.writerow(colunas)
+
+    async for pagina in paginas:
+        escritor.writerows([v.get(c) for c in colunas] for v in pagina)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _SaidaIncremental:
+    """
+    Arquivo de saída só de escrita para o ParquetWriter: acumula os bytes
+    escritos até serem drenados, mantendo a posição absoluta no arquivo
+    (usada pelo Parquet para os offsets do rodapé).
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _esquema_parquet(colunas: List[str]):
+    import pyarrow as pa
+
+    tipos = {
+        "id": pa.string(),
+        "data": pa.date32(),
+        "item": pa.string(),
+        "categoria": pa.string(),
+        "preco": pa.decimal128(10, 2),
+        "quantidade": pa.int32(),
+        "created_at": pa.timestamp("us", tz="UTC"),
+        "updated_at": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(c, tipos[c]) for c in colunas])
+
+
+def _converter_parquet(venda: dict, coluna: str):
+    valor = venda.get(coluna)
+    if valor is None:
+        return None
+    if coluna == "data":
+        return date.fromisoformat(valor)
+    if coluna == "preco":
+        return Decimal(str(valor)).quantize(Decimal("0.01"))
+    if coluna in ("created_at", "updated_at"):
+        return datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    return valor
+
+
+async def parquet_vendas(paginas: AsyncIterator[List[dict]], colunas: List[str]) -> AsyncIterator[bytes]:
+    """Parquet com um row group por página do banco"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_parquet(colunas)
+    saida = _SaidaIncremental()
+    escritor = pq.ParquetWriter(saida, esquema, compression="snappy")
+
+    try:
+        async for pagina in paginas:
+            if not pagina:
+                continue
+            tabela = pa.table(
+                {c: [_converter_parquet(v, c) for v in pagina] for c in colunas},
+                schema=esquema
+            )
+            escritor.write_table(tabela)
+            yield saida.drenar()
+    finally:
+        escritor.close()
+
+    yield saida.drenar()
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Por quanto tempo (segundos) uma resposta fica guardada para reenvios e
+# quantas respostas no máximo (as mais antigas saem primeiro)
+IDEMPOTENCIA_TTL = float(os.getenv("IDEMPOTENCIA_TTL", "86400"))
+IDEMPOTENCIA_MAX = int(os.getenv("IDEMPOTENCIA_MAX", "10000"))
+
+# Escritas que aceitam o cabeçalho Idempotency-Key
+ROTAS_IDEMPOTENTES = {
+    ("POST", "/api/v1/vendas"),
+    ("POST", "/api/v1/produtos"),
+}
+
+_CABECALHO = b"idempotency-key"
+_TAMANHO_MAX_CHAVE = 255
+
+
+class _Resposta:
+    __slots__ = ("impressao", "status", "headers", "corpo", "rota", "expira_em")
+
+    def __init__(self, impressao: str, status: int, headers: list, corpo: bytes, rota, expira_em: float):
+        self.impressao = impressao
+        self.status = status
+        self.headers = headers
+        self.corpo = corpo
+        self.rota = rota
+        self.expira_em = expira_em
+
+
+class ArmazemIdempotencia:
+    """
+    Respostas de escritas por (método, caminho, Idempotency-Key), com TTL e
+    limite de entradas (LRU). Guarda também uma impressão (sha256) do corpo
+    da requisição: a mesma chave com outro corpo é um erro do cliente, não
+    um reenvio. Como o cache de analytics, é por processo.
+    """
+
+    def __init__(self, ttl: float, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._respostas: "OrderedDict[tuple, _Resposta]" = OrderedDict()
+        self.em_andamento: Dict[tuple, Tuple[str, asyncio.Event]] = {}
+        self.reenvios = 0
+        self.aguardados = 0
+        self.conflitos = 0
+
+    def obter(self, chave: tuple) -> Optional[_Resposta]:
+        resposta = self._respostas.get(chave)
+        if resposta is None:
+            return None
+        if resposta.expira_em <= time.monotonic():
+            del self._respostas[chave]
+            return None
+        self._respostas.move_to_end(chave)
+        return resposta
+
+    def guardar(self, chave: tuple, resposta: _Resposta) -> None:
+        self._respostas[chave] = resposta
+        self._respostas.move_to_end(chave)
+        while len(self._respostas) > self.max_entradas:
+            self._respostas.popitem(last=False)
+
+    def estatisticas(self) -> dict:
+        return {
+            "entradas": len(self._respostas),
+            "em_andamento": len(self.em_andamento),
+            "reenvios": self.reenvios,
+            "aguardados": self.aguardados,
+            "conflitos": self.conflitos,
+        }
+
+
+armazem_idempotencia = ArmazemIdempotencia(ttl=IDEMPOTENCIA_TTL, max_entradas=IDEMPOTENCIA_MAX)
+
+
+async def _responder_json(send, status: int, conteudo: dict) -> None:
+    corpo = json.dumps(conteudo, ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(corpo)).encode())],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+class MiddlewareIdempotencia:
+    """
+    Middleware ASGI para o cabeçalho Idempotency-Key nas rotas de
+    ROTAS_IDEMPOTENTES. A primeira requisição com uma chave é executada e
+    sua resposta guardada (exceto 5xx, que pode ser repetido); um reenvio
+    recebe a mesma resposta, com Idempotent-Replayed: true, sem passar
+    pelo endpoint nem pelo banco. Um reenvio que chega enquanto a original
+    ainda executa espera por ela em vez de executar de novo.
+    """
+
+    def __init__(self, app, armazem: ArmazemIdempotencia = armazem_idempotencia):
+        self.app = app
+        self.armazem = armazem
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in ROTAS_IDEMPOTENTES:
+            await self.app(scope, receive, send)
+            return
+
+        valor = dict(scope["headers"]).get(_CABECALHO)
+        if valor is None:
+            await self.app(scope, receive, send)
+            return
+        if not valor or len(valor) > _TAMANHO_MAX_CHAVE:
+            await _responder_json(send, 400, {"detail": f"Idempotency-Key deve ter de 1 a {_TAMANHO_MAX_CHAVE} caracteres"})
+            return
+
+        # O corpo inteiro é lido antes (escritas pequenas) para calcular a impressão
+        partes = []
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] != "http.request":
+                return
+            partes.append(mensagem.get("body", b""))
+            if not mensagem.get("more_body"):
+                break
+        corpo = b"".join(partes)
+        impressao = hashlib.sha256(corpo).hexdigest()
+        chave = (scope["method"], scope["path"], valor.decode("latin-1"))
+
+        while True:
+            guardada = self.armazem.obter(chave)
+            if guardada is not None:
+                await self._reenviar(scope, send, guardada, impressao)
+                return
+            andamento = self.armazem.em_andamento.get(chave)
+            if andamento is None:
+                break
+            if andamento[0] != impressao:
+                await self._conflito(send)
+                return
+            self.armazem.aguardados += 1
+            await andamento[1].wait()
+
+        evento = asyncio.Event()
+        self.armazem.em_andamento[chave] = (impressao, evento)
+        try:
+            await self._executar(scope, receive, send, chave, impressao, corpo)
+        finally:
+            del self.armazem.em_andamento[chave]
+            evento.set()
+
+    async def _executar(self, scope, receive, send, chave: tuple, impressao: str, corpo: bytes) -> None:
+        entregue = False
+
+        async def receber():
+            nonlocal entregue
+            if not entregue:
+                entregue = True
+                return {"type": "http.request", "body": corpo, "more_body": False}
+            return await receive()
+
+        inicio, partes = {}, []
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                inicio.update(mensagem)
+            elif mensagem["type"] == "http.response.body":
+                partes.append(mensagem.get("body", b""))
+            await send(mensagem)
+
+        await self.app(scope, receber, enviar)
+        if inicio and inicio["status"] < 500:
+            self.armazem.guardar(chave, _Resposta(
+                impressao, inicio["status"], list(inicio.get("headers", [])), b"".join(partes),
+                scope.get("route"), time.monotonic() + self.armazem.ttl,
+            ))
+
+    async def _reenviar(self, scope, send, guardada: _Resposta, impressao: str) -> None:
+        if guardada.impressao != impressao:
+            await self._conflito(send)
+            return
+        self.armazem.reenvios += 1
+        # Mesmo rótulo de rota da requisição original nas métricas
+        if guardada.rota is not None:
+            scope["route"] = guardada.rota
+        await send({
+            "type": "http.response.start",
+            "status": guardada.status,
+            "headers": guardada.headers + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": guardada.corpo})
+
+    async def _conflito(self, send) -> None:
+        self.armazem.conflitos += 1
+        await _responder_json(send, 422, {"detail": "Idempotency-Key já usada com outro corpo de requisição"})
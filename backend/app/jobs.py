@@ -0,0 +1,241 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Workers que executam os jobs em paralelo e tamanho máximo da fila
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_FILA_MAX = int(os.getenv("JOBS_FILA_MAX", "100"))
+# Por quantos segundos um job (e seu resultado) fica disponível para consulta
+JOBS_TTL = float(os.getenv("JOBS_TTL", "3600"))
+# Arquivo SQLite com os jobs; compartilhado pelos workers do uvicorn da mesma máquina
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(tempfile.gettempdir(), "cantina_jobs.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    status TEXT NOT NULL,
+    resultado TEXT,
+    erro TEXT,
+    criado_em REAL NOT NULL,
+    iniciado_em REAL,
+    concluido_em REAL
+)
+"""
+
+
+def _iso(instante: Optional[float]) -> Optional[str]:
+    if instante is None:
+        return None
+    return datetime.fromtimestamp(instante, tz=timezone.utc).isoformat()
+
+
+class FilaJobs:
+    """
+    Fila de jobs em processo para consultas pesadas de analytics.
+
+    Um endpoint chamado com async=true não calcula a resposta: registra o
+    job, coloca-o na fila e devolve 202 com o id. Um número fixo de workers
+    (tarefas asyncio) consome a fila e grava o resultado em SQLite, de onde
+    GET /jobs/{id} o lê. Jobs idênticos (mesmo endpoint e parâmetros)
+    pedidos enquanto um deles ainda está pendente ou executando recebem o
+    mesmo id. A deduplicação e a execução são por processo; o SQLite só
+    permite que qualquer worker do uvicorn responda a consulta.
+    """
+
+    def __init__(self, workers: int, fila_max: int, ttl: float, caminho: str):
+        self.workers = workers
+        self.fila_max = fila_max
+        self.ttl = ttl
+        self.caminho = caminho
+        self._conexao: Optional[sqlite3.Connection] = None
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas = []
+        self._em_andamento: Dict[tuple, str] = {}
+        self.deduplicados = 0
+        self.concluidos = 0
+        self.falhas = 0
+
+    # ---------- armazenamento ----------
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conexao is None:
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            conexao.row_factory = sqlite3.Row
+            if self.caminho != ":memory:":
+                conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute(_SCHEMA)
+            self._conexao = conexao
+        return self._conexao
+
+    def _atualizar(self, job_id: str, **campos) -> None:
+        colunas = ", ".join(f"{c} = ?" for c in campos)
+        self._db().execute(f"UPDATE jobs SET {colunas} WHERE id = ?", (*campos.values(), job_id))
+
+    def obter(self, job_id: str) -> Optional[dict]:
+        """Estado do job e, se concluído, o resultado ou o erro"""
+        linha = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if linha is None or linha["criado_em"] < time.time() - self.ttl:
+            return None
+        job = {
+            "id": linha["id"],
+            "tipo": linha["tipo"],
+            "parametros": json.loads(linha["parametros"]),
+            "status": linha["status"],
+            "criado_em": _iso(linha["criado_em"]),
+            "iniciado_em": _iso(linha["iniciado_em"]),
+            "concluido_em": _iso(linha["concluido_em"]),
+        }
+        if linha["resultado"] is not None:
+            job["resultado"] = json.loads(linha["resultado"])
+        if linha["erro"] is not None:
+            job["erro"] = json.loads(linha["erro"])
+        return job
+
+    # ---------- execução ----------
+
+    def _iniciar(self) -> None:
+        """Cria a fila e os workers na primeira submissão (nada no startup)"""
+        if self._tarefas:
+            return
+        self._fila = asyncio.Queue(maxsize=self.fila_max)
+        # Contexto vazio: os workers não herdam as métricas da requisição que os criou
+        self._tarefas = [
+            asyncio.create_task(self._trabalhar(), context=contextvars.Context())
+            for _ in range(self.workers)
+        ]
+
+    def submeter(self, tipo: str, chave: tuple, parametros: dict, executar: Callable) -> str:
+        """
+        Enfileira `executar()` (corrotina) e retorna o id do job. Se um job
+        com a mesma chave ainda não terminou, retorna o id dele.
+        """
+        self._iniciar()
+        existente = self._em_andamento.get(chave)
+        if existente is not None:
+            self.deduplicados += 1
+            return existente
+        if self._fila.full():
+            raise HTTPException(status_code=503, detail="Fila de jobs cheia, tente novamente mais tarde")
+
+        job_id = str(uuid.uuid4())
+        agora = time.time()
+        db = self._db()
+        db.execute("DELETE FROM jobs WHERE criado_em < ?", (agora - self.ttl,))
+        db.execute(
+            "INSERT INTO jobs (id, tipo, parametros, status, criado_em) VALUES (?, ?, ?, 'pendente', ?)",
+            (job_id, tipo, json.dumps(jsonable_encoder(parametros)), agora)
+        )
+        self._em_andamento[chave] = job_id
+        self._fila.put_nowait((job_id, chave, executar))
+        return job_id
+
+    async def _trabalhar(self) -> None:
+        while True:
+            job_id, chave, executar = await self._fila.get()
+            try:
+                await self._executar(job_id, executar)
+            finally:
+                self._em_andamento.pop(chave, None)
+                self._fila.task_done()
+
+    async def _executar(self, job_id: str, executar: Callable) -> None:
+        self._atualizar(job_id, status="executando", iniciado_em=time.time())
+        try:
+            resultado = await executar()
+        except asyncio.CancelledError:
+            self._atualizar(job_id, status="cancelado", concluido_em=time.time())
+            raise
+        except HTTPException as e:
+            erro = {"status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            erro = {"status_code": 500, "detail": str(e)}
+        else:
+            self._atualizar(
+                job_id, status="concluido", concluido_em=time.time(),
+                resultado=json.dumps(jsonable_encoder(resultado))
+            )
+            self.concluidos += 1
+            return
+        self._atualizar(job_id, status="erro", concluido_em=time.time(), erro=json.dumps(jsonable_encoder(erro)))
+        self.falhas += 1
+
+    async def aguardar(self) -> None:
+        """Espera a fila esvaziar (benchmarks e encerramento ordenado)"""
+        if self._fila is not None:
+            await self._fila.join()
+
+    async def encerrar(self) -> None:
+        """Cancela os workers; jobs ainda na fila ficam como pendentes até expirar"""
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        self._em_andamento.clear()
+        self._fila = None
+
+    def estatisticas(self) -> dict:
+        return {
+            "workers": len(self._tarefas),
+            "na_fila": self._fila.qsize() if self._fila is not None else 0,
+            "em_andamento": len(self._em_andamento),
+            "deduplicados": self.deduplicados,
+            "concluidos": self.concluidos,
+            "falhas": self.falhas,
+        }
+
+    # ---------- integração com os endpoints ----------
+
+    def assincrono(self, periodo: Callable[..., Tuple[date, date]]):
+        """
+        Decorator para endpoints async: acrescenta o parâmetro de query
+        async=true, que executa o endpoint como job e responde 202 com o
+        id. `periodo` é a mesma função usada pelo cache; é chamada antes de
+        enfileirar para que parâmetros inválidos recebam 400 na hora.
+        """
+        def decorator(func):
+            assinatura = inspect.signature(func)
+            parametro = inspect.Parameter(
+                "assincrono", inspect.Parameter.KEYWORD_ONLY, annotation=bool,
+                default=Query(False, alias="async", description="Executar em segundo plano (GET /jobs/{id})"),
+            )
+
+            @functools.wraps(func)
+            async def wrapper(assincrono: bool = False, **kwargs):
+                if not assincrono:
+                    return await func(**kwargs)
+
+                try:
+                    periodo(**kwargs)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
+                parametros = {k: v for k, v in kwargs.items() if k != "supabase"}
+                chave = (func.__name__, tuple(sorted(parametros.items())))
+                job_id = self.submeter(func.__name__, chave, parametros, functools.partial(func, **kwargs))
+                return JSONResponse(
+                    {"id": job_id, "status": "pendente", "url": f"/api/v1/jobs/{job_id}"},
+                    status_code=202,
+                    headers={"Location": f"/api/v1/jobs/{job_id}", "Retry-After": "1"},
+                )
+
+            wrapper.__signature__ = assinatura.replace(parameters=[*assinatura.parameters.values(), parametro])
+            return wrapper
+        return decorator
+
+
+fila_jobs = FilaJobs(workers=JOBS_WORKERS, fila_max=JOBS_FILA_MAX, ttl=JOBS_TTL, caminho=JOBS_DB)
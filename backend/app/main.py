@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import vendas, produtos, analytics
-from .database import test_connection
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .routers import vendas, produtos, analytics, jobs
+from .cache import cache_analytics
+from .compressao import MiddlewareCompressao
+from .database import close_supabase_client, verificar_banco
+from .eventos import canal_vendas
+from .idempotencia import MiddlewareIdempotencia, armazem_idempotencia
+from .jobs import fila_jobs
+from .metricas import METRICAS_ATIVAS, MiddlewareMetricas, texto_prometheus
 import os
 
 app = FastAPI(
@@ -10,25 +17,44 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Idempotency-Key em POST /vendas e POST /produtos (reenvios não duplicam)
+app.add_middleware(MiddlewareIdempotencia)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Proximo-Cursor", "X-Proximo-Desde", "ETag", "Server-Timing", "Idempotent-Replayed"],
 )
 
+# gzip/br das respostas JSON, NDJSON e CSV acima de COMPRESSAO_MIN_BYTES
+# (fora da idempotência: reenvios são comprimidos conforme o Accept-Encoding
+# de cada requisição)
+app.add_middleware(MiddlewareCompressao)
+
+# Latência por rota, chamadas ao banco e Server-Timing (GET /metrics)
+if METRICAS_ATIVAS:
+    app.add_middleware(MiddlewareMetricas)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Executado ao iniciar a aplicação"""
+    """
+    Executado ao iniciar a aplicação.
+    Não consulta o banco: o cliente é criado na primeira requisição e a
+    conexão é verificada pelo GET /ready, então o cold start não depende
+    da latência do Supabase.
+    """
     print("🚀 Iniciando Cantina Escolar API...")
-    
-    connection_ok = await test_connection()
-    if connection_ok:
-        print("✅ Conexão com Supabase estabelecida")
-    else:
-        print("❌ Falha ao conectar com Supabase")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Executado ao encerrar a aplicação"""
+    await fila_jobs.encerrar()
+    await close_supabase_client()
 
 
 @app.get("/")
@@ -41,18 +67,64 @@ async def root():
         "endpoints": {
             "vendas": "/api/v1/vendas",
             "produtos": "/api/v1/produtos",
-            "analytics": "/api/v1/analytics"
+            "analytics": "/api/v1/analytics",
+            "jobs": "/api/v1/jobs"
         }
     }
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """
+    Liveness: o processo está de pé e o event loop responde.
+    Não consulta o banco (use /ready para isso).
+    """
     return {"status": "ok", "environment": os.getenv("ENVIRONMENT", "production")}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: ping ao banco limitado por PRONTIDAO_TIMEOUT e cacheado por
+    PRONTIDAO_CACHE_TTL segundos. 503 se o banco não responder.
+    """
+    banco = await verificar_banco()
+    return JSONResponse(
+        {"status": "ready" if banco["ok"] else "unavailable", "banco": banco},
+        status_code=200 if banco["ok"] else 503
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas do processo no formato texto do Prometheus"""
+    cache = cache_analytics.estatisticas()
+    fila = fila_jobs.estatisticas()
+    idempotencia = armazem_idempotencia.estatisticas()
+    stream = canal_vendas.estatisticas()
+    extras = [
+        ("cantina_analytics_cache_hits_total", "counter", "Hits do cache de analytics", cache["hits"]),
+        ("cantina_analytics_cache_misses_total", "counter", "Misses do cache de analytics", cache["misses"]),
+        ("cantina_analytics_cache_evictions_total", "counter", "Entradas removidas do cache de analytics por falta de memória", cache["evictions"]),
+        ("cantina_analytics_cache_entries", "gauge", "Entradas no cache de analytics", cache["entradas"]),
+        ("cantina_analytics_cache_bytes", "gauge", "Bytes ocupados pelo cache de analytics", cache["bytes"]),
+        ("cantina_analytics_coalescidas_total", "counter", "Requisições de analytics atendidas por uma consulta já em andamento", cache["coalescidas"]),
+        ("cantina_idempotencia_reenvios_total", "counter", "Reenvios respondidos com a resposta guardada", idempotencia["reenvios"]),
+        ("cantina_idempotencia_entradas", "gauge", "Respostas guardadas por Idempotency-Key", idempotencia["entradas"]),
+        ("cantina_vendas_stream_assinantes", "gauge", "Conexões abertas em /vendas/stream", stream["assinantes"]),
+        ("cantina_vendas_stream_eventos_total", "counter", "Eventos enviados aos assinantes de /vendas/stream", stream["eventos"]),
+        ("cantina_jobs_na_fila", "gauge", "Jobs de analytics aguardando um worker", fila["na_fila"]),
+        ("cantina_jobs_em_andamento", "gauge", "Jobs de analytics pendentes ou executando", fila["em_andamento"]),
+        ("cantina_jobs_deduplicados_total", "counter", "Pedidos de job atendidos por um job idêntico", fila["deduplicados"]),
+    ]
+    return PlainTextResponse(
+        texto_prometheus(extras),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # Incluir routers
 app.include_router(vendas.router, prefix="/api/v1", tags=["Vendas"])
 app.include_router(produtos.router, prefix="/api/v1", tags=["Produtos"])
-app.include_router(analytics.router, prefix="/api/v1", tags=["Analytics"])
\ No newline at end of file
+app.include_router(analytics.router, prefix="/api/v1", tags=["Analytics"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["Jobs"])
\ No newline at end of file
@@ -0,0 +1,321 @@
+"""
+Instrumentação das requisições: latência por rota, chamadas ao banco
+(quantidade, duração, linhas) e tamanho das respostas.
+
+- MiddlewareMetricas (ASGI puro) mede cada requisição e acrescenta o
+  cabeçalho Server-Timing (db, app e total), visível no DevTools;
+- TransporteMedido envolve o transporte HTTP do cliente PostgREST e
+  atribui cada chamada ao banco à requisição em andamento (contextvar);
+- texto_prometheus() gera o formato texto do Prometheus para /metrics.
+
+Os valores são por processo: com vários workers, cada um expõe os seus.
+"""
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "true").lower() == "true"
+
+_BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+_BUCKETS_CONTAGEM = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+_BUCKETS_LINHAS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Contador:
+    """Contador monotônico com rótulos"""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, *valores: str, quantidade: float = 1) -> None:
+        self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def linhas(self) -> List[str]:
+        return [
+            f"{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}"
+            for valores, total in sorted(self._valores.items())
+        ]
+
+
+class Histograma:
+    """Histograma cumulativo com rótulos, no formato do Prometheus"""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str], buckets: Sequence[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # valores dos rótulos -> [contagens por bucket, soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observar(self, valor: float, *valores: str) -> None:
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [[0] * len(self.buckets), 0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[0][i] += 1
+                break
+        serie[1] += valor
+        serie[2] += 1
+
+    def linhas(self) -> List[str]:
+        saida = []
+        for valores, (contagens, soma, total) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                rotulos = _rotulos(self.rotulos, valores, f'le="{_numero(limite)}"')
+                saida.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            saida.append(f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}")
+            saida.append(f"{self.nome}_count{_rotulos(self.rotulos, valores)} {total}")
+        return saida
+
+
+# ==================== MÉTRICAS ====================
+
+REQUISICOES = Contador(
+    "cantina_http_requests_total", "Requisições atendidas", ("metodo", "rota", "status")
+)
+DURACAO_REQUISICAO = Histograma(
+    "cantina_http_request_duration_seconds", "Duração das requisições",
+    ("metodo", "rota"), _BUCKETS_SEGUNDOS
+)
+TAMANHO_RESPOSTA = Histograma(
+    "cantina_http_response_size_bytes", "Tamanho do corpo das respostas",
+    ("metodo", "rota"), _BUCKETS_BYTES
+)
+DB_POR_REQUISICAO = Histograma(
+    "cantina_http_request_db_calls", "Chamadas ao banco por requisição",
+    ("metodo", "rota"), _BUCKETS_CONTAGEM
+)
+DB_DURACAO_POR_REQUISICAO = Histograma(
+    "cantina_http_request_db_seconds", "Tempo em chamadas ao banco por requisição",
+    ("metodo", "rota"), _BUCKETS_SEGUNDOS
+)
+LINHAS_POR_REQUISICAO = Histograma(
+    "cantina_http_request_db_rows", "Linhas lidas do banco por requisição",
+    ("metodo", "rota"), _BUCKETS_LINHAS
+)
+DB_DURACAO = Histograma(
+    "cantina_db_call_duration_seconds", "Duração de cada chamada ao PostgREST",
+    ("metodo", "recurso", "status"), _BUCKETS_SEGUNDOS
+)
+
+_REGISTRO = (
+    REQUISICOES, DURACAO_REQUISICAO, TAMANHO_RESPOSTA, DB_POR_REQUISICAO,
+    DB_DURACAO_POR_REQUISICAO, LINHAS_POR_REQUISICAO, DB_DURACAO,
+)
+
+
+class MedicaoRequisicao:
+    """Acumula as chamadas ao banco e as etapas medidas de uma requisição"""
+
+    __slots__ = ("inicio", "db_chamadas", "db_segundos", "linhas", "etapas")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.db_chamadas = 0
+        self.db_segundos = 0.0
+        self.linhas = 0
+        self.etapas: Dict[str, float] = {}
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.inicio
+        partes = [f'db;dur={self.db_segundos * 1000:.1f};desc="{self.db_chamadas} chamadas, {self.linhas} linhas"']
+        partes.extend(f"{nome};dur={segundos * 1000:.1f}" for nome, segundos in self.etapas.items())
+        # Chamadas concorrentes (gather) podem somar mais que o tempo total
+        partes.append(f"app;dur={max(total - self.db_segundos, 0.0) * 1000:.1f}")
+        partes.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(partes)
+
+
+_medicao_atual: ContextVar[Optional[MedicaoRequisicao]] = ContextVar("medicao_atual", default=None)
+
+
+@contextmanager
+def etapa(nome: str):
+    """Mede um trecho da requisição atual (ex.: agregação em Python)"""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.etapas[nome] = medicao.etapas.get(nome, 0.0) + time.perf_counter() - inicio
+
+
+def _linhas_content_range(valor: Optional[str]) -> int:
+    """Linhas de uma resposta pelo Content-Range do PostgREST ("0-24/*")"""
+    if not valor:
+        return 0
+    faixa = valor.split("/", 1)[0]
+    if "-" not in faixa:
+        return 0
+    inicio, fim = faixa.split("-", 1)
+    try:
+        return int(fim) - int(inicio) + 1
+    except ValueError:
+        return 0
+
+
+def _recurso(url: httpx.URL) -> str:
+    """Tabela, view ou rpc/função chamada (sem filtros, para não explodir rótulos)"""
+    partes = url.path.split("/rest/v1/", 1)[-1].strip("/").split("/")
+    return "/".join(partes[:2]) if partes[0] == "rpc" else partes[0]
+
+
+class _CorpoMedido(httpx.AsyncByteStream):
+    """Corpo da resposta do banco: a chamada termina quando ele é fechado"""
+
+    def __init__(self, stream, ao_fechar):
+        self._stream = stream
+        self._ao_fechar = ao_fechar
+
+    async def __aiter__(self):
+        async for parte in self._stream:
+            yield parte
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._ao_fechar is not None:
+                self._ao_fechar()
+                self._ao_fechar = None
+
+
+class TransporteMedido(httpx.AsyncBaseTransport):
+    """
+    Transporte HTTP do cliente PostgREST que mede cada chamada ao banco
+    (do envio até o corpo ser lido) e a atribui à requisição em andamento.
+    """
+
+    def __init__(self, transporte: httpx.AsyncBaseTransport):
+        self._transporte = transporte
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        inicio = time.perf_counter()
+        medicao = _medicao_atual.get()
+        try:
+            response = await self._transporte.handle_async_request(request)
+        except Exception:
+            self._registrar(request, "erro", inicio, medicao, 0)
+            raise
+
+        linhas = _linhas_content_range(response.headers.get("Content-Range"))
+
+        def ao_fechar():
+            self._registrar(request, str(response.status_code), inicio, medicao, linhas)
+
+        response.stream = _CorpoMedido(response.stream, ao_fechar)
+        return response
+
+    @staticmethod
+    def _registrar(request, status: str, inicio: float, medicao, linhas: int) -> None:
+        duracao = time.perf_counter() - inicio
+        DB_DURACAO.observar(duracao, request.method, _recurso(request.url), status)
+        if medicao is not None:
+            medicao.db_chamadas += 1
+            medicao.db_segundos += duracao
+            medicao.linhas += linhas
+
+    async def aclose(self) -> None:
+        await self._transporte.aclose()
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mede cada requisição HTTP. A rota é o caminho
+    declarado (/api/v1/vendas/{venda_id}), não a URL, para limitar os rótulos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = MedicaoRequisicao()
+        token = _medicao_atual.set(medicao)
+        status = [500]
+        tamanho = [0]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+                mensagem.setdefault("headers", [])
+                mensagem["headers"] = list(mensagem["headers"]) + [
+                    (b"server-timing", medicao.server_timing().encode("latin-1"))
+                ]
+            elif mensagem["type"] == "http.response.body":
+                tamanho[0] += len(mensagem.get("body", b""))
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicao_atual.reset(token)
+            rota = scope.get("route")
+            rota = getattr(rota, "path", None) or "nao_encontrada"
+            metodo = scope["method"]
+            duracao = time.perf_counter() - medicao.inicio
+
+            REQUISICOES.incrementar(metodo, rota, str(status[0]))
+            DURACAO_REQUISICAO.observar(duracao, metodo, rota)
+            TAMANHO_RESPOSTA.observar(tamanho[0], metodo, rota)
+            DB_POR_REQUISICAO.observar(medicao.db_chamadas, metodo, rota)
+            DB_DURACAO_POR_REQUISICAO.observar(medicao.db_segundos, metodo, rota)
+            LINHAS_POR_REQUISICAO.observar(medicao.linhas, metodo, rota)
+
+
+def texto_prometheus(extras: Sequence[Tuple[str, str, str, float]] = ()) -> str:
+    """
+    Todas as métricas no formato texto do Prometheus (version 0.0.4).
+    `extras` são valores pontuais (nome, tipo, ajuda, valor), como os
+    contadores do cache de analytics.
+    """
+    saida = []
+    for metrica in _REGISTRO:
+        saida.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+        saida.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        saida.extend(metrica.linhas())
+    for nome, tipo, ajuda, valor in extras:
+        saida.append(f"# HELP {nome} {ajuda}")
+        saida.append(f"# TYPE {nome} {tipo}")
+        saida.append(f"{nome} {_numero(valor)}")
+    return "\n".join(saida) + "\n"
@@ -0,0 +1,130 @@
+"""
+Aplicação das migrations SQL versionadas (backend/migrations/NNNN_nome.sql).
+
+As migrations rodam em ordem de versão, cada uma em sua transação, e as
+aplicadas ficam registradas em schema_migrations. Todas são idempotentes,
+então um banco configurado antes à mão pode simplesmente rodar todas.
+
+Usa uma conexão Postgres direta (DATABASE_URL, a connection string do
+projeto Supabase) e o pacote opcional psycopg.
+
+Uso (a partir de backend/):
+    python -m app.migracoes
+    python -m app.migracoes --status
+"""
+import argparse
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import List, NamedTuple
+
+PASTA_MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+_ARQUIVO = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+class Migration(NamedTuple):
+    versao: str
+    nome: str
+    caminho: Path
+
+    @property
+    def sql(self) -> str:
+        return self.caminho.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.caminho.read_bytes()).hexdigest()
+
+
+def listar_migrations(pasta: Path = PASTA_MIGRATIONS) -> List[Migration]:
+    """Migrations da pasta, em ordem de versão"""
+    migrations = []
+    for caminho in sorted(pasta.glob("*.sql")):
+        encontrado = _ARQUIVO.match(caminho.name)
+        if not encontrado:
+            raise ValueError(f"Nome de migration inválido: {caminho.name} (use NNNN_nome.sql)")
+        migrations.append(Migration(encontrado.group(1), encontrado.group(2), caminho))
+
+    versoes = [m.versao for m in migrations]
+    if len(set(versoes)) != len(versoes):
+        raise ValueError("Versões de migration duplicadas")
+    return migrations
+
+
+def conectar(url: str = None):
+    try:
+        import psycopg
+    except ImportError:
+        raise RuntimeError("As migrations requerem o pacote psycopg (pip install 'psycopg[binary]')")
+
+    url = url or os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE_URL deve estar configurada nas variáveis de ambiente")
+    # Autocommit: cada migration controla a própria transação
+    return psycopg.connect(url, autocommit=True)
+
+
+def _garantir_controle(conexao) -> None:
+    with conexao.transaction():
+        conexao.execute("""
+            create table if not exists schema_migrations (
+                versao text primary key,
+                nome text not null,
+                checksum text not null,
+                aplicada_em timestamptz not null default now()
+            )
+        """)
+
+
+def aplicadas(conexao) -> dict:
+    """{versao: checksum} das migrations já aplicadas"""
+    _garantir_controle(conexao)
+    return dict(conexao.execute("select versao, checksum from schema_migrations").fetchall())
+
+
+def aplicar_pendentes(conexao, pasta: Path = PASTA_MIGRATIONS) -> List[Migration]:
+    """
+    Aplica as migrations ainda não registradas, uma transação por arquivo.
+    Retorna as aplicadas. Uma migration já aplicada cujo arquivo mudou só
+    gera um aviso: migrations publicadas não devem ser editadas.
+    """
+    feitas = aplicadas(conexao)
+    novas = []
+
+    for migration in listar_migrations(pasta):
+        if migration.versao in feitas:
+            if feitas[migration.versao] != migration.checksum:
+                print(f"⚠️ Migration {migration.caminho.name} foi alterada depois de aplicada")
+            continue
+
+        with conexao.transaction():
+            conexao.execute(migration.sql)
+            conexao.execute(
+                "insert into schema_migrations (versao, nome, checksum) values (%s, %s, %s)",
+                (migration.versao, migration.nome, migration.checksum)
+            )
+        print(f"✅ {migration.caminho.name}")
+        novas.append(migration)
+
+    return novas
+
+
+def _status(conexao) -> None:
+    feitas = aplicadas(conexao)
+    for migration in listar_migrations():
+        marca = "aplicada" if migration.versao in feitas else "pendente"
+        print(f"{migration.versao} {migration.nome}: {marca}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica as migrations SQL do backend")
+    parser.add_argument("--status", action="store_true", help="Só lista aplicadas e pendentes")
+    args = parser.parse_args()
+
+    with conectar() as conexao:
+        if args.status:
+            _status(conexao)
+        else:
+            novas = aplicar_pendentes(conexao)
+            print(f"{len(novas)} migration(s) aplicada(s)")
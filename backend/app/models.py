@@ -1,21 +1,30 @@
 from pydantic import BaseModel, Field, condecimal
 from datetime import date, datetime
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 from uuid import UUID
 
+# Valor em reais com 2 casas; somado internamente em centavos (dinheiro.py)
+Preco = condecimal(max_digits=10, decimal_places=2, gt=0)
+
 
 class VendaCreate(BaseModel):
     """Schema para criar nova venda"""
+    id: Optional[UUID] = Field(
+        None,
+        description="Id gerado pelo cliente; reenviar a mesma venda com o mesmo id não a duplica"
+    )
     data: date = Field(..., description="Data da venda (não pode ser futura)")
     item: str = Field(..., min_length=1, max_length=100, description="Nome do item vendido")
-    preco: condecimal(max_digits=10, decimal_places=2, gt=0) = Field(..., description="Preço em reais")
+    preco: Preco = Field(..., description="Preço unitário em reais")
+    quantidade: int = Field(1, ge=1, le=10000, description="Unidades vendidas")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "data": "2026-01-31",
                 "item": "Suco de Laranja",
-                "preco": 5.50
+                "preco": 5.50,
+                "quantidade": 2
             }
         }
 
@@ -23,7 +32,8 @@ class VendaCreate(BaseModel):
 class VendaUpdate(BaseModel):
     """Schema para atualizar venda existente"""
     item: Optional[str] = Field(None, min_length=1, max_length=100)
-    preco: Optional[condecimal(max_digits=10, decimal_places=2, gt=0)] = None
+    preco: Optional[Preco] = None
+    quantidade: Optional[int] = Field(None, ge=1, le=10000)
 
 
 class VendaResponse(BaseModel):
@@ -32,6 +42,7 @@ class VendaResponse(BaseModel):
     data: date
     item: str
     preco: float
+    quantidade: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -39,15 +50,65 @@ class VendaResponse(BaseModel):
         from_attributes = True
 
 
+class VendasDeltaResponse(BaseModel):
+    """Alterações nas vendas de um período desde um instante (parâmetro desde)"""
+    vendas: List[VendaResponse] = Field(..., description="Vendas criadas ou alteradas")
+    excluidas: List[UUID] = Field(..., description="Ids das vendas excluídas ou movidas para outra data")
+    proximo_desde: Optional[datetime] = Field(None, description="Valor de desde para a próxima consulta")
+
+
 class TotalDiarioResponse(BaseModel):
     """Schema para total de vendas de um dia"""
     data: date
     total_faturado: float
-    quantidade_itens: int
+    quantidade_itens: int = Field(..., description="Unidades vendidas (soma de quantidade)")
 
 
 class TotalMensalResponse(BaseModel):
     """Schema para total de vendas de um mês"""
     mes: str
     total_faturado: float
-    quantidade_itens: int
\ No newline at end of file
+    quantidade_itens: int = Field(..., description="Unidades vendidas (soma de quantidade)")
+
+
+class ErroLinhaLote(BaseModel):
+    """Erro de uma linha de um lote de vendas"""
+    linha: int = Field(..., description="Posição da venda no lote (começando em 1)")
+    erro: str
+
+
+class LoteVendasResponse(BaseModel):
+    """Schema de resposta da inserção de vendas em lote"""
+    total: int
+    inseridas: int
+    erros: List[ErroLinhaLote]
+    vendas: List[VendaResponse]
+
+
+class OperacaoSync(BaseModel):
+    """Operação registrada offline no balcão e enviada em POST /sync"""
+    op: Literal["criar", "atualizar", "excluir"]
+    id: UUID = Field(..., description="Id da venda, gerado pelo cliente na criação")
+    alterado_em: datetime = Field(..., description="Quando a operação aconteceu no aparelho")
+    venda: Optional[Dict[str, Any]] = Field(
+        None,
+        description="criar: campos de VendaCreate; atualizar: campos de VendaUpdate; excluir: vazio"
+    )
+
+
+class ResultadoOperacaoSync(BaseModel):
+    """Resultado de uma operação do lote de sincronização"""
+    linha: int = Field(..., description="Posição da operação no lote (começando em 1)")
+    id: UUID
+    op: str
+    status: str = Field(..., description="aplicada, ignorada (versão mais nova no banco) ou nao_encontrada")
+    venda: Optional[VendaResponse] = Field(None, description="A venda como ficou no banco (vazio se excluída)")
+
+
+class SyncResponse(BaseModel):
+    """Schema de resposta da sincronização em lote"""
+    total: int
+    aplicadas: int
+    ignoradas: int = Field(..., description="Operações válidas não aplicadas (ignoradas ou não encontradas)")
+    erros: List[ErroLinhaLote]
+    resultados: List[ResultadoOperacaoSync]
@@ -0,0 +1,91 @@
+"""
+Resolução de períodos de datas usada por todos os endpoints.
+
+Um Periodo é semiaberto, [inicio, fim_exclusivo): um mês vai do dia 1 até
+o dia 1 do mês seguinte, sem precisar saber quantos dias ele tem. As
+consultas ao banco usam limites inclusivos (data >= inicio e data <= fim,
+p_fim das funções SQL), que saem de limites().
+
+Os limites de cada mês são calculados uma vez e reaproveitados
+(limites_mes), e os períodos de N meses seguem o calendário, sem
+aproximar um mês por 31 dias.
+"""
+import functools
+import re
+from datetime import date, timedelta
+from typing import NamedTuple, Tuple
+
+_MES_ANO = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+class Periodo(NamedTuple):
+    """Intervalo semiaberto de datas [inicio, fim_exclusivo)"""
+    inicio: date
+    fim_exclusivo: date
+
+    @property
+    def ultimo_dia(self) -> date:
+        return self.fim_exclusivo - timedelta(days=1)
+
+    @property
+    def dias(self) -> int:
+        return (self.fim_exclusivo - self.inicio).days
+
+    def contem(self, dia: date) -> bool:
+        return self.inicio <= dia < self.fim_exclusivo
+
+    def limites(self) -> Tuple[date, date]:
+        """(primeiro dia, último dia), para filtros inclusivos"""
+        return self.inicio, self.ultimo_dia
+
+
+@functools.lru_cache(maxsize=1024)
+def limites_mes(ano: int, mes: int) -> Periodo:
+    """Primeiro dia do mês e primeiro dia do mês seguinte"""
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Mês inválido: {mes}")
+    inicio = date(ano, mes, 1)
+    proximo = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return Periodo(inicio, proximo)
+
+
+def _somar_meses(ano: int, mes: int, quantidade: int) -> Tuple[int, int]:
+    total = ano * 12 + (mes - 1) + quantidade
+    return total // 12, total % 12 + 1
+
+
+def dia(data: date) -> Periodo:
+    return Periodo(data, data + timedelta(days=1))
+
+
+def semana(data: date) -> Periodo:
+    """Semana de segunda a domingo que contém a data"""
+    inicio = data - timedelta(days=data.weekday())
+    return Periodo(inicio, inicio + timedelta(days=7))
+
+
+def mes(mes_ano: str) -> Periodo:
+    """Mês no formato YYYY-MM. ValueError se o formato for inválido."""
+    encontrado = _MES_ANO.match(mes_ano or "")
+    if not encontrado:
+        raise ValueError(f"Formato inválido: {mes_ano!r}. Use YYYY-MM")
+    return limites_mes(int(encontrado.group(1)), int(encontrado.group(2)))
+
+
+def meses_ate(quantidade: int, referencia: date = None) -> Periodo:
+    """
+    Os últimos `quantidade` meses do calendário, incluindo o mês da
+    referência (hoje por padrão) até o próprio dia da referência.
+    """
+    if quantidade < 1:
+        raise ValueError("quantidade deve ser pelo menos 1")
+    referencia = referencia or date.today()
+    ano, mes_inicio = _somar_meses(referencia.year, referencia.month, -(quantidade - 1))
+    return Periodo(limites_mes(ano, mes_inicio).inicio, referencia + timedelta(days=1))
+
+
+def entre(inicio: date, fim: date) -> Periodo:
+    """Período de datas informadas pelo cliente, com o fim inclusivo"""
+    if fim < inicio:
+        raise ValueError("A data final deve ser igual ou posterior à inicial")
+    return Periodo(inicio, fim + timedelta(days=1))
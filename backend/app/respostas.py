@@ -0,0 +1,52 @@
+"""
+Serialização JSON das listagens grandes (vendas do dia e do mês).
+
+As linhas lidas do banco já têm o formato do response_model (colunas
+selecionadas explicitamente), então os endpoints devolvem RespostaJSON
+diretamente: o FastAPI não revalida cada linha com Pydantic nem passa pelo
+jsonable_encoder. O response_model continua declarado para a documentação.
+
+orjson é opcional e só é importado na primeira resposta; sem ele, a
+serialização cai no json da stdlib.
+"""
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+orjson = None
+_importacao_tentada = False
+
+
+def orjson_disponivel() -> bool:
+    global orjson, _importacao_tentada
+    if not _importacao_tentada:
+        _importacao_tentada = True
+        try:
+            import orjson as modulo
+            orjson = modulo
+        except ImportError:
+            orjson = None
+    return orjson is not None
+
+
+def _padrao(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def serializar(conteudo: Any) -> bytes:
+    """JSON compacto em bytes (orjson se disponível)"""
+    if orjson_disponivel():
+        return orjson.dumps(conteudo, default=_padrao)
+    return json.dumps(jsonable_encoder(conteudo), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class RespostaJSON(JSONResponse):
+    """JSONResponse serializada por serializar(), para dados já confiáveis"""
+
+    def render(self, content: Any) -> bytes:
+        return serializar(content)
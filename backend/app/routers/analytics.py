@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
-from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
 from typing import List, Optional
 from pydantic import BaseModel
-from collections import defaultdict, Counter
-from ..database import get_supabase_client
+from .. import periodos
+from ..agregacoes import agrupar_dimensoes, agrupar_periodo
+from ..cache import cache_analytics
+from ..jobs import fila_jobs
+from ..dinheiro import media_centavos, para_reais
+from ..database import AsyncPooledPostgrestClient, get_supabase_client
 
 router = APIRouter()
 
@@ -45,295 +49,337 @@ class EstatisticasGerais(BaseModel):
     melhor_dia: Optional[date]
 
 
+class TendenciaSemanal(BaseModel):
+    dia_semana: str
+    total: float
+    media_diaria: float
+    quantidade_dias: int
+
+
+class Dashboard(BaseModel):
+    estatisticas: Optional[EstatisticasGerais] = None
+    mais_vendidos: Optional[List[ItemMaisVendido]] = None
+    tendencia_semanal: Optional[List[TendenciaSemanal]] = None
+    vendas_por_categoria: Optional[List[VendasPorCategoria]] = None
+
+
+# ==================== PERÍODOS (CACHE) ====================
+
+def _periodo_datas(data_inicio: date, data_fim: date, **_):
+    return periodos.entre(data_inicio, data_fim).limites()
+
+
+def _periodo_mes(mes_ano: str, **_):
+    return periodos.mes(mes_ano).limites()
+
+
+def _periodo_meses(quantidade_meses: int, **_):
+    return periodos.meses_ate(quantidade_meses).limites()
+
+
+def _resolver_datas(data_inicio: date, data_fim: date):
+    """Limites do período informado pelo cliente; 400 se estiver invertido"""
+    try:
+        return _periodo_datas(data_inicio, data_fim)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ==================== MÉTRICAS ====================
+# Cada métrica é calculada a partir dos grupos de agrupar_dimensoes, para
+# que os endpoints individuais e o dashboard compartilhem o mesmo cálculo.
+
+DIAS_SEMANA = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
+
+
+def _ranking_itens(por_item: dict, limit: int) -> list:
+    if not por_item:
+        return []
+    
+    # Calcular total para percentuais
+    total_vendas = sum(s["quantidade"] for s in por_item.values())
+    
+    # Ordenar (empates pelo nome) e limitar
+    ranking = sorted(
+        por_item.items(),
+        key=lambda x: (-x[1]["quantidade"], x[0])
+    )[:limit]
+    
+    return [
+        {
+            "item": item,
+            "quantidade_vendida": stats["quantidade"],
+            "faturamento_total": para_reais(stats["centavos"]),
+            "percentual": round(stats["quantidade"] / total_vendas * 100, 2) if total_vendas > 0 else 0
+        }
+        for item, stats in ranking
+    ]
+
+
+def _distribuicao_categorias(por_categoria: dict) -> list:
+    # Calcular total para percentuais
+    total_centavos = sum(s["centavos"] for s in por_categoria.values())
+    
+    return [
+        {
+            "categoria": cat,
+            "quantidade_vendas": stats["quantidade"],
+            "faturamento_total": para_reais(stats["centavos"]),
+            "percentual": round(stats["centavos"] / total_centavos * 100, 2) if total_centavos > 0 else 0
+        }
+        for cat, stats in sorted(por_categoria.items(), key=lambda x: (-x[1]["centavos"], x[0]))
+    ]
+
+
+def _resumo_periodo(por_item: dict, por_dia: dict) -> dict:
+    if not por_dia:
+        return {
+            "total_faturado": 0.0,
+            "quantidade_vendas": 0,
+            "ticket_medio": 0.0,
+            "item_mais_vendido": None,
+            "melhor_dia": None
+        }
+    
+    # Calcular métricas
+    total_centavos = sum(s["centavos"] for s in por_dia.values())
+    quantidade_vendas = sum(s["quantidade"] for s in por_dia.values())
+    
+    # Item mais vendido (em unidades; empates pelo nome)
+    item_mais_vendido = min(por_item.items(), key=lambda x: (-x[1]["quantidade"], x[0]))[0]
+    
+    # Melhor dia (empates pela data mais antiga)
+    melhor_dia = min(por_dia.items(), key=lambda x: (-x[1]["centavos"], x[0]))[0]
+    
+    return {
+        "total_faturado": para_reais(total_centavos),
+        "quantidade_vendas": quantidade_vendas,
+        "ticket_medio": para_reais(media_centavos(total_centavos, quantidade_vendas)),
+        "item_mais_vendido": item_mais_vendido,
+        "melhor_dia": melhor_dia
+    }
+
+
+def _tendencia_dias_semana(por_dia_semana: dict) -> list:
+    resultado = []
+    for indice, dia in enumerate(DIAS_SEMANA):
+        stats = por_dia_semana.get(str(indice), {"centavos": 0, "quantidade": 0})
+        resultado.append({
+            "dia_semana": dia,
+            "total": para_reais(stats["centavos"]),
+            "media_diaria": para_reais(media_centavos(stats["centavos"], stats["quantidade"])),
+            "quantidade_dias": stats["quantidade"]
+        })
+    return resultado
+
+
+# Métricas do dashboard e as dimensões de agrupamento de que cada uma precisa
+METRICAS_DASHBOARD = {
+    "estatisticas": ("item", "data"),
+    "mais_vendidos": ("item",),
+    "tendencia_semanal": ("dia_semana",),
+    "vendas_por_categoria": ("categoria",),
+}
+
+
 # ==================== ENDPOINTS ====================
 
 @router.get("/analytics/mais-vendidos", response_model=List[ItemMaisVendido])
+@fila_jobs.assincrono(periodo=_periodo_datas)
+@cache_analytics.cacheado(periodo=_periodo_datas)
 async def itens_mais_vendidos(
     data_inicio: date = Query(..., description="Data inicial do período"),
     data_fim: date = Query(..., description="Data final do período"),
-    limit: int = Query(10, le=50, description="Quantidade de itens no ranking")
+    limit: int = Query(10, le=50, description="Quantidade de itens no ranking"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Ranking dos itens mais vendidos em um período.
     Retorna nome, quantidade, faturamento e percentual.
     """
+    inicio, fim = _resolver_datas(data_inicio, data_fim)
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("item, preco, quantidade")\
-            .gte("data", data_inicio.isoformat())\
-            .lte("data", data_fim.isoformat())\
-            .execute()
-        
-        vendas = response.data
-        
-        if not vendas:
-            return []
-        
         # Agrupar por item
-        itens_stats = defaultdict(lambda: {"quantidade": 0, "faturamento": 0.0})
-        
-        for v in vendas:
-            item = v["item"]
-            qtd = v.get("quantidade", 1)
-            preco = float(v["preco"])
-            
-            itens_stats[item]["quantidade"] += qtd
-            itens_stats[item]["faturamento"] += preco * qtd
-        
-        # Calcular total para percentuais
-        total_vendas = sum(s["quantidade"] for s in itens_stats.values())
-        
-        # Ordenar e limitar
-        ranking = sorted(
-            itens_stats.items(),
-            key=lambda x: x[1]["quantidade"],
-            reverse=True
-        )[:limit]
-        
-        return [
-            {
-                "item": item,
-                "quantidade_vendida": stats["quantidade"],
-                "faturamento_total": round(stats["faturamento"], 2),
-                "percentual": round(stats["quantidade"] / total_vendas * 100, 2) if total_vendas > 0 else 0
-            }
-            for item, stats in ranking
-        ]
+        itens_stats = await agrupar_periodo(supabase, "item", inicio, fim)
+        return _ranking_itens(itens_stats, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular ranking: {str(e)}")
 
 
 @router.get("/analytics/faturamento-diario", response_model=List[FaturamentoDiario])
+@fila_jobs.assincrono(periodo=_periodo_mes)
+@cache_analytics.cacheado(periodo=_periodo_mes)
 async def faturamento_diario(
-    mes_ano: str = Query(..., description="Mês no formato YYYY-MM")
+    mes_ano: str = Query(..., description="Mês no formato YYYY-MM"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Faturamento dia a dia de um mês específico.
     Ideal para gráficos de linha.
     """
     try:
-        datetime.strptime(mes_ano, "%Y-%m")
-        
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("data, preco, quantidade")\
-            .gte("data", f"{mes_ano}-01")\
-            .lt("data", f"{mes_ano}-32")\
-            .order("data")\
-            .execute()
-        
+        inicio, fim = _periodo_mes(mes_ano)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use YYYY-MM")
+    
+    try:
         # Agrupar por data
-        por_dia = defaultdict(lambda: {"total": 0.0, "quantidade": 0})
-        
-        for v in response.data:
-            data = v["data"]
-            qtd = v.get("quantidade", 1)
-            preco = float(v["preco"])
-            
-            por_dia[data]["total"] += preco * qtd
-            por_dia[data]["quantidade"] += 1
+        por_dia = await agrupar_periodo(supabase, "data", inicio, fim)
         
         return [
             {
                 "data": data,
-                "total": round(stats["total"], 2),
+                "total": para_reais(stats["centavos"]),
                 "quantidade_vendas": stats["quantidade"]
             }
             for data, stats in sorted(por_dia.items())
         ]
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Formato inválido. Use YYYY-MM")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular faturamento: {str(e)}")
 
 
 @router.get("/analytics/vendas-por-categoria", response_model=List[VendasPorCategoria])
+@fila_jobs.assincrono(periodo=_periodo_datas)
+@cache_analytics.cacheado(periodo=_periodo_datas)
 async def vendas_por_categoria(
     data_inicio: date = Query(...),
-    data_fim: date = Query(...)
+    data_fim: date = Query(...),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Distribuição de vendas por categoria de produto.
     Ideal para gráfico de pizza.
     """
+    inicio, fim = _resolver_datas(data_inicio, data_fim)
     try:
-        supabase = get_supabase_client()
-        
-        # Buscar vendas com JOIN em produtos (via view)
-        response = supabase.from_("vendas_completas")\
-            .select("categoria, preco, quantidade")\
-            .gte("data", data_inicio.isoformat())\
-            .lte("data", data_fim.isoformat())\
-            .execute()
-        
-        # Agrupar por categoria
-        por_categoria = defaultdict(lambda: {"quantidade": 0, "faturamento": 0.0})
-        
-        for v in response.data:
-            categoria = v.get("categoria") or "Sem Categoria"
-            qtd = v.get("quantidade", 1)
-            preco = float(v["preco"])
-            
-            por_categoria[categoria]["quantidade"] += 1
-            por_categoria[categoria]["faturamento"] += preco * qtd
-        
-        # Calcular total para percentuais
-        total_faturamento = sum(s["faturamento"] for s in por_categoria.values())
-        
-        return [
-            {
-                "categoria": cat,
-                "quantidade_vendas": stats["quantidade"],
-                "faturamento_total": round(stats["faturamento"], 2),
-                "percentual": round(stats["faturamento"] / total_faturamento * 100, 2) if total_faturamento > 0 else 0
-            }
-            for cat, stats in sorted(por_categoria.items(), key=lambda x: x[1]["faturamento"], reverse=True)
-        ]
+        # Agrupar por categoria (JOIN em produtos via view)
+        por_categoria = await agrupar_periodo(supabase, "categoria", inicio, fim)
+        return _distribuicao_categorias(por_categoria)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular vendas por categoria: {str(e)}")
 
 
 @router.get("/analytics/comparativo-mensal", response_model=List[ComparativoMensal])
+@fila_jobs.assincrono(periodo=_periodo_meses)
+@cache_analytics.cacheado(periodo=_periodo_meses)
 async def comparativo_mensal(
-    quantidade_meses: int = Query(6, ge=1, le=24, description="Quantos meses retornar")
+    quantidade_meses: int = Query(6, ge=1, le=24, description="Quantos meses retornar"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Comparativo de faturamento dos últimos N meses.
     Ideal para gráfico de barras.
     """
     try:
-        supabase = get_supabase_client()
-        
-        # Calcular data de início
-        hoje = date.today()
-        data_inicio = hoje - timedelta(days=quantidade_meses * 31)
-        
-        response = supabase.table("vendas")\
-            .select("data, preco, quantidade")\
-            .gte("data", data_inicio.isoformat())\
-            .order("data")\
-            .execute()
+        # Do dia 1 do mês mais antigo até hoje: só os meses retornados
+        inicio, fim = _periodo_meses(quantidade_meses)
         
         # Agrupar por mês
-        por_mes = defaultdict(lambda: {"total": 0.0, "quantidade": 0})
-        
-        for v in response.data:
-            mes = v["data"][:7]  # YYYY-MM
-            qtd = v.get("quantidade", 1)
-            preco = float(v["preco"])
-            
-            por_mes[mes]["total"] += preco * qtd
-            por_mes[mes]["quantidade"] += 1
+        por_mes = await agrupar_periodo(supabase, "mes", inicio, fim)
         
         return [
             {
                 "mes": mes,
-                "total_faturado": round(stats["total"], 2),
+                "total_faturado": para_reais(stats["centavos"]),
                 "quantidade_vendas": stats["quantidade"],
-                "ticket_medio": round(stats["total"] / stats["quantidade"], 2) if stats["quantidade"] > 0 else 0
+                "ticket_medio": para_reais(media_centavos(stats["centavos"], stats["quantidade"]))
             }
-            for mes, stats in sorted(por_mes.items())[-quantidade_meses:]
+            for mes, stats in sorted(por_mes.items())
         ]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular comparativo: {str(e)}")
 
 
 @router.get("/analytics/estatisticas-gerais", response_model=EstatisticasGerais)
+@fila_jobs.assincrono(periodo=_periodo_datas)
+@cache_analytics.cacheado(periodo=_periodo_datas)
 async def estatisticas_gerais(
     data_inicio: date = Query(...),
-    data_fim: date = Query(...)
+    data_fim: date = Query(...),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Estatísticas gerais de um período.
     Resumo executivo para dashboard.
     """
+    inicio, fim = _resolver_datas(data_inicio, data_fim)
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("data, item, preco, quantidade")\
-            .gte("data", data_inicio.isoformat())\
-            .lte("data", data_fim.isoformat())\
-            .execute()
-        
-        vendas = response.data
-        
-        if not vendas:
-            return {
-                "total_faturado": 0.0,
-                "quantidade_vendas": 0,
-                "ticket_medio": 0.0,
-                "item_mais_vendido": None,
-                "melhor_dia": None
-            }
-        
-        # Calcular métricas
-        total_faturado = sum(float(v["preco"]) * v.get("quantidade", 1) for v in vendas)
-        quantidade_vendas = len(vendas)
-        ticket_medio = total_faturado / quantidade_vendas
-        
-        # Item mais vendido
-        itens = [v["item"] for v in vendas]
-        item_mais_vendido = Counter(itens).most_common(1)[0][0] if itens else None
-        
-        # Melhor dia
-        faturamento_por_dia = defaultdict(float)
-        for v in vendas:
-            faturamento_por_dia[v["data"]] += float(v["preco"]) * v.get("quantidade", 1)
-        
-        melhor_dia = max(faturamento_por_dia.items(), key=lambda x: x[1])[0] if faturamento_por_dia else None
-        
-        return {
-            "total_faturado": round(total_faturado, 2),
-            "quantidade_vendas": quantidade_vendas,
-            "ticket_medio": round(ticket_medio, 2),
-            "item_mais_vendido": item_mais_vendido,
-            "melhor_dia": melhor_dia
-        }
+        grupos = await agrupar_dimensoes(supabase, ("item", "data"), inicio, fim)
+        return _resumo_periodo(grupos["item"], grupos["data"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular estatísticas: {str(e)}")
 
 
-@router.get("/analytics/tendencia-semanal")
+@router.get("/analytics/tendencia-semanal", response_model=List[TendenciaSemanal])
+@fila_jobs.assincrono(periodo=_periodo_datas)
+@cache_analytics.cacheado(periodo=_periodo_datas)
 async def tendencia_semanal(
     data_inicio: date = Query(...),
-    data_fim: date = Query(...)
+    data_fim: date = Query(...),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Faturamento por dia da semana (seg, ter, qua...).
     Identifica padrões de vendas.
     """
+    inicio, fim = _resolver_datas(data_inicio, data_fim)
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("data, preco, quantidade")\
-            .gte("data", data_inicio.isoformat())\
-            .lte("data", data_fim.isoformat())\
-            .execute()
-        
-        dias_semana = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
-        por_dia_semana = defaultdict(lambda: {"total": 0.0, "ocorrencias": 0})
-        
-        for v in response.data:
-            data_obj = datetime.strptime(v["data"], "%Y-%m-%d")
-            dia_semana = dias_semana[data_obj.weekday()]
-            qtd = v.get("quantidade", 1)
-            preco = float(v["preco"])
-            
-            por_dia_semana[dia_semana]["total"] += preco * qtd
-            por_dia_semana[dia_semana]["ocorrencias"] += 1
-        
-        resultado = []
-        for dia in dias_semana:
-            stats = por_dia_semana[dia]
-            media = stats["total"] / stats["ocorrencias"] if stats["ocorrencias"] > 0 else 0
-            resultado.append({
-                "dia_semana": dia,
-                "total": round(stats["total"], 2),
-                "media_diaria": round(media, 2),
-                "quantidade_dias": stats["ocorrencias"]
-            })
-        
+        # Agrupar por dia da semana (0 = segunda)
+        por_dia_semana = await agrupar_periodo(supabase, "dia_semana", inicio, fim)
+        return _tendencia_dias_semana(por_dia_semana)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao calcular tendência: {str(e)}")
+
+
+@router.get("/analytics/dashboard", response_model=Dashboard, response_model_exclude_none=True)
+@fila_jobs.assincrono(periodo=_periodo_datas)
+@cache_analytics.cacheado(periodo=_periodo_datas)
+async def dashboard(
+    data_inicio: date = Query(...),
+    data_fim: date = Query(...),
+    metricas: Optional[str] = Query(
+        None,
+        description="Métricas separadas por vírgula (padrão: todas): " + ", ".join(METRICAS_DASHBOARD)
+    ),
+    limit: int = Query(10, le=50, description="Quantidade de itens no ranking"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Todas as métricas do dashboard em uma única consulta.
+    Os agrupamentos necessários são calculados juntos, em uma só ida
+    ao banco, em vez de uma chamada por endpoint.
+    """
+    inicio, fim = _resolver_datas(data_inicio, data_fim)
+    selecionadas = [m.strip() for m in metricas.split(",") if m.strip()] if metricas else list(METRICAS_DASHBOARD)
+    invalidas = [m for m in selecionadas if m not in METRICAS_DASHBOARD]
+    if invalidas or not selecionadas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Métricas inválidas: {', '.join(invalidas)}. Use: {', '.join(METRICAS_DASHBOARD)}"
+        )
+    
+    try:
+        dimensoes = list(dict.fromkeys(d for m in selecionadas for d in METRICAS_DASHBOARD[m]))
+        grupos = await agrupar_dimensoes(supabase, dimensoes, inicio, fim)
+        
+        resultado = {}
+        if "estatisticas" in selecionadas:
+            resultado["estatisticas"] = _resumo_periodo(grupos["item"], grupos["data"])
+        if "mais_vendidos" in selecionadas:
+            resultado["mais_vendidos"] = _ranking_itens(grupos["item"], limit)
+        if "tendencia_semanal" in selecionadas:
+            resultado["tendencia_semanal"] = _tendencia_dias_semana(grupos["dia_semana"])
+        if "vendas_por_categoria" in selecionadas:
+            resultado["vendas_por_categoria"] = _distribuicao_categorias(grupos["categoria"])
         return resultado
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao calcular tendência: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao calcular dashboard: {str(e)}")
+
+
+@router.get("/analytics/cache/estatisticas")
+async def estatisticas_cache():
+    """
+    Contadores do cache de respostas de analytics (hits, misses, evictions).
+    Para monitoramento.
+    """
+    return cache_analytics.estatisticas()
\ No newline at end of file
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+from ..jobs import fila_jobs
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}")
+async def obter_job(job_id: str):
+    """
+    Estado de um job de analytics criado com async=true.
+    status: pendente, executando, concluido ou erro. Quando concluído,
+    `resultado` tem a mesma resposta do endpoint síncrono; em caso de
+    erro, `erro` tem status_code e detail.
+    """
+    job = fila_jobs.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+    return job
+
+
+@router.get("/jobs")
+async def estatisticas_jobs():
+    """Contadores da fila de jobs deste processo. Para monitoramento."""
+    return fila_jobs.estatisticas()
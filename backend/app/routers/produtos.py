@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from pydantic import BaseModel, Field, condecimal
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from postgrest.exceptions import APIError
 from datetime import datetime
 from uuid import UUID
-from ..database import get_supabase_client
+import os
+from ..cache import cache_analytics
+from ..catalogo import catalogo
+from ..models import ErroLinhaLote, Preco
+from ..dinheiro import para_centavos, para_reais
+from ..database import AsyncPooledPostgrestClient, get_supabase_client
 
 router = APIRouter()
 
+# Importação do catálogo: linhas por upsert e máximo de produtos por requisição
+PRODUTOS_IMPORTACAO_CHUNK = int(os.getenv("PRODUTOS_IMPORTACAO_CHUNK", "500"))
+PRODUTOS_IMPORTACAO_MAX = int(os.getenv("PRODUTOS_IMPORTACAO_MAX", "5000"))
+
 
 # ==================== SCHEMAS ====================
 
@@ -14,7 +24,7 @@ class ProdutoCreate(BaseModel):
     """Schema para criar produto"""
     nome: str = Field(..., min_length=1, max_length=100)
     categoria: Optional[str] = Field(None, max_length=50)
-    preco_padrao: condecimal(max_digits=10, decimal_places=2, gt=0)
+    preco_padrao: Preco
     
     class Config:
         json_schema_extra = {
@@ -30,7 +40,7 @@ class ProdutoUpdate(BaseModel):
     """Schema para atualizar produto"""
     nome: Optional[str] = Field(None, min_length=1, max_length=100)
     categoria: Optional[str] = Field(None, max_length=50)
-    preco_padrao: Optional[condecimal(max_digits=10, decimal_places=2, gt=0)] = None
+    preco_padrao: Optional[Preco] = None
     ativo: Optional[bool] = None
 
 
@@ -45,47 +55,91 @@ class ProdutoResponse(BaseModel):
     updated_at: datetime
 
 
+class ImportacaoProdutosResponse(BaseModel):
+    """Schema de resposta da importação do catálogo"""
+    total: int
+    gravados: int = Field(..., description="Produtos inseridos ou atualizados")
+    ignorados: int = Field(..., description="Já existentes, com atualizar=false")
+    erros: List[ErroLinhaLote]
+    produtos: List[ProdutoResponse]
+
+
+def _produto_para_linha(produto: ProdutoCreate) -> dict:
+    return {
+        "nome": produto.nome,
+        "categoria": produto.categoria,
+        "preco_padrao": para_reais(para_centavos(produto.preco_padrao))
+    }
+
+
+def _descrever_erro_validacao(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in erro['loc']) or 'produto'}: {erro['msg']}"
+        for erro in e.errors()
+    )
+
+
+async def _upsert_produtos(supabase, bloco, atualizar: bool, gravados: list, erros: list) -> None:
+    """
+    Um INSERT ... ON CONFLICT (nome) por bloco. Se o banco rejeitar o bloco,
+    ele é dividido ao meio até isolar as linhas com erro.
+    """
+    try:
+        response = await supabase.table("produtos")\
+            .upsert(
+                [registro for _, registro in bloco],
+                on_conflict="nome",
+                ignore_duplicates=not atualizar
+            )\
+            .execute()
+        gravados.extend(response.data)
+    except APIError as e:
+        if len(bloco) == 1:
+            erros.append({"linha": bloco[0][0], "erro": f"Erro ao importar produto: {str(e)}"})
+            return
+        meio = len(bloco) // 2
+        await _upsert_produtos(supabase, bloco[:meio], atualizar, gravados, erros)
+        await _upsert_produtos(supabase, bloco[meio:], atualizar, gravados, erros)
+    except Exception as e:
+        # Falha de conexão/timeout: não adianta dividir o bloco
+        for linha, _ in bloco:
+            erros.append({"linha": linha, "erro": f"Erro ao importar produto: {str(e)}"})
+
+
 # ==================== ENDPOINTS ====================
 
 @router.get("/produtos", response_model=List[ProdutoResponse])
 async def listar_produtos(
     apenas_ativos: bool = Query(True, description="Filtrar apenas produtos ativos"),
-    categoria: Optional[str] = Query(None, description="Filtrar por categoria")
+    categoria: Optional[str] = Query(None, description="Filtrar por categoria"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
 ):
     """
     Lista todos os produtos do catálogo.
     Por padrão, retorna apenas produtos ativos.
+    Servido do catálogo em memória.
     """
     try:
-        supabase = get_supabase_client()
-        query = supabase.table("produtos").select("*")
-        
-        if apenas_ativos:
-            query = query.eq("ativo", True)
-        
-        if categoria:
-            query = query.eq("categoria", categoria)
-        
-        response = query.order("nome").execute()
-        return response.data
+        await catalogo.garantir(supabase)
+        return catalogo.listar(apenas_ativos, categoria)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar produtos: {str(e)}")
 
 
 @router.get("/produtos/{produto_id}", response_model=ProdutoResponse)
-async def obter_produto(produto_id: str):
+async def obter_produto(
+    produto_id: str,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """Obtém detalhes de um produto específico"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("produtos")\
-            .select("*")\
-            .eq("id", produto_id)\
-            .execute()
+        await catalogo.garantir(supabase)
+        produto = await catalogo.obter(supabase, produto_id)
         
-        if not response.data:
+        if produto is None:
             raise HTTPException(status_code=404, detail="Produto não encontrado")
         
-        return response.data[0]
+        return produto
     except HTTPException:
         raise
     except Exception as e:
@@ -93,34 +147,30 @@ async def obter_produto(produto_id: str):
 
 
 @router.post("/produtos", response_model=ProdutoResponse, status_code=201)
-async def criar_produto(produto: ProdutoCreate):
-    """Cria um novo produto no catálogo"""
+async def criar_produto(
+    produto: ProdutoCreate,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Cria um novo produto no catálogo.
+    Um único INSERT ... ON CONFLICT (nome) DO NOTHING: o índice único
+    produtos_nome_key decide, sem janela entre verificar e inserir.
+    """
     try:
-        supabase = get_supabase_client()
-        
-        # Verificar se já existe produto com esse nome
-        check = supabase.table("produtos")\
-            .select("id")\
-            .eq("nome", produto.nome)\
+        response = await supabase.table("produtos")\
+            .upsert(_produto_para_linha(produto), on_conflict="nome", ignore_duplicates=True)\
             .execute()
         
-        if check.data:
+        # Nada retornado: o nome já existia
+        if not response.data:
             raise HTTPException(
                 status_code=400,
                 detail=f"Já existe um produto com o nome '{produto.nome}'"
             )
         
-        response = supabase.table("produtos")\
-            .insert({
-                "nome": produto.nome,
-                "categoria": produto.categoria,
-                "preco_padrao": float(produto.preco_padrao)
-            })\
-            .execute()
-        
-        if not response.data:
-            raise HTTPException(status_code=500, detail="Erro ao criar produto")
-        
+        # Categorias das vendas podem mudar (vendas_por_categoria)
+        cache_analytics.limpar()
+        await catalogo.apos_escrita(supabase)
         return response.data[0]
     except HTTPException:
         raise
@@ -128,26 +178,84 @@ async def criar_produto(produto: ProdutoCreate):
         raise HTTPException(status_code=500, detail=f"Erro ao criar produto: {str(e)}")
 
 
+@router.post("/produtos/importar", response_model=ImportacaoProdutosResponse)
+async def importar_produtos(
+    produtos: List[Dict[str, Any]] = Body(..., description="Lista de produtos no formato de ProdutoCreate"),
+    atualizar: bool = Query(True, description="Atualizar categoria e preço dos nomes já cadastrados"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Importa o catálogo em lote (carga inicial ou atualização de preços).
+    Os produtos são gravados com upserts em blocos de
+    PRODUTOS_IMPORTACAO_CHUNK linhas, casando pelo nome: com atualizar=true
+    os existentes recebem a categoria e o preço do arquivo; com false são
+    mantidos como estão. Produtos inválidos vão para `erros` com sua posição
+    e um nome repetido no lote vale pela última ocorrência.
+    """
+    if len(produtos) > PRODUTOS_IMPORTACAO_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote muito grande. Máximo: {PRODUTOS_IMPORTACAO_MAX} produtos"
+        )
+    
+    try:
+        erros = []
+        # Um mesmo nome duas vezes no mesmo upsert é rejeitado pelo Postgres
+        por_nome = {}
+        for linha, dados in enumerate(produtos, start=1):
+            try:
+                produto = ProdutoCreate.model_validate(dados)
+            except ValidationError as e:
+                erros.append({"linha": linha, "erro": _descrever_erro_validacao(e)})
+                continue
+            por_nome.pop(produto.nome, None)
+            por_nome[produto.nome] = (linha, _produto_para_linha(produto))
+        
+        pendentes = sorted(por_nome.values(), key=lambda item: item[0])
+        gravados = []
+        erros_banco = []
+        for inicio in range(0, len(pendentes), PRODUTOS_IMPORTACAO_CHUNK):
+            bloco = pendentes[inicio:inicio + PRODUTOS_IMPORTACAO_CHUNK]
+            await _upsert_produtos(supabase, bloco, atualizar, gravados, erros_banco)
+        
+        if gravados:
+            cache_analytics.limpar()
+            await catalogo.apos_escrita(supabase)
+        
+        return {
+            "total": len(produtos),
+            "gravados": len(gravados),
+            # Com ignore-duplicates o banco só devolve as linhas inseridas
+            "ignorados": len(pendentes) - len(gravados) - len(erros_banco),
+            "erros": sorted(erros + erros_banco, key=lambda erro: erro["linha"]),
+            "produtos": gravados
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao importar produtos: {str(e)}")
+
+
 @router.put("/produtos/{produto_id}", response_model=ProdutoResponse)
-async def atualizar_produto(produto_id: str, produto: ProdutoUpdate):
+async def atualizar_produto(
+    produto_id: str,
+    produto: ProdutoUpdate,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """Atualiza um produto existente"""
     try:
-        supabase = get_supabase_client()
-        
         update_data = {}
         if produto.nome is not None:
             update_data["nome"] = produto.nome
         if produto.categoria is not None:
             update_data["categoria"] = produto.categoria
         if produto.preco_padrao is not None:
-            update_data["preco_padrao"] = float(produto.preco_padrao)
+            update_data["preco_padrao"] = para_reais(para_centavos(produto.preco_padrao))
         if produto.ativo is not None:
             update_data["ativo"] = produto.ativo
         
         if not update_data:
             raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
         
-        response = supabase.table("produtos")\
+        response = await supabase.table("produtos")\
             .update(update_data)\
             .eq("id", produto_id)\
             .execute()
@@ -155,6 +263,9 @@ async def atualizar_produto(produto_id: str, produto: ProdutoUpdate):
         if not response.data:
             raise HTTPException(status_code=404, detail="Produto não encontrado")
         
+        if "nome" in update_data or "categoria" in update_data:
+            cache_analytics.limpar()
+        await catalogo.apos_escrita(supabase)
         return response.data[0]
     except HTTPException:
         raise
@@ -163,14 +274,16 @@ async def atualizar_produto(produto_id: str, produto: ProdutoUpdate):
 
 
 @router.delete("/produtos/{produto_id}", status_code=204)
-async def desativar_produto(produto_id: str):
+async def desativar_produto(
+    produto_id: str,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Desativa um produto (soft delete).
     O produto não é deletado, apenas marcado como inativo.
     """
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("produtos")\
+        response = await supabase.table("produtos")\
             .update({"ativo": False})\
             .eq("id", produto_id)\
             .execute()
@@ -178,6 +291,7 @@ async def desativar_produto(produto_id: str):
         if not response.data:
             raise HTTPException(status_code=404, detail="Produto não encontrado")
         
+        await catalogo.apos_escrita(supabase)
         return None
     except HTTPException:
         raise
@@ -186,16 +300,12 @@ async def desativar_produto(produto_id: str):
 
 
 @router.get("/produtos/categorias/listar")
-async def listar_categorias():
+async def listar_categorias(
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """Lista todas as categorias de produtos cadastradas"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("produtos")\
-            .select("categoria")\
-            .neq("categoria", None)\
-            .execute()
-        
-        categorias = list(set(p["categoria"] for p in response.data if p.get("categoria")))
-        return sorted(categorias)
+        await catalogo.garantir(supabase)
+        return catalogo.categorias()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar categorias: {str(e)}")
\ No newline at end of file
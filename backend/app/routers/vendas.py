@@ -1,68 +1,629 @@
-from fastapi import APIRouter, HTTPException, Query
-from datetime import date, datetime
-from typing import List
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from postgrest.exceptions import APIError
+import asyncio
+import base64
+import hashlib
+import json
+import os
 from ..models import (
     VendaCreate, 
     VendaUpdate,
     VendaResponse, 
     TotalDiarioResponse,
-    TotalMensalResponse
+    TotalMensalResponse,
+    LoteVendasResponse,
+    OperacaoSync,
+    SyncResponse,
+    VendasDeltaResponse
 )
-from ..database import get_supabase_client
+from .. import periodos
+from ..agregacoes import agrupar_periodo
+from ..cache import invalidar_vendas
+from ..eventos import LimiteAssinantes, canal_vendas
+from ..dinheiro import para_centavos, para_reais
+from ..exportacao import COLUNAS_EXPORTACAO, csv_vendas, parquet_disponivel, parquet_vendas
+from ..database import AsyncPooledPostgrestClient, get_supabase_client
+from ..respostas import RespostaJSON, serializar
 
 router = APIRouter()
 
+# Inserção em lote: linhas por INSERT e máximo de vendas por requisição
+VENDAS_LOTE_CHUNK = int(os.getenv("VENDAS_LOTE_CHUNK", "500"))
+VENDAS_LOTE_MAX = int(os.getenv("VENDAS_LOTE_MAX", "10000"))
 
-@router.get("/vendas", response_model=List[VendaResponse])
-async def listar_vendas(data_filtro: date = Query(..., description="Data para filtrar vendas")):
+# Tamanho das páginas buscadas no banco (max-rows padrão do Supabase: 1000)
+VENDAS_PAGINA = int(os.getenv("VENDAS_PAGINA", "1000"))
+
+# Campos de VendaResponse: as listagens selecionam só estas colunas e
+# devolvem as linhas do banco sem revalidá-las (RespostaJSON)
+COLUNAS_VENDA = "id,data,item,preco,quantidade,created_at,updated_at"
+
+# Sincronização offline: máximo de operações por requisição e quanto o
+# relógio de um aparelho pode estar adiantado (segundos) sem a operação
+# ser recusada; um alterado_em no futuro venceria todas as edições seguintes
+SYNC_MAX = int(os.getenv("SYNC_MAX", "5000"))
+SYNC_TOLERANCIA_RELOGIO = float(os.getenv("SYNC_TOLERANCIA_RELOGIO", "300"))
+# Operações por chamada a sincronizar_vendas: a função devolve uma linha por
+# operação, e o db-max-rows do PostgREST (1000 no Supabase) trunca o resto
+SYNC_CHUNK = int(os.getenv("SYNC_CHUNK", "1000"))
+
+# Listagens incrementais (desde): alterações até N segundos antes de desde
+# voltam de novo. updated_at é o início da transação, então uma escrita
+# pode ficar visível depois de outra com updated_at mais recente
+VENDAS_DELTA_MARGEM = float(os.getenv("VENDAS_DELTA_MARGEM", "5"))
+
+_FUNCAO_INEXISTENTE = {"PGRST202", "42883"}
+_versao_sql = True
+
+
+# ==================== PAGINAÇÃO POR CURSOR ====================
+# Ordem das listagens do mês: data desc, created_at asc, id asc.
+# Ordem crescente (exportação): data, created_at, id.
+# O cursor é a chave (data, created_at, id) da última venda entregue.
+
+def _codificar_cursor(venda: dict) -> str:
+    chave = [venda["data"], venda["created_at"], venda["id"]]
+    return base64.urlsafe_b64encode(json.dumps(chave).encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor: str) -> Tuple[str, str, str]:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data, criado, venda_id = json.loads(bruto)
+        date.fromisoformat(data)
+        return data, criado, venda_id
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+async def _pagina_vendas(
+    supabase,
+    inicio: date,
+    fim: date,
+    posicao: Optional[Tuple[str, str, str]],
+    tamanho: int,
+    origem: str = "vendas",
+    colunas: str = "*",
+    crescente: bool = False,
+    alteradas_desde: Optional[str] = None
+) -> List[dict]:
+    """Busca uma página de vendas do período a partir da posição do cursor"""
+    query = supabase.table(origem)\
+        .select(colunas)\
+        .gte("data", inicio.isoformat())\
+        .lte("data", fim.isoformat())
+    
+    if alteradas_desde is not None:
+        query = query.gte("updated_at", alteradas_desde)
+    
+    if posicao is not None:
+        data, criado, venda_id = posicao
+        # Keyset: tudo que vem depois de (data, created_at, id) na ordem da listagem
+        op_data = "gt" if crescente else "lt"
+        query.params = query.params.add(
+            "or",
+            f'(data.{op_data}."{data}",'
+            f'and(data.eq."{data}",created_at.gt."{criado}"),'
+            f'and(data.eq."{data}",created_at.eq."{criado}",id.gt."{venda_id}"))'
+        )
+    
+    response = await query\
+        .order("data", desc=not crescente)\
+        .order("created_at", desc=False)\
+        .order("id", desc=False)\
+        .limit(tamanho)\
+        .execute()
+    return response.data
+
+
+async def _paginas_vendas(
+    supabase,
+    inicio: date,
+    fim: date,
+    posicao: Optional[Tuple[str, str, str]],
+    tamanho: int,
+    **opcoes
+) -> AsyncIterator[List[dict]]:
+    """Percorre o período página a página (sempre produz ao menos uma)"""
+    while True:
+        pagina = await _pagina_vendas(supabase, inicio, fim, posicao, tamanho, **opcoes)
+        yield pagina
+        if len(pagina) < tamanho:
+            return
+        ultima = pagina[-1]
+        posicao = (ultima["data"], ultima["created_at"], ultima["id"])
+
+
+async def _ndjson_vendas(
+    primeira: List[dict],
+    paginas: Optional[AsyncIterator[List[dict]]] = None
+) -> AsyncIterator[bytes]:
+    yield b"".join(serializar(venda) + b"\n" for venda in primeira)
+    if paginas is None:
+        return
+    async for pagina in paginas:
+        yield b"".join(serializar(venda) + b"\n" for venda in pagina)
+
+
+# ==================== LISTAGENS INCREMENTAIS ====================
+# ETag/If-None-Match: a versão do período (versao_vendas, migration 0006)
+# muda a cada escrita que o afeta; se o cliente já tem a versão atual, a
+# resposta é 304 sem ler as linhas. desde: só as vendas com updated_at
+# posterior e as lápides (vendas_excluidas) das excluídas no período.
+
+async def _versao_vendas(supabase, inicio: date, fim: date) -> Optional[dict]:
+    """Contagem e últimas alteração/exclusão do período, ou None sem a função SQL"""
+    global _versao_sql
+    
+    if not _versao_sql:
+        return None
+    try:
+        builder = await supabase.rpc("versao_vendas", {
+            "p_inicio": inicio.isoformat(),
+            "p_fim": fim.isoformat()
+        })
+        response = await builder.execute()
+    except APIError as e:
+        if e.code not in _FUNCAO_INEXISTENTE:
+            raise
+        print("⚠️ Função versao_vendas não encontrada, ETag calculado a partir das linhas")
+        _versao_sql = False
+        return None
+    return response.data[0]
+
+
+def _etag(*partes) -> str:
+    return 'W/"' + hashlib.sha1("|".join(str(p) for p in partes).encode()).hexdigest() + '"'
+
+
+def _etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    etiquetas = {e.strip() for e in if_none_match.split(",")}
+    return "*" in etiquetas or etag in etiquetas or etag[2:] in etiquetas
+
+
+def _instante_utc(valor) -> datetime:
+    if isinstance(valor, str):
+        # "Z" (UTC) só é aceito por fromisoformat a partir do Python 3.11
+        valor = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    return valor if valor.tzinfo is not None else valor.replace(tzinfo=timezone.utc)
+
+
+def _proximo_desde(vendas: List[dict], desde: Optional[datetime]) -> Optional[datetime]:
+    """Maior updated_at entregue: o desde da próxima consulta incremental"""
+    instantes = [_instante_utc(v["updated_at"]) for v in vendas]
+    if desde is not None:
+        instantes.append(_instante_utc(desde))
+    return max(instantes, default=None)
+
+
+async def _excluidas_desde(supabase, inicio: date, fim: date, limite: str) -> List[str]:
+    """Ids das lápides do período com excluido_em >= limite, em páginas por id"""
+    ids, ultimo = [], None
+    while True:
+        query = supabase.table("vendas_excluidas")\
+            .select("id")\
+            .gte("data", inicio.isoformat())\
+            .lte("data", fim.isoformat())\
+            .gte("excluido_em", limite)
+        if ultimo is not None:
+            query = query.gt("id", ultimo)
+        response = await query.order("id").limit(VENDAS_PAGINA).execute()
+        ids.extend(l["id"] for l in response.data)
+        if len(response.data) < VENDAS_PAGINA:
+            return ids
+        ultimo = response.data[-1]["id"]
+
+
+async def _delta_vendas(supabase, inicio: date, fim: date, desde: datetime) -> dict:
+    """Vendas alteradas e ids excluídos no período desde o instante informado"""
+    limite = (_instante_utc(desde) - timedelta(seconds=VENDAS_DELTA_MARGEM)).isoformat()
+    
+    async def alteradas() -> List[dict]:
+        vendas = []
+        async for pagina in _paginas_vendas(
+            supabase, inicio, fim, None, VENDAS_PAGINA,
+            colunas=COLUNAS_VENDA, crescente=True, alteradas_desde=limite
+        ):
+            vendas.extend(pagina)
+        return vendas
+    
+    vendas, excluidas = await asyncio.gather(alteradas(), _excluidas_desde(supabase, inicio, fim, limite))
+    # Venda que saiu do período e voltou: vale a linha atual
+    presentes = {v["id"] for v in vendas}
+    return {
+        "vendas": vendas,
+        "excluidas": [i for i in excluidas if i not in presentes],
+        "proximo_desde": _proximo_desde(vendas, desde)
+    }
+
+
+async def _listagem_versionada(
+    supabase,
+    inicio: date,
+    fim: date,
+    if_none_match: Optional[str],
+    response: Response,
+    variante: tuple,
+    buscar: Callable[[], Awaitable[Any]]
+):
+    """
+    Responde buscar() com ETag, ou 304 se If-None-Match já é a versão
+    atual. Sem a função versao_vendas, o ETag vem das linhas buscadas (o
+    304 ainda evita a transferência, mas não a leitura).
+    """
+    versao = await _versao_vendas(supabase, inicio, fim)
+    if versao is not None:
+        etag = _etag(*variante, versao["linhas"], versao["alterado_em"], versao["excluido_em"])
+        if _etag_corresponde(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    corpo = await buscar()
+    
+    if isinstance(corpo, dict):
+        vendas, excluidas, proximo = corpo["vendas"], corpo["excluidas"], corpo["proximo_desde"]
+    else:
+        vendas, excluidas, proximo = corpo, [], _proximo_desde(corpo, None)
+    if versao is None:
+        etag = _etag(*variante, *(f"{v['id']}:{v['updated_at']}" for v in vendas), *excluidas)
+        if _etag_corresponde(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if proximo is not None:
+        # Em UTC com "Z": sem "+", que vira espaço se colado sem codificar na URL
+        response.headers["X-Proximo-Desde"] = proximo.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    return RespostaJSON(corpo, headers=dict(response.headers))
+
+
+def _venda_para_linha(venda: VendaCreate) -> dict:
+    """Converte uma venda validada no registro gravado em vendas"""
+    linha = {
+        "data": venda.data.isoformat(),
+        "item": venda.item,
+        "preco": para_reais(para_centavos(venda.preco)),
+        "quantidade": venda.quantidade
+    }
+    if venda.id is not None:
+        linha["id"] = str(venda.id)
+    return linha
+
+
+def _campos_atualizacao(venda: VendaUpdate) -> dict:
+    """Campos informados de uma atualização, no formato gravado em vendas"""
+    campos = {}
+    if venda.item is not None:
+        campos["item"] = venda.item
+    if venda.preco is not None:
+        campos["preco"] = para_reais(para_centavos(venda.preco))
+    if venda.quantidade is not None:
+        campos["quantidade"] = venda.quantidade
+    return campos
+
+
+def _descrever_erro_validacao(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in erro['loc']) or 'venda'}: {erro['msg']}"
+        for erro in e.errors()
+    )
+
+
+class _LoteVendas:
+    """
+    Acumula vendas de um lote, validando uma a uma, e insere em blocos de
+    VENDAS_LOTE_CHUNK linhas (um INSERT multi-linha por bloco). Se o banco
+    rejeitar um bloco, ele é dividido ao meio até isolar as linhas com erro.
+    Vendas com id do cliente vão em um INSERT ... ON CONFLICT (id) DO NOTHING
+    separado (o PostgREST exige as mesmas colunas em todas as linhas): um
+    lote reenviado não as duplica, e as já gravadas não contam em inseridas.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.hoje = date.today()
+        self.total = 0
+        self.pendentes = []
+        self.inseridas = []
+        self.erros = []
+
+    async def adicionar(self, linha: int, dados: Any) -> None:
+        self.total += 1
+        if self.total > VENDAS_LOTE_MAX:
+            self.erros.append({"linha": linha, "erro": f"Limite de {VENDAS_LOTE_MAX} vendas por lote excedido"})
+            return
+
+        try:
+            venda = VendaCreate.model_validate(dados)
+        except ValidationError as e:
+            self.erros.append({"linha": linha, "erro": _descrever_erro_validacao(e)})
+            return
+
+        if venda.data > self.hoje:
+            self.erros.append({
+                "linha": linha,
+                "erro": f"Data não pode ser futura. Data máxima: {self.hoje.isoformat()}"
+            })
+            return
+
+        self.pendentes.append((linha, _venda_para_linha(venda)))
+        if len(self.pendentes) >= VENDAS_LOTE_CHUNK:
+            await self.enviar()
+
+    async def enviar(self) -> None:
+        bloco, self.pendentes = self.pendentes, []
+        sem_id = [item for item in bloco if "id" not in item[1]]
+        com_id = [item for item in bloco if "id" in item[1]]
+        if sem_id:
+            await self._inserir(sem_id)
+        if com_id:
+            await self._inserir(com_id)
+
+    async def _inserir(self, bloco) -> None:
+        registros = [registro for _, registro in bloco]
+        try:
+            if "id" in registros[0]:
+                query = self.supabase.table("vendas")\
+                    .upsert(registros, on_conflict="id", ignore_duplicates=True)
+            else:
+                query = self.supabase.table("vendas").insert(registros)
+            response = await query.execute()
+            self.inseridas.extend(response.data)
+        except APIError as e:
+            if len(bloco) == 1:
+                self.erros.append({"linha": bloco[0][0], "erro": f"Erro ao inserir venda: {str(e)}"})
+                return
+            meio = len(bloco) // 2
+            await self._inserir(bloco[:meio])
+            await self._inserir(bloco[meio:])
+        except Exception as e:
+            # Falha de conexão/timeout: não adianta dividir o bloco
+            for linha, _ in bloco:
+                self.erros.append({"linha": linha, "erro": f"Erro ao inserir venda: {str(e)}"})
+
+    async def finalizar(self) -> dict:
+        await self.enviar()
+
+        for data in {v["data"] for v in self.inseridas}:
+            invalidar_vendas(data)
+        canal_vendas.registrar_lote(("criada", venda) for venda in self.inseridas)
+
+        return {
+            "total": self.total,
+            "inseridas": len(self.inseridas),
+            "erros": sorted(self.erros, key=lambda e: e["linha"]),
+            "vendas": self.inseridas
+        }
+
+
+@router.get("/vendas", response_model=Union[List[VendaResponse], VendasDeltaResponse])
+async def listar_vendas(
+    response: Response,
+    data_filtro: date = Query(..., description="Data para filtrar vendas"),
+    desde: Optional[datetime] = Query(None, description="Só as alterações desde o X-Proximo-Desde anterior"),
+    if_none_match: Optional[str] = Header(None),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Lista todas as vendas de uma data específica.
     Ordenado por horário de criação (mais antigos primeiro).
+    
+    - Com `If-None-Match` igual ao ETag da última resposta: 304 se nada mudou.
+    - Com `desde` (header X-Proximo-Desde da resposta anterior): retorna só
+      as vendas criadas ou alteradas e os ids das excluídas desde então.
     """
+    dia = periodos.dia(data_filtro)
+    inicio, fim = dia.limites()
+    
+    async def buscar():
+        if desde is not None:
+            return await _delta_vendas(supabase, inicio, fim, desde)
+        # Em páginas: um dia movimentado passaria do db-max-rows do PostgREST
+        vendas = []
+        async for pagina in _paginas_vendas(
+            supabase, inicio, fim, None, VENDAS_PAGINA, colunas=COLUNAS_VENDA, crescente=True
+        ):
+            vendas.extend(pagina)
+        return vendas
+    
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("*")\
-            .eq("data", data_filtro.isoformat())\
-            .order("created_at", desc=False)\
-            .execute()
-        
-        return response.data
+        return await _listagem_versionada(
+            supabase, inicio, fim, if_none_match, response, ("dia", data_filtro, desde), buscar
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar vendas: {str(e)}")
 
 
-@router.get("/vendas/mes/{mes_ano}", response_model=List[VendaResponse])
-async def listar_vendas_mes(mes_ano: str):
+@router.get("/vendas/mes/{mes_ano}", response_model=Union[List[VendaResponse], VendasDeltaResponse])
+async def listar_vendas_mes(
+    mes_ano: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=VENDAS_PAGINA, description="Tamanho da página (paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor do header X-Proximo-Cursor da página anterior"),
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="json ou ndjson (streaming)"),
+    desde: Optional[datetime] = Query(None, description="Só as alterações desde o X-Proximo-Desde anterior"),
+    if_none_match: Optional[str] = Header(None),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
-    Lista todas as vendas de um mês específico.
+    Lista as vendas de um mês específico.
     Formato mes_ano: YYYY-MM (exemplo: 2026-01)
+    
+    - Sem `limit`/`cursor`: retorna o mês inteiro (buscado em páginas, sem
+      truncamento pelo limite de linhas do PostgREST).
+    - Com `limit` e/ou `cursor`: retorna uma página; se houver mais vendas,
+      o cursor da próxima página vem no header X-Proximo-Cursor.
+    - `formato=ndjson`: uma venda por linha; o mês inteiro é transmitido
+      conforme as páginas chegam do banco, com uso de memória constante.
+      Com `limit`/`cursor`, também só uma página, com X-Proximo-Cursor.
+    - Com `If-None-Match` igual ao ETag da última resposta (json): 304 se
+      nada mudou no mês.
+    - Com `desde` (header X-Proximo-Desde da resposta anterior): retorna só
+      as vendas criadas ou alteradas e os ids das excluídas desde então.
     """
     try:
-        supabase = get_supabase_client()
+        inicio, fim = periodos.mes(mes_ano).limites()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use YYYY-MM (exemplo: 2026-01)")
+    
+    try:
+        posicao = _decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    if desde is not None and (limit is not None or cursor is not None or formato != "json"):
+        raise HTTPException(status_code=400, detail="desde não pode ser combinado com limit, cursor ou formato=ndjson")
+    
+    async def buscar():
+        if desde is not None:
+            return await _delta_vendas(supabase, inicio, fim, desde)
         
-        datetime.strptime(mes_ano, "%Y-%m")
+        if limit is None and posicao is None:
+            vendas = []
+            async for pagina in _paginas_vendas(supabase, inicio, fim, None, VENDAS_PAGINA, colunas=COLUNAS_VENDA):
+                vendas.extend(pagina)
+            return vendas
         
-        response = supabase.table("vendas")\
-            .select("*")\
-            .gte("data", f"{mes_ano}-01")\
-            .lt("data", f"{mes_ano}-32")\
-            .order("data", desc=True)\
-            .order("created_at", desc=False)\
-            .execute()
+        tamanho = limit or VENDAS_PAGINA
+        pagina = await _pagina_vendas(supabase, inicio, fim, posicao, tamanho, colunas=COLUNAS_VENDA)
+        if len(pagina) == tamanho:
+            response.headers["X-Proximo-Cursor"] = _codificar_cursor(pagina[-1])
+        return pagina
+    
+    try:
+        if formato == "ndjson":
+            if limit is not None or posicao is not None:
+                pagina = await buscar()
+                return StreamingResponse(
+                    _ndjson_vendas(pagina), media_type="application/x-ndjson", headers=dict(response.headers)
+                )
+            paginas = _paginas_vendas(supabase, inicio, fim, None, VENDAS_PAGINA, colunas=COLUNAS_VENDA)
+            # Busca a primeira página antes de responder, para que erros do
+            # banco ainda virem HTTP 500
+            primeira = await paginas.__anext__()
+            return StreamingResponse(_ndjson_vendas(primeira, paginas), media_type="application/x-ndjson")
         
-        return response.data
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Formato inválido. Use YYYY-MM (exemplo: 2026-01)")
+        return await _listagem_versionada(
+            supabase, inicio, fim, if_none_match, response, ("mes", mes_ano, limit, cursor, desde), buscar
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar vendas: {str(e)}")
 
 
+@router.get("/vendas/export")
+async def exportar_vendas(
+    inicio: date = Query(..., description="Data inicial (inclusive)"),
+    fim: date = Query(..., description="Data final (inclusive)"),
+    formato: str = Query("csv", pattern="^(csv|parquet)$", description="csv ou parquet"),
+    incluir_categoria: bool = Query(False, description="Incluir a categoria do produto"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Exporta as vendas de um período como arquivo CSV ou Parquet.
+    O arquivo é gerado e transmitido página a página (ordem: data,
+    created_at), com memória constante mesmo para vários anos.
+    Parquet requer o pacote opcional pyarrow.
+    """
+    try:
+        inicio, fim = periodos.entre(inicio, fim).limites()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Data final anterior à data inicial")
+    
+    if formato == "parquet" and not parquet_disponivel():
+        raise HTTPException(status_code=501, detail="Exportação Parquet indisponível: instale o pacote pyarrow")
+    
+    colunas = COLUNAS_EXPORTACAO + (["categoria"] if incluir_categoria else [])
+    paginas = _paginas_vendas(
+        supabase, inicio, fim, None, VENDAS_PAGINA,
+        origem="vendas_completas" if incluir_categoria else "vendas",
+        colunas=",".join(colunas),
+        crescente=True
+    )
+    
+    try:
+        # Busca a primeira página antes de responder, para que erros do
+        # banco ainda virem HTTP 500
+        primeira = await paginas.__anext__()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao exportar vendas: {str(e)}")
+    
+    async def todas_paginas():
+        yield primeira
+        async for pagina in paginas:
+            yield pagina
+    
+    nome = f"vendas_{inicio.isoformat()}_{fim.isoformat()}.{formato}"
+    if formato == "parquet":
+        corpo, media_type = parquet_vendas(todas_paginas(), colunas), "application/vnd.apache.parquet"
+    else:
+        corpo, media_type = csv_vendas(todas_paginas(), colunas), "text/csv"
+    
+    return StreamingResponse(
+        corpo,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'}
+    )
+
+
+@router.get("/vendas/stream")
+async def acompanhar_vendas(
+    data: Optional[date] = Query(None, description="Dia acompanhado (padrão: hoje)"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Acompanha as vendas de um dia ao vivo (server-sent events), em vez de
+    consultar /vendas e /vendas/total/dia periodicamente.
+    
+    - `event: total`: total do dia (ao conectar e a cada ressincronização)
+    - `event: venda`: `{"tipo": "criada"|"atualizada"|"excluida", "venda",
+      "total"}` a cada escrita, já com o total atualizado
+    - `: ping` a cada VENDAS_STREAM_HEARTBEAT segundos sem eventos
+    
+    O total é mantido em memória pelo servidor; um cliente parado não gera
+    consultas ao banco.
+    """
+    dia = data or date.today()
+    
+    async def carregar(dia: date) -> List[dict]:
+        vendas = []
+        async for pagina in _paginas_vendas(
+            supabase, dia, dia, None, VENDAS_PAGINA,
+            colunas="id,data,created_at,preco,quantidade", crescente=True
+        ):
+            vendas.extend(pagina)
+        return vendas
+    
+    try:
+        assinante = await canal_vendas.assinar(dia, carregar)
+    except LimiteAssinantes:
+        raise HTTPException(status_code=503, detail="Limite de conexões de acompanhamento atingido")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao carregar vendas: {str(e)}")
+    
+    return StreamingResponse(
+        canal_vendas.transmitir(dia, assinante, carregar),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/vendas", response_model=VendaResponse, status_code=201)
-async def criar_venda(venda: VendaCreate):
+async def criar_venda(
+    venda: VendaCreate,
+    response: Response,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Cria uma nova venda.
-    Valida se a data não é futura.
+    Valida se a data não é futura. Várias unidades do mesmo item e preço
+    são uma única venda com quantidade > 1.
+    Com `id` gerado pelo cliente, reenviar a venda (ex.: depois de um
+    timeout) retorna a venda já gravada com status 200, sem duplicá-la.
     """
     hoje = date.today()
     if venda.data > hoje:
@@ -72,44 +633,119 @@ async def criar_venda(venda: VendaCreate):
         )
     
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .insert({
-                "data": venda.data.isoformat(),
-                "item": venda.item,
-                "preco": float(venda.preco)
-            })\
-            .execute()
+        if venda.id is None:
+            resultado = await supabase.table("vendas")\
+                .insert(_venda_para_linha(venda))\
+                .execute()
+        else:
+            # ON CONFLICT (id) DO NOTHING: um reenvio não cria outra linha
+            resultado = await supabase.table("vendas")\
+                .upsert(_venda_para_linha(venda), on_conflict="id", ignore_duplicates=True)\
+                .execute()
+            if not resultado.data:
+                existente = await supabase.table("vendas")\
+                    .select("*")\
+                    .eq("id", str(venda.id))\
+                    .execute()
+                if not existente.data:
+                    raise HTTPException(status_code=500, detail="Erro ao criar venda")
+                response.status_code = 200
+                return existente.data[0]
         
-        if not response.data:
+        if not resultado.data:
             raise HTTPException(status_code=500, detail="Erro ao criar venda")
         
-        return response.data[0]
+        invalidar_vendas(venda.data)
+        canal_vendas.registrar("criada", resultado.data[0])
+        return resultado.data[0]
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao criar venda: {str(e)}")
 
 
+@router.post("/vendas/lote", response_model=LoteVendasResponse)
+async def criar_vendas_lote(
+    vendas: List[Dict[str, Any]] = Body(..., description="Lista de vendas no formato de VendaCreate"),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Cria várias vendas de uma vez (lançamento do fim do dia).
+    Cada venda é validada individualmente: as inválidas são reportadas em
+    `erros` com sua posição no lote, sem impedir a inserção das demais.
+    """
+    if len(vendas) > VENDAS_LOTE_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote muito grande. Máximo: {VENDAS_LOTE_MAX} vendas"
+        )
+    
+    try:
+        lote = _LoteVendas(supabase)
+        for linha, dados in enumerate(vendas, start=1):
+            await lote.adicionar(linha, dados)
+        
+        return await lote.finalizar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao inserir lote: {str(e)}")
+
+
+@router.post("/vendas/lote/ndjson", response_model=LoteVendasResponse)
+async def criar_vendas_lote_ndjson(
+    request: Request,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Variante em streaming do lote: corpo application/x-ndjson, uma venda
+    JSON por linha. As vendas são validadas e inseridas em blocos conforme
+    o corpo chega, sem carregar a requisição inteira em memória.
+    """
+    try:
+        lote = _LoteVendas(supabase)
+        restante = b""
+        numero = 0
+        
+        async def processar(conteudo: bytes) -> None:
+            nonlocal numero
+            numero += 1
+            if not conteudo.strip():
+                return
+            try:
+                dados = json.loads(conteudo)
+            except ValueError:
+                lote.total += 1
+                lote.erros.append({"linha": numero, "erro": "JSON inválido"})
+                return
+            await lote.adicionar(numero, dados)
+        
+        async for pedaco in request.stream():
+            *linhas, restante = (restante + pedaco).split(b"\n")
+            for conteudo in linhas:
+                await processar(conteudo)
+        await processar(restante)
+        
+        return await lote.finalizar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao inserir lote: {str(e)}")
+
+
 @router.put("/vendas/{venda_id}", response_model=VendaResponse)
-async def atualizar_venda(venda_id: str, venda: VendaUpdate):
+async def atualizar_venda(
+    venda_id: str,
+    venda: VendaUpdate,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Atualiza uma venda existente.
     Apenas campos fornecidos serão atualizados.
     """
     try:
-        supabase = get_supabase_client()
-        
-        update_data = {}
-        if venda.item is not None:
-            update_data["item"] = venda.item
-        if venda.preco is not None:
-            update_data["preco"] = float(venda.preco)
+        update_data = _campos_atualizacao(venda)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
         
-        response = supabase.table("vendas")\
+        response = await supabase.table("vendas")\
             .update(update_data)\
             .eq("id", venda_id)\
             .execute()
@@ -117,6 +753,8 @@ async def atualizar_venda(venda_id: str, venda: VendaUpdate):
         if not response.data:
             raise HTTPException(status_code=404, detail="Venda não encontrada")
         
+        invalidar_vendas(response.data[0]["data"])
+        canal_vendas.registrar("atualizada", response.data[0])
         return response.data[0]
     except HTTPException:
         raise
@@ -125,13 +763,15 @@ async def atualizar_venda(venda_id: str, venda: VendaUpdate):
 
 
 @router.delete("/vendas/{venda_id}", status_code=204)
-async def deletar_venda(venda_id: str):
+async def deletar_venda(
+    venda_id: str,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Deleta uma venda permanentemente.
     """
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
+        response = await supabase.table("vendas")\
             .delete()\
             .eq("id", venda_id)\
             .execute()
@@ -139,6 +779,8 @@ async def deletar_venda(venda_id: str):
         if not response.data:
             raise HTTPException(status_code=404, detail="Venda não encontrada")
         
+        invalidar_vendas(response.data[0]["data"])
+        canal_vendas.registrar("excluida", response.data[0])
         return None
     except HTTPException:
         raise
@@ -146,57 +788,157 @@ async def deletar_venda(venda_id: str):
         raise HTTPException(status_code=500, detail=f"Erro ao deletar venda: {str(e)}")
 
 
+# ==================== SINCRONIZAÇÃO OFFLINE ====================
+# O balcão registra as operações numa fila local quando a rede falha e as
+# envia em lote. Os conflitos são resolvidos no banco por "última escrita
+# vence" sobre alterado_em (migrations/0005_sincronizacao.sql).
+
+def _operacao_para_rpc(dados: Any, hoje: date, limite: datetime) -> Tuple[OperacaoSync, dict]:
+    """Valida uma operação do lote e a converte no formato de sincronizar_vendas"""
+    operacao = OperacaoSync.model_validate(dados)
+    alterado_em = operacao.alterado_em
+    if alterado_em.tzinfo is None:
+        alterado_em = alterado_em.replace(tzinfo=timezone.utc)
+    if alterado_em > limite:
+        raise ValueError("alterado_em está no futuro (relógio do aparelho adiantado?)")
+
+    registro = {"op": operacao.op, "id": str(operacao.id), "alterado_em": alterado_em.isoformat()}
+    if operacao.op == "criar":
+        venda = VendaCreate.model_validate({**(operacao.venda or {}), "id": None})
+        if venda.data > hoje:
+            raise ValueError(f"Data não pode ser futura. Data máxima: {hoje.isoformat()}")
+        registro["venda"] = _venda_para_linha(venda)
+    elif operacao.op == "atualizar":
+        campos = _campos_atualizacao(VendaUpdate.model_validate(operacao.venda or {}))
+        if not campos:
+            raise ValueError("Nenhum campo para atualizar")
+        registro["venda"] = campos
+    return operacao, registro
+
+
+@router.post("/sync", response_model=SyncResponse)
+async def sincronizar_vendas(
+    operacoes: List[Dict[str, Any]] = Body(
+        ...,
+        description="Operações da fila local (formato de OperacaoSync), na ordem em que aconteceram"
+    ),
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
+    """
+    Sincroniza as vendas registradas offline no balcão.
+    Cada operação (criar, atualizar ou excluir) traz o id da venda, gerado
+    pelo cliente, e o instante em que aconteceu no aparelho. O lote é
+    aplicado em ordem, em chamadas ao banco de até SYNC_CHUNK operações; em
+    conflito vence a escrita mais recente, e reenviar um lote já aplicado não muda nada (as
+    operações voltam como ignoradas). Operações inválidas são reportadas
+    em `erros` com sua posição, sem impedir as demais.
+    """
+    if len(operacoes) > SYNC_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote muito grande. Máximo: {SYNC_MAX} operações"
+        )
+    
+    hoje = date.today()
+    limite = datetime.now(timezone.utc) + timedelta(seconds=SYNC_TOLERANCIA_RELOGIO)
+    validas, erros = [], []
+    for linha, dados in enumerate(operacoes, start=1):
+        try:
+            operacao, registro = _operacao_para_rpc(dados, hoje, limite)
+        except ValidationError as e:
+            erros.append({"linha": linha, "erro": _descrever_erro_validacao(e)})
+            continue
+        except ValueError as e:
+            erros.append({"linha": linha, "erro": str(e)})
+            continue
+        validas.append((linha, operacao, registro))
+    
+    try:
+        resultados = []
+        for inicio in range(0, len(validas), SYNC_CHUNK):
+            bloco = validas[inicio:inicio + SYNC_CHUNK]
+            builder = await supabase.rpc("sincronizar_vendas", {
+                "p_operacoes": [registro for _, _, registro in bloco]
+            })
+            response = await builder.execute()
+            
+            eventos = []
+            for resultado in response.data:
+                linha, operacao, _ = bloco[resultado["posicao"] - 1]
+                for data in resultado["datas"] or []:
+                    invalidar_vendas(data)
+                if resultado["status"] == "aplicada":
+                    if operacao.op == "excluir":
+                        eventos.append(("excluida", {"id": str(operacao.id)}))
+                    else:
+                        tipo = "criada" if operacao.op == "criar" else "atualizada"
+                        eventos.append((tipo, resultado["venda"]))
+                resultados.append({
+                    "linha": linha,
+                    "id": operacao.id,
+                    "op": operacao.op,
+                    "status": resultado["status"],
+                    "venda": resultado["venda"]
+                })
+            canal_vendas.registrar_lote(eventos)
+        
+        return {
+            "total": len(operacoes),
+            "aplicadas": sum(1 for r in resultados if r["status"] == "aplicada"),
+            "ignoradas": sum(1 for r in resultados if r["status"] != "aplicada"),
+            "erros": erros,
+            "resultados": resultados
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao sincronizar: {str(e)}")
+
+
 @router.get("/vendas/total/dia/{data}", response_model=TotalDiarioResponse)
-async def obter_total_dia(data: date):
+async def obter_total_dia(
+    data: date,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Retorna o total faturado e quantidade de itens vendidos em um dia específico.
+    Lê da consolidação diária (vendas_diarias).
     """
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("preco")\
-            .eq("data", data.isoformat())\
-            .execute()
-        
-        vendas = response.data
-        total = sum(float(v["preco"]) for v in vendas)
-        quantidade = len(vendas)
+        por_dia = await agrupar_periodo(supabase, "data", *periodos.dia(data).limites())
+        stats = por_dia.get(data.isoformat(), {"centavos": 0, "quantidade": 0})
         
         return {
             "data": data,
-            "total_faturado": total,
-            "quantidade_itens": quantidade
+            "total_faturado": para_reais(stats["centavos"]),
+            "quantidade_itens": stats["quantidade"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular total: {str(e)}")
 
 
 @router.get("/vendas/total/mes/{mes_ano}", response_model=TotalMensalResponse)
-async def obter_total_mes(mes_ano: str):
+async def obter_total_mes(
+    mes_ano: str,
+    supabase: AsyncPooledPostgrestClient = Depends(get_supabase_client)
+):
     """
     Retorna o total faturado e quantidade de itens vendidos em um mês específico.
     Formato: YYYY-MM (exemplo: 2026-01)
+    Lê da consolidação diária (vendas_diarias).
     """
     try:
-        datetime.strptime(mes_ano, "%Y-%m")
-        
-        supabase = get_supabase_client()
-        response = supabase.table("vendas")\
-            .select("preco")\
-            .gte("data", f"{mes_ano}-01")\
-            .lt("data", f"{mes_ano}-32")\
-            .execute()
-        
-        vendas = response.data
-        total = sum(float(v["preco"]) for v in vendas)
-        quantidade = len(vendas)
+        inicio, fim = periodos.mes(mes_ano).limites()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use YYYY-MM")
+    
+    try:
+        por_dia = await agrupar_periodo(supabase, "data", inicio, fim)
+        total = sum(s["centavos"] for s in por_dia.values())
+        quantidade = sum(s["quantidade"] for s in por_dia.values())
         
         return {
             "mes": mes_ano,
-            "total_faturado": total,
+            "total_faturado": para_reais(total),
             "quantidade_itens": quantidade
         }
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Formato inválido. Use YYYY-MM")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular total: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Benchmark e verificação da agregação de analytics: função SQL via RPC contra
+o fallback em Python sobre as linhas brutas. Para cada endpoint confere que
+os dois caminhos retornam exatamente o mesmo JSON e mede latência e bytes
+recebidos do banco.
+
+O stub trunca selects e RPCs em --max-linhas linhas (o db-max-rows do
+PostgREST), abaixo do número de dias do período: os dois caminhos só
+batem se lerem todas as páginas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_agregacao --vendas 50000 --repeticoes 5
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir, percentil
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+def _endpoints(hoje: date):
+    inicio = (hoje - timedelta(days=364)).isoformat()
+    periodo = f"data_inicio={inicio}&data_fim={hoje.isoformat()}"
+    return [
+        f"/api/v1/analytics/mais-vendidos?{periodo}&limit=50",
+        f"/api/v1/analytics/faturamento-diario?mes_ano={hoje.strftime('%Y-%m')}",
+        f"/api/v1/analytics/vendas-por-categoria?{periodo}",
+        "/api/v1/analytics/comparativo-mensal?quantidade_meses=12",
+        f"/api/v1/analytics/estatisticas-gerais?{periodo}",
+        f"/api/v1/analytics/tendencia-semanal?{periodo}",
+        f"/api/v1/analytics/dashboard?{periodo}",
+    ]
+
+
+async def _medir(client, stub, caminho: str, repeticoes: int):
+    latencias = []
+    bytes_antes = stub.bytes_enviados
+    corpo = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = await client.get(caminho)
+        latencias.append(time.perf_counter() - inicio)
+        resposta.raise_for_status()
+        corpo = resposta.json()
+    return corpo, {
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "bytes_do_banco": (stub.bytes_enviados - bytes_antes) // repeticoes,
+    }
+
+
+async def _executar(stub, repeticoes: int) -> dict:
+    from app import agregacoes
+    from app.database import close_supabase_client
+    from app.main import app
+
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api") as client:
+        for caminho in _endpoints(date.today()):
+            agregacoes.AGREGACAO_SQL = True
+            corpo_sql, sql = await _medir(client, stub, caminho, repeticoes)
+            agregacoes.AGREGACAO_SQL = False
+            corpo_python, python = await _medir(client, stub, caminho, repeticoes)
+
+            if corpo_sql != corpo_python:
+                raise AssertionError(f"Resultados divergentes em {caminho}:\n{corpo_sql}\n{corpo_python}")
+
+            resultados[caminho.split("?")[0]] = {"identicos": True, "sql": sql, "python": python}
+    await close_supabase_client()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendas", type=int, default=50000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--max-linhas", type=int, default=100)
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub(max_linhas=args.max_linhas)
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=365)
+
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        # Sem o cache de analytics: o caminho em Python tem de ser executado
+        os.environ.setdefault("ANALYTICS_CACHE_TTL", "0")
+        os.environ.setdefault("ANALYTICS_PAGINA", str(args.max_linhas))
+        resultados = asyncio.run(_executar(stub, args.repeticoes))
+
+    imprimir({"benchmark": "agregacao", "vendas": args.vendas, "resultados": resultados})
+
+
+if __name__ == "__main__":
+    main()
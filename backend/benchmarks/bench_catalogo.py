@@ -0,0 +1,127 @@
+"""
+Benchmark da carga do catálogo: N produtos um a um via POST
+/api/v1/produtos contra um único POST /api/v1/produtos/importar (upserts
+em blocos), a reimportação com atualizar=true/false e a corrida de
+criações simultâneas com o mesmo nome (só uma pode vencer). Confere que o
+catálogo em memória tem todos os produtos mesmo acima do max-rows do stub.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_catalogo --produtos 2000 --latencia-ms 5
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+def _gerar_produtos(quantidade: int, prefixo: str, preco: float = 4.5):
+    return [
+        {"nome": f"{prefixo} {i}", "categoria": f"Categoria {i % 12}", "preco_padrao": preco}
+        for i in range(quantidade)
+    ]
+
+
+def _resultado(quantidade: int, duracao: float, requisicoes_banco: int) -> dict:
+    return {
+        "segundos": round(duracao, 3),
+        "produtos_por_segundo": round(quantidade / duracao, 1),
+        "requisicoes_ao_banco": requisicoes_banco,
+    }
+
+
+async def _executar(stub, quantidade: int, concorrentes: int) -> dict:
+    from app.database import close_supabase_client
+    from app.main import app
+
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=120) as client:
+        produtos = _gerar_produtos(quantidade, "Avulso")
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        for produto in produtos:
+            (await client.post("/api/v1/produtos", json=produto)).raise_for_status()
+        resultados["um_a_um"] = _resultado(quantidade, time.perf_counter() - inicio, stub.requisicoes - antes)
+
+        produtos = _gerar_produtos(quantidade, "Importado")
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        resposta = await client.post("/api/v1/produtos/importar", json=produtos)
+        resposta.raise_for_status()
+        resultados["importacao"] = _resultado(quantidade, time.perf_counter() - inicio, stub.requisicoes - antes)
+        resultados["importacao"]["gravados"] = resposta.json()["gravados"]
+
+        # Reajuste de preços: mesmo arquivo com outro preço
+        produtos = _gerar_produtos(quantidade, "Importado", preco=5.0)
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        resposta = await client.post("/api/v1/produtos/importar", json=produtos)
+        resposta.raise_for_status()
+        resultados["reimportacao_atualizar"] = _resultado(quantidade, time.perf_counter() - inicio, stub.requisicoes - antes)
+        resultados["reimportacao_atualizar"]["gravados"] = resposta.json()["gravados"]
+
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        resposta = await client.post("/api/v1/produtos/importar", params={"atualizar": "false"}, json=produtos)
+        resposta.raise_for_status()
+        resultados["reimportacao_ignorar"] = _resultado(quantidade, time.perf_counter() - inicio, stub.requisicoes - antes)
+        resultados["reimportacao_ignorar"]["ignorados"] = resposta.json()["ignorados"]
+
+        # Catálogo maior que o max-rows do stub: a cópia em memória tem de
+        # ter todos os produtos, e um produto gravado por outro processo
+        # (direto no banco) é encontrado sem esperar a recarga
+        listados = (await client.get("/api/v1/produtos", params={"apenas_ativos": "false"})).json()
+        externo = {
+            "id": str(uuid.uuid4()), "nome": "Criado por outro worker", "categoria": None,
+            "preco_padrao": 1.0, "ativo": True, "created_at": listados[0]["created_at"],
+            "updated_at": listados[0]["updated_at"],
+        }
+        stub.tabelas["produtos"].append(externo)
+        resposta_externo = await client.get(f"/api/v1/produtos/{externo['id']}")
+        resultados["catalogo_completo"] = {
+            "no_banco": len(stub.tabelas["produtos"]) - 1,
+            "em_memoria": len(listados),
+            "produto_externo_status": resposta_externo.status_code,
+        }
+        assert len(listados) == len(stub.tabelas["produtos"]) - 1, "Catálogo em memória truncado"
+        assert resposta_externo.status_code == 200, resposta_externo.text
+
+        respostas = await asyncio.gather(*[
+            client.post("/api/v1/produtos", json={"nome": "Disputado", "preco_padrao": 3})
+            for _ in range(concorrentes)
+        ])
+        status = [r.status_code for r in respostas]
+        resultados["corrida_mesmo_nome"] = {
+            "requisicoes": concorrentes,
+            "criados": status.count(201),
+            "recusados": status.count(400),
+            "no_banco": sum(1 for p in stub.tabelas["produtos"] if p["nome"] == "Disputado"),
+        }
+    await close_supabase_client()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--produtos", type=int, default=2000)
+    parser.add_argument("--concorrentes", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=5.0, help="Latência simulada do stub")
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        resultados = asyncio.run(_executar(stub, args.produtos, args.concorrentes))
+
+    imprimir({
+        "benchmark": "catalogo",
+        "produtos": args.produtos,
+        "latencia_stub_ms": args.latencia_ms,
+        "resultados": resultados,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark do agrupamento em Python das vendas: laço por linha
+(agregacoes.agrupar_linhas) contra o motor colunar com NumPy
+(colunar.VendasColunares). Gera vendas sintéticas no formato retornado
+pelo PostgREST, confere que os dois caminhos chegam aos mesmos grupos e
+mede o tempo de cada um, separando a conversão para colunas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_colunar --vendas 1000000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from .common import imprimir
+from .postgrest_stub import ITENS
+
+DIMENSOES = ("item", "data", "mes", "dia_semana", "categoria")
+
+
+def _gerar(quantidade: int, dias: int, seed: int = 42):
+    rng = random.Random(seed)
+    inicio = date.today() - timedelta(days=dias - 1)
+    datas = [(inicio + timedelta(days=d)).isoformat() for d in range(dias)]
+    return [
+        {
+            "data": rng.choice(datas),
+            "item": nome,
+            "categoria": categoria,
+            "preco": preco,
+            "quantidade": rng.choice((1, 1, 1, 2, 3)),
+        }
+        for nome, categoria, preco in (rng.choice(ITENS) for _ in range(quantidade))
+    ]
+
+
+def _medir(funcao, repeticoes: int):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, round(min(tempos) * 1000, 1)
+
+
+def main():
+    from app.agregacoes import agrupar_linhas
+    from app.colunar import VendasColunares, numpy_disponivel
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendas", type=int, default=1000000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    if not numpy_disponivel():
+        raise SystemExit("O motor colunar requer o pacote numpy")
+
+    linhas = _gerar(args.vendas, args.dias)
+
+    laco, laco_ms = _medir(lambda: agrupar_linhas(linhas, DIMENSOES), args.repeticoes)
+    colunas, conversao_ms = _medir(lambda: VendasColunares.de_linhas(linhas, com_categoria=True), args.repeticoes)
+    colunar, agrupamento_ms = _medir(lambda: colunas.agrupar(DIMENSOES), args.repeticoes)
+
+    if laco != colunar:
+        raise AssertionError("Agrupamentos divergentes entre o laço e o motor colunar")
+
+    total_ms = conversao_ms + agrupamento_ms
+    imprimir({
+        "benchmark": "colunar",
+        "vendas": args.vendas,
+        "dimensoes": list(DIMENSOES),
+        "identicos": True,
+        "laco_ms": laco_ms,
+        "colunar": {
+            "conversao_ms": conversao_ms,
+            "agrupamento_ms": agrupamento_ms,
+            "total_ms": round(total_ms, 1),
+        },
+        "aceleracao": round(laco_ms / total_ms, 1),
+    })
+
+
+if __name__ == "__main__":
+    main()
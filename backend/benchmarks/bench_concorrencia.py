@@ -0,0 +1,70 @@
+"""
+Benchmark de concorrência: dispara GET /api/v1/vendas em paralelo contra um
+único worker uvicorn e mede como o throughput escala com a concorrência.
+O stub simula a latência de rede do Supabase, então um worker que bloqueia
+o event loop fica limitado a ~1/latência requisições por segundo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_concorrencia --latencia-ms 20 --niveis 1,10,50,200
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+import httpx
+
+from .common import configurar_ambiente, imprimir, resumo_latencias
+from .postgrest_stub import STUB_KEY, servir_asgi, servir_stub_processo
+
+
+async def _rodada(url: str, caminho: str, requisicoes: int, concorrencia: int) -> dict:
+    semaforo = asyncio.Semaphore(concorrencia)
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as client:
+        async def medir():
+            async with semaforo:
+                inicio = time.perf_counter()
+                resposta = await client.get(caminho)
+                resposta.raise_for_status()
+                return time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        latencias = await asyncio.gather(*(medir() for _ in range(requisicoes)))
+        return resumo_latencias(latencias, time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--niveis", default="1,10,50,200", help="Níveis de concorrência")
+    parser.add_argument("--vendas", type=int, default=1000)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latência simulada do stub")
+    parser.add_argument("--porta-stub", type=int, default=54321)
+    parser.add_argument("--porta-api", type=int, default=8765)
+    args = parser.parse_args()
+
+    caminho = f"/api/v1/vendas?data_filtro={date.today().isoformat()}"
+
+    resultados = {}
+    with servir_stub_processo(args.porta_stub, args.latencia_ms / 1000, args.vendas) as url_stub:
+        configurar_ambiente(url_stub, STUB_KEY)
+        from app.main import app
+
+        with servir_asgi(app, args.porta_api, lifespan="on") as url_api:
+            for nivel in (int(n) for n in args.niveis.split(",")):
+                resultados[f"concorrencia_{nivel}"] = asyncio.run(
+                    _rodada(url_api, caminho, args.requisicoes, nivel)
+                )
+
+    imprimir({
+        "benchmark": "concorrencia",
+        "endpoint": "GET /api/v1/vendas",
+        "latencia_stub_ms": args.latencia_ms,
+        "resultados": resultados,
+    })
+
+
+if __name__ == "__main__":
+    main()
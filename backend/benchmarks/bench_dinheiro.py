@@ -0,0 +1,131 @@
+"""
+Somas de dinheiro em centavos inteiros contra floats.
+
+1. Propriedade: para muitos conjuntos aleatórios de vendas (preços com 2
+   casas, como chegam do PostgREST), a soma em centavos de
+   agregacoes.agrupar_linhas e do motor colunar é exatamente igual à soma
+   com Decimal. Conta também quantas vezes a soma em float diverge.
+2. Desempenho: soma de 1M de vendas em float (laço antigo), em centavos
+   (laço) e em centavos com NumPy, e o erro acumulado da soma em float.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_dinheiro --vendas 1000000 --casos 2000
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from .common import imprimir
+
+
+def _vendas(rng: random.Random, quantidade: int):
+    """Preços como floats do JSON (até R$ 999,99) e quantidades de 1 a 5"""
+    return [
+        {
+            "data": "2026-01-15",
+            "item": "Item",
+            "preco": rng.randrange(1, 100000) / 100,
+            "quantidade": rng.randrange(1, 6),
+        }
+        for _ in range(quantidade)
+    ]
+
+
+def _exato(linhas) -> Decimal:
+    return sum((Decimal(str(v["preco"])) * v["quantidade"] for v in linhas), Decimal(0))
+
+
+def _soma_float(linhas) -> float:
+    total = 0.0
+    for v in linhas:
+        total += float(v["preco"]) * v["quantidade"]
+    return total
+
+
+def _soma_centavos(linhas) -> int:
+    from app.dinheiro import para_centavos
+
+    total = 0
+    for v in linhas:
+        total += para_centavos(v["preco"]) * v["quantidade"]
+    return total
+
+
+def _propriedade(casos: int, seed: int) -> dict:
+    from app.agregacoes import agrupar_linhas
+    from app.colunar import VendasColunares, numpy_disponivel
+
+    rng = random.Random(seed)
+    divergencias_float = 0
+    divergencias_float_arredondado = 0
+    for _ in range(casos):
+        linhas = _vendas(rng, rng.randrange(1, 2000))
+        esperado = int(_exato(linhas) * 100)
+
+        centavos = agrupar_linhas(linhas, ("data",))["data"]["2026-01-15"]["centavos"]
+        if centavos != esperado:
+            raise AssertionError(f"Soma em centavos inexata: {centavos} != {esperado}")
+        if numpy_disponivel():
+            colunar = VendasColunares.de_linhas(linhas).agrupar(("data",))["data"]["2026-01-15"]["centavos"]
+            if colunar != esperado:
+                raise AssertionError(f"Soma colunar inexata: {colunar} != {esperado}")
+
+        total_float = _soma_float(linhas)
+        divergencias_float += Decimal(total_float) != Decimal(esperado) / 100
+        divergencias_float_arredondado += round(total_float, 2) != esperado / 100
+
+    return {
+        "casos": casos,
+        "centavos_exatos": True,
+        "float_inexato": divergencias_float,
+        "float_inexato_apos_round": divergencias_float_arredondado,
+    }
+
+
+def _medir(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return round(min(tempos) * 1000, 1)
+
+
+def _desempenho(quantidade: int, repeticoes: int, seed: int) -> dict:
+    from app.colunar import VendasColunares, numpy_disponivel
+
+    linhas = _vendas(random.Random(seed), quantidade)
+    exato = _exato(linhas)
+    resultado = {
+        "float_laco_ms": _medir(lambda: _soma_float(linhas), repeticoes),
+        "float_erro_reais": str(Decimal(_soma_float(linhas)) - exato),
+        "centavos_laco_ms": _medir(lambda: _soma_centavos(linhas), repeticoes),
+    }
+    if numpy_disponivel():
+        colunas = VendasColunares.de_linhas(linhas)
+        resultado["centavos_numpy_ms"] = _medir(lambda: int((colunas.centavos * colunas.quantidades).sum()), repeticoes)
+        resultado["centavos_numpy_com_conversao_ms"] = _medir(
+            lambda: VendasColunares.de_linhas(linhas).agrupar(("data",)), repeticoes
+        )
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendas", type=int, default=1000000)
+    parser.add_argument("--casos", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    imprimir({
+        "benchmark": "dinheiro",
+        "propriedade": _propriedade(args.casos, args.seed),
+        "vendas": args.vendas,
+        "desempenho": _desempenho(args.vendas, args.repeticoes, args.seed),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark da exportação de vendas (GET /api/v1/vendas/export): baixa o
+período inteiro em CSV e Parquet via streaming e mede linhas por segundo
+e o pico de memória (RSS) do processo da API. Cada formato roda em um
+processo próprio, para que o pico de um não contamine o outro; o stub
+roda em um terceiro processo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_exportacao --vendas 200000 --dias 1095
+"""
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import STUB_KEY, servir_asgi, servir_stub_processo
+
+
+def _rss_mb() -> float:
+    # ru_maxrss é em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _baixar(url: str, params: dict) -> dict:
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+        inicio = time.perf_counter()
+        tamanho = 0
+        async with client.stream("GET", "/api/v1/vendas/export", params=params) as resposta:
+            resposta.raise_for_status()
+            async for parte in resposta.aiter_bytes():
+                tamanho += len(parte)
+        return {"segundos": time.perf_counter() - inicio, "bytes": tamanho}
+
+
+def _medir_formato(url_stub: str, porta: int, params: dict, fila) -> None:
+    configurar_ambiente(url_stub, STUB_KEY)
+    from app.main import app
+
+    if params["formato"] == "parquet":
+        # Carrega o pyarrow antes da medida base: o pico reflete só a exportação
+        import pyarrow.parquet  # noqa: F401
+
+    with servir_asgi(app, porta, lifespan="on") as url_api:
+        rss_base = _rss_mb()
+        fila.put((asyncio.run(_baixar(url_api, params)), rss_base, _rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendas", type=int, default=200000)
+    parser.add_argument("--dias", type=int, default=1095)
+    parser.add_argument("--formatos", default="csv,parquet")
+    parser.add_argument("--porta-stub", type=int, default=54321)
+    parser.add_argument("--porta-api", type=int, default=8765)
+    args = parser.parse_args()
+
+    hoje = date.today()
+    periodo = {"inicio": (hoje - timedelta(days=args.dias - 1)).isoformat(), "fim": hoje.isoformat()}
+
+    resultados = {}
+    with servir_stub_processo(args.porta_stub, vendas=args.vendas, dias=args.dias) as url_stub:
+        for formato in args.formatos.split(","):
+            fila = multiprocessing.Queue()
+            processo = multiprocessing.Process(
+                target=_medir_formato,
+                args=(url_stub, args.porta_api, {**periodo, "formato": formato}, fila)
+            )
+            processo.start()
+            medida, rss_base, rss_pico = fila.get()
+            processo.join()
+
+            resultados[formato] = {
+                "linhas_por_segundo": round(args.vendas / medida["segundos"], 1),
+                "segundos": round(medida["segundos"], 2),
+                "mb_gerados": round(medida["bytes"] / 1024 / 1024, 2),
+                "rss_base_mb": round(rss_base, 1),
+                "rss_pico_mb": round(rss_pico, 1),
+            }
+
+    imprimir({"benchmark": "exportacao", "vendas": args.vendas, "dias": args.dias, "resultados": resultados})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Idempotency-Key nas escritas e coalescência de leituras de analytics.
+
+1. Reenvios: a mesma venda enviada N vezes com a mesma Idempotency-Key
+   (em sequência, como retries, e em paralelo, como cliques repetidos)
+   grava uma única linha e faz uma única chamada ao banco; os reenvios
+   voltam com Idempotent-Replayed: true e o mesmo corpo. A mesma chave
+   com outro corpo recebe 422. Idem para POST /produtos.
+2. Coalescência: N GETs idênticos simultâneos de analytics (sem o cache
+   de respostas) contra N GETs distintos: chamadas ao banco e tempo total.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_idempotencia --vendas 50000 --simultaneos 20
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+async def _reenvios(client, stub, caminho: str, corpos, outro_corpo: dict, tentativas: int) -> dict:
+    """corpos: um para os reenvios em sequência e outro para os paralelos"""
+    linhas_antes = len(stub.tabelas[caminho.rsplit("/", 1)[-1]])
+    requisicoes_antes = stub.requisicoes
+    cabecalho = {"Idempotency-Key": f"teste-{caminho}"}
+
+    sequenciais = [await client.post(caminho, json=corpos[0], headers=cabecalho) for _ in range(tentativas)]
+    paralelos = await asyncio.gather(*(
+        client.post(caminho, json=corpos[1], headers={"Idempotency-Key": f"paralelo-{caminho}"})
+        for _ in range(tentativas)
+    ))
+    conflito = await client.post(caminho, json=outro_corpo, headers=cabecalho)
+
+    for respostas in (sequenciais, paralelos):
+        assert len({r.content for r in respostas}) == 1, "Reenvios com corpos diferentes"
+        assert {r.status_code for r in respostas} == {201}, [r.text for r in respostas]
+        assert sum(r.headers.get("idempotent-replayed") == "true" for r in respostas) == tentativas - 1
+    assert conflito.status_code == 422, conflito.text
+
+    return {
+        "tentativas": tentativas * 2,
+        "linhas_gravadas": len(stub.tabelas[caminho.rsplit("/", 1)[-1]]) - linhas_antes,
+        "chamadas_ao_banco": stub.requisicoes - requisicoes_antes,
+        "mesma_chave_outro_corpo": conflito.status_code,
+    }
+
+
+async def _leituras(client, stub, caminhos) -> dict:
+    requisicoes_antes = stub.requisicoes
+    inicio = time.perf_counter()
+    respostas = await asyncio.gather(*(client.get(c) for c in caminhos))
+    for resposta in respostas:
+        assert resposta.status_code == 200, resposta.text
+    return {
+        "requisicoes": len(caminhos),
+        "chamadas_ao_banco": stub.requisicoes - requisicoes_antes,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+async def _executar(stub, tentativas: int, simultaneos: int) -> dict:
+    from app import agregacoes
+    from app.cache import cache_analytics
+    from app.database import close_supabase_client
+    from app.main import app
+
+    hoje = date.today()
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=120) as client:
+        (await client.get("/api/v1/produtos")).raise_for_status()  # aquece o catálogo
+        resultados["reenvios_vendas"] = await _reenvios(
+            client, stub, "/api/v1/vendas",
+            [{"data": hoje.isoformat(), "item": "Coxinha", "preco": 7.0}] * 2,
+            {"data": hoje.isoformat(), "item": "Coxinha", "preco": 7.5},
+            tentativas,
+        )
+        resultados["reenvios_produtos"] = await _reenvios(
+            client, stub, "/api/v1/produtos",
+            [
+                {"nome": "Pastel", "categoria": "salgado", "preco_padrao": 8.0},
+                {"nome": "Pastel de Queijo", "categoria": "salgado", "preco_padrao": 8.0},
+            ],
+            {"nome": "Pastel", "categoria": "salgado", "preco_padrao": 9.0},
+            tentativas,
+        )
+        assert resultados["reenvios_vendas"]["linhas_gravadas"] == 2 and resultados["reenvios_produtos"]["linhas_gravadas"] == 2
+
+        agregacoes.AGREGACAO_SQL = False
+        inicio = (hoje - timedelta(days=364)).isoformat()
+        base = f"/api/v1/analytics/mais-vendidos?data_inicio={inicio}&data_fim={hoje}"
+        resultados["analytics_identicas"] = await _leituras(client, stub, [f"{base}&limit=10"] * simultaneos)
+        resultados["analytics_distintas"] = await _leituras(
+            client, stub, [f"{base}&limit={i % 50 + 1}" for i in range(simultaneos)]
+        )
+        resultados["coalescidas"] = cache_analytics.estatisticas()["coalescidas"]
+
+    await close_supabase_client()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=50000)
+    parser.add_argument("--tentativas", type=int, default=5)
+    parser.add_argument("--simultaneos", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=365)
+
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        # Sem o cache de respostas: só a coalescência evita as consultas repetidas
+        os.environ["ANALYTICS_CACHE_TTL"] = "0"
+        # As N leituras distintas disputam o pool; com o timeout padrão (5 s)
+        # parte delas falharia por PoolTimeout antes de ser medida
+        os.environ["SUPABASE_POOL_TIMEOUT"] = "120"
+        resultados = asyncio.run(_executar(stub, args.tentativas, args.simultaneos))
+
+    imprimir({"benchmark": "idempotencia", "vendas": args.vendas, **resultados})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Listagens incrementais de vendas: ETag/If-None-Match e ?desde=.
+
+Para o mês (GET /vendas/mes/{mes_ano}) e um dia (GET /vendas) com
+--vendas vendas no mês anterior, compara o que um cliente transfere e
+quantas chamadas ao banco custa cada forma de manter a lista atualizada:
+
+1. recarregar tudo depois de cada alteração (como o frontend fazia);
+2. revalidar com If-None-Match quando nada mudou (304, sem ler as linhas);
+3. buscar só o delta com desde=X-Proximo-Desde depois de algumas vendas
+   criadas, alteradas e excluídas pela API (o valor é colado na URL sem
+   codificar, como faria um cliente simples).
+
+A lista reconstruída pelo cliente (cópia anterior + delta) tem de ser igual
+à lista completa relida. Repete com a função versao_vendas ausente (ETag
+calculado a partir das linhas).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_incremental --vendas 10000
+"""
+import argparse
+import asyncio
+import calendar
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+async def _medir(client, stub, url: str, headers: dict = None):
+    requisicoes_antes = stub.requisicoes
+    resposta = await client.get(url, headers=headers or {})
+    assert resposta.status_code in (200, 304), resposta.text
+    return resposta, {
+        "status": resposta.status_code,
+        "bytes": len(resposta.content),
+        "chamadas_ao_banco": stub.requisicoes - requisicoes_antes,
+    }
+
+
+def _chaves(vendas):
+    return {v["id"]: (v["data"], v["item"], v["preco"], v["quantidade"], v["updated_at"]) for v in vendas}
+
+
+async def _alterar(client, dia: date) -> None:
+    criadas = []
+    for i in range(5):
+        resposta = await client.post("/api/v1/vendas", json={"data": dia.isoformat(), "item": "Coxinha", "preco": 7.5 + i})
+        resposta.raise_for_status()
+        criadas.append(resposta.json()["id"])
+    (await client.put(f"/api/v1/vendas/{criadas[0]}", json={"quantidade": 2})).raise_for_status()
+    (await client.delete(f"/api/v1/vendas/{criadas[1]}")).raise_for_status()
+
+
+async def _cenario(client, stub, url: str, dia: date) -> dict:
+    completa, r_completa = await _medir(client, stub, url)
+    etag, desde = completa.headers["etag"], completa.headers["x-proximo-desde"]
+    local = _chaves(completa.json())
+
+    _, r_304 = await _medir(client, stub, url, {"If-None-Match": etag})
+    assert r_304["status"] == 304, r_304
+
+    await _alterar(client, dia)
+    # Uma venda antiga da mesma lista também é excluída
+    antiga = next(iter(local))
+    (await client.delete(f"/api/v1/vendas/{antiga}")).raise_for_status()
+
+    _, r_obsoleto = await _medir(client, stub, url, {"If-None-Match": etag})
+    assert r_obsoleto["status"] == 200, "ETag não mudou depois das escritas"
+
+    assert desde.endswith("Z"), desde
+    com_desde = f"{url}{'&' if '?' in url else '?'}desde={desde}"
+    delta, r_delta = await _medir(client, stub, com_desde)
+    corpo = delta.json()
+    for venda_id in corpo["excluidas"]:
+        local.pop(venda_id, None)
+    local.update(_chaves(corpo["vendas"]))
+
+    relida, r_relida = await _medir(client, stub, url)
+    assert local == _chaves(relida.json()), "Lista reconstruída pelo delta difere da lista completa"
+
+    _, r_delta_304 = await _medir(client, stub, com_desde, {"If-None-Match": delta.headers["etag"]})
+    assert r_delta_304["status"] == 304, r_delta_304
+
+    return {
+        "linhas": len(local),
+        "recarga_completa": r_completa,
+        "revalidacao_sem_mudancas": r_304,
+        "delta_depois_de_8_escritas": {**r_delta, "vendas": len(corpo["vendas"]), "excluidas": len(corpo["excluidas"])},
+        "delta_repetido": r_delta_304,
+        "lista_reconstruida_igual": True,
+        "reducao_bytes": round(r_completa["bytes"] / max(r_delta["bytes"], 1), 1),
+    }
+
+
+async def _executar(stub, mes: date) -> dict:
+    from app.database import close_supabase_client
+    from app.main import app
+    from app.routers import vendas
+
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=120) as client:
+        (await client.get("/api/v1/produtos")).raise_for_status()
+        mes_ano = mes.strftime("%Y-%m")
+        dia = mes + timedelta(days=14)
+        resultados["mes"] = await _cenario(client, stub, f"/api/v1/vendas/mes/{mes_ano}", dia)
+        resultados["dia"] = await _cenario(client, stub, f"/api/v1/vendas?data_filtro={dia.isoformat()}", dia)
+
+        # Banco sem a migration 0006: ETag a partir das linhas
+        del stub.funcoes["versao_vendas"]
+        vendas._versao_sql = True
+        resultados["mes_sem_versao_vendas"] = await _cenario(client, stub, f"/api/v1/vendas/mes/{mes_ano}", dia)
+    await close_supabase_client()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=10000)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    # Mês anterior inteiro: updated_at das vendas semeadas fica no passado
+    ultimo = date.today().replace(day=1) - timedelta(days=1)
+    mes = ultimo.replace(day=1)
+    stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=calendar.monthrange(mes.year, mes.month)[1], inicio=mes)
+
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        resultados = asyncio.run(_executar(stub, mes))
+
+    imprimir({"benchmark": "incremental", "vendas_no_mes": args.vendas, **resultados})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Jobs de analytics em segundo plano (async=true).
+
+1. Equivalência: para cada endpoint de analytics, o resultado do job
+   (GET /jobs/{id}) é idêntico à resposta síncrona.
+2. Tempo de resposta: latência da chamada síncrona contra a do 202 do
+   async=true, e o tempo até o job ficar concluído.
+3. Deduplicação: N pedidos simultâneos idênticos recebem o mesmo id e o
+   banco é consultado como se fosse um só.
+4. Parâmetros inválidos recebem 400 na hora, sem criar job.
+
+O cache de analytics fica desligado e a agregação usa o caminho em Python,
+para que cada execução realmente leia do banco.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_jobs --vendas 100000 --simultaneos 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+def _endpoints(hoje: date):
+    inicio = (hoje - timedelta(days=729)).isoformat()
+    periodo = f"data_inicio={inicio}&data_fim={hoje.isoformat()}"
+    return [
+        f"/api/v1/analytics/mais-vendidos?{periodo}&limit=20",
+        f"/api/v1/analytics/faturamento-diario?mes_ano={hoje.strftime('%Y-%m')}",
+        f"/api/v1/analytics/vendas-por-categoria?{periodo}",
+        "/api/v1/analytics/comparativo-mensal?quantidade_meses=24",
+        f"/api/v1/analytics/estatisticas-gerais?{periodo}",
+        f"/api/v1/analytics/tendencia-semanal?{periodo}",
+        f"/api/v1/analytics/dashboard?{periodo}",
+    ]
+
+
+async def _aguardar_job(client, job_id: str) -> dict:
+    while True:
+        job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        if job["status"] in ("concluido", "erro"):
+            return job
+        await asyncio.sleep(0.005)
+
+
+async def _executar(stub, simultaneos: int) -> dict:
+    from app import agregacoes
+    from app.database import close_supabase_client
+    from app.jobs import fila_jobs
+    from app.main import app
+
+    agregacoes.AGREGACAO_SQL = False
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=120) as client:
+        for caminho in _endpoints(date.today()):
+            inicio = time.perf_counter()
+            sincrono = await client.get(caminho)
+            sincrono_ms = (time.perf_counter() - inicio) * 1000
+            sincrono.raise_for_status()
+
+            inicio = time.perf_counter()
+            aceito = await client.get(f"{caminho}&async=true")
+            aceito_ms = (time.perf_counter() - inicio) * 1000
+            assert aceito.status_code == 202, aceito.text
+            job = await _aguardar_job(client, aceito.json()["id"])
+            concluido_ms = (time.perf_counter() - inicio) * 1000
+
+            assert job["status"] == "concluido", job
+            if job["resultado"] != sincrono.json():
+                raise AssertionError(f"Resultado do job diverge em {caminho}")
+            resultados[caminho.split("?")[0]] = {
+                "identicos": True,
+                "sincrono_ms": round(sincrono_ms, 1),
+                "resposta_202_ms": round(aceito_ms, 1),
+                "job_concluido_ms": round(concluido_ms, 1),
+            }
+
+        # Deduplicação: pedidos idênticos simultâneos
+        caminho = f"{_endpoints(date.today())[4]}&async=true"
+        requisicoes_antes = stub.requisicoes
+        respostas = await asyncio.gather(*(client.get(caminho) for _ in range(simultaneos)))
+        ids = {r.json()["id"] for r in respostas}
+        await fila_jobs.aguardar()
+        deduplicacao = {
+            "pedidos": simultaneos,
+            "jobs_distintos": len(ids),
+            "requisicoes_ao_banco": stub.requisicoes - requisicoes_antes,
+        }
+        assert len(ids) == 1, deduplicacao
+
+        invalido = await client.get(
+            f"/api/v1/analytics/mais-vendidos?data_inicio={date.today()}&data_fim=2000-01-01&async=true"
+        )
+        assert invalido.status_code == 400, invalido.text
+        inexistente = await client.get("/api/v1/jobs/nao-existe")
+        assert inexistente.status_code == 404
+
+    await fila_jobs.encerrar()
+    await close_supabase_client()
+    return {"endpoints": resultados, "deduplicacao": deduplicacao, "estatisticas": fila_jobs.estatisticas()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=100000)
+    parser.add_argument("--simultaneos", type=int, default=20)
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub()
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=730)
+
+    with servir_stub(stub, args.porta) as url, tempfile.TemporaryDirectory() as pasta:
+        configurar_ambiente(url, STUB_KEY)
+        os.environ["ANALYTICS_CACHE_TTL"] = "0"
+        os.environ["JOBS_DB"] = os.path.join(pasta, "jobs.sqlite3")
+        resultados = asyncio.run(_executar(stub, args.simultaneos))
+
+    imprimir({"benchmark": "jobs", "vendas": args.vendas, **resultados})
+
+
+if __name__ == "__main__":
+    main()
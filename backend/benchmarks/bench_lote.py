@@ -0,0 +1,111 @@
+"""
+Benchmark de inserção: N vendas uma a uma via POST /api/v1/vendas contra
+um único POST /api/v1/vendas/lote (JSON) e /api/v1/vendas/lote/ndjson.
+Confere também um lote com metade das vendas com id do cliente, enviado
+duas vezes: todas gravadas no primeiro envio e nenhuma duplicada no reenvio.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_lote --vendas 300 --latencia-ms 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import ITENS, STUB_KEY, PostgrestStub, servir_stub
+
+
+def _gerar_vendas(quantidade: int, seed: int = 7):
+    rng = random.Random(seed)
+    hoje = date.today()
+    vendas = []
+    for _ in range(quantidade):
+        nome, _, preco = rng.choice(ITENS)
+        vendas.append({
+            "data": (hoje - timedelta(days=rng.randrange(7))).isoformat(),
+            "item": nome,
+            "preco": preco,
+        })
+    return vendas
+
+
+def _resultado(quantidade: int, duracao: float, requisicoes_banco: int) -> dict:
+    return {
+        "segundos": round(duracao, 3),
+        "vendas_por_segundo": round(quantidade / duracao, 1),
+        "requisicoes_ao_banco": requisicoes_banco,
+    }
+
+
+async def _executar(stub, vendas) -> dict:
+    from app.database import close_supabase_client
+    from app.main import app
+
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=120) as client:
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        for venda in vendas:
+            (await client.post("/api/v1/vendas", json=venda)).raise_for_status()
+        resultados["uma_a_uma"] = _resultado(len(vendas), time.perf_counter() - inicio, stub.requisicoes - antes)
+
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        resposta = await client.post("/api/v1/vendas/lote", json=vendas)
+        resposta.raise_for_status()
+        resultados["lote_json"] = _resultado(len(vendas), time.perf_counter() - inicio, stub.requisicoes - antes)
+        resultados["lote_json"]["inseridas"] = resposta.json()["inseridas"]
+
+        corpo = "\n".join(json.dumps(v) for v in vendas).encode()
+        antes, inicio = stub.requisicoes, time.perf_counter()
+        resposta = await client.post(
+            "/api/v1/vendas/lote/ndjson",
+            content=corpo,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        resposta.raise_for_status()
+        resultados["lote_ndjson"] = _resultado(len(vendas), time.perf_counter() - inicio, stub.requisicoes - antes)
+        resultados["lote_ndjson"]["inseridas"] = resposta.json()["inseridas"]
+
+        mistas = [{**v, "id": str(uuid.uuid4())} if i % 2 else v for i, v in enumerate(vendas)]
+        linhas_antes = len(stub.tabelas["vendas"])
+        primeiro = (await client.post("/api/v1/vendas/lote", json=mistas)).json()
+        com_id = [v for v in mistas if "id" in v]
+        reenvio = (await client.post("/api/v1/vendas/lote", json=com_id)).json()
+        assert primeiro["inseridas"] == len(mistas) and not primeiro["erros"], primeiro["erros"][:3]
+        assert reenvio["inseridas"] == 0 and not reenvio["erros"], reenvio["erros"][:3]
+        assert len(stub.tabelas["vendas"]) - linhas_antes == len(mistas)
+        resultados["lote_com_ids_do_cliente"] = {"inseridas": primeiro["inseridas"], "reenvio_inseridas": reenvio["inseridas"]}
+    await close_supabase_client()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendas", type=int, default=300)
+    parser.add_argument("--latencia-ms", type=float, default=5.0, help="Latência simulada do stub")
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+    stub.seed_produtos()
+    vendas = _gerar_vendas(args.vendas)
+
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        resultados = asyncio.run(_executar(stub, vendas))
+
+    imprimir({
+        "benchmark": "lote",
+        "vendas": args.vendas,
+        "latencia_stub_ms": args.latencia_ms,
+        "resultados": resultados,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark do cliente Supabase: um cliente novo por requisição (comportamento
+antigo) contra o cliente compartilhado do processo com pool keep-alive.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_pool --requisicoes 500 --concorrencia 16
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from .common import configurar_ambiente, imprimir, resumo_latencias
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+def _rodada(consulta, requisicoes: int, concorrencia: int) -> dict:
+    def medir(_):
+        inicio = time.perf_counter()
+        consulta()
+        return time.perf_counter() - inicio
+
+    # Aquecimento
+    for _ in range(min(20, requisicoes)):
+        consulta()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        latencias = list(executor.map(medir, range(requisicoes)))
+    return resumo_latencias(latencias, time.perf_counter() - inicio)
+
+
+async def _rodada_async(consulta, requisicoes: int, concorrencia: int) -> dict:
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def medir():
+        async with semaforo:
+            inicio = time.perf_counter()
+            await consulta()
+            return time.perf_counter() - inicio
+
+    for _ in range(min(20, requisicoes)):
+        await consulta()
+
+    inicio = time.perf_counter()
+    latencias = await asyncio.gather(*(medir() for _ in range(requisicoes)))
+    return resumo_latencias(latencias, time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--vendas", type=int, default=2000)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência simulada do stub")
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=30)
+    hoje = date.today().isoformat()
+
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        from supabase import create_client
+        from app.database import close_supabase_client, init_supabase_client
+
+        def cliente_por_requisicao():
+            supabase = create_client(url, STUB_KEY)
+            supabase.table("vendas").select("*").eq("data", hoje).execute()
+
+        async def cliente_compartilhado():
+            await init_supabase_client().table("vendas").select("*").eq("data", hoje).execute()
+
+        async def rodada_compartilhada():
+            try:
+                return await _rodada_async(cliente_compartilhado, args.requisicoes, args.concorrencia)
+            finally:
+                await close_supabase_client()
+
+        antes = _rodada(cliente_por_requisicao, args.requisicoes, args.concorrencia)
+        depois = asyncio.run(rodada_compartilhada())
+
+    imprimir({
+        "benchmark": "pool",
+        "concorrencia": args.concorrencia,
+        "antes_cliente_por_requisicao": antes,
+        "depois_cliente_compartilhado": depois,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Serialização e compressão de GET /vendas/mes/{mes_ano} com --vendas vendas
+no mês.
+
+1. Serialização: as mesmas linhas respondidas com response_model
+   (validação Pydantic + jsonable_encoder + json da stdlib, o caminho
+   anterior) e com RespostaJSON (orjson, sem revalidar); tempo por resposta.
+2. Ponta a ponta, com a aplicação servida por uvicorn: bytes transferidos e
+   latência com Accept-Encoding identity, gzip e br (se o pacote brotli
+   estiver instalado), para json e ndjson, com o tempo da aplicação fora
+   do banco (app no Server-Timing). O corpo descomprimido tem de ser
+   idêntico ao sem compressão, e as vendas iguais às validadas por
+   VendaResponse.
+3. GET /vendas/stream (text/event-stream) não é comprimido.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serializacao --vendas 10000
+"""
+import argparse
+import asyncio
+import calendar
+import gzip
+import time
+from datetime import date, timedelta
+from typing import List
+
+import httpx
+
+from .common import configurar_ambiente, imprimir, percentil, resumo_latencias
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_asgi, servir_stub
+
+
+def _app_serializacao(linhas):
+    from fastapi import FastAPI
+
+    from app.models import VendaResponse
+    from app.respostas import RespostaJSON
+
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=List[VendaResponse])
+    async def com_response_model():
+        return linhas
+
+    @app.get("/resposta_json", response_model=List[VendaResponse])
+    async def com_resposta_json():
+        return RespostaJSON(linhas)
+
+    return app
+
+
+async def _serializacao(linhas, repeticoes: int) -> dict:
+    from app.models import VendaResponse
+
+    resultados, corpos = {}, {}
+    async with httpx.AsyncClient(app=_app_serializacao(linhas), base_url="http://api") as client:
+        for rota in ("response_model", "resposta_json"):
+            latencias = []
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                t0 = time.perf_counter()
+                resposta = await client.get(f"/{rota}")
+                latencias.append(time.perf_counter() - t0)
+            resultados[rota] = {**resumo_latencias(latencias, time.perf_counter() - inicio), "bytes": len(resposta.content)}
+            corpos[rota] = [VendaResponse.model_validate(v) for v in resposta.json()]
+    assert corpos["response_model"] == corpos["resposta_json"], "Vendas diferentes entre os dois caminhos"
+    resultados["aceleracao"] = round(resultados["response_model"]["p50_ms"] / resultados["resposta_json"]["p50_ms"], 1)
+    return resultados
+
+
+def _descomprimir(codificacao: str, bruto: bytes) -> bytes:
+    if codificacao == "gzip":
+        return gzip.decompress(bruto)
+    if codificacao == "br":
+        import brotli
+        return brotli.decompress(bruto)
+    return bruto
+
+
+def _tempo_app_ms(server_timing: str) -> float:
+    """app;dur= do Server-Timing: tempo da aplicação fora das chamadas ao banco"""
+    for metrica in server_timing.split(","):
+        nome, *parametros = metrica.strip().split(";")
+        if nome == "app":
+            return next(float(p[4:]) for p in parametros if p.startswith("dur="))
+    return 0.0
+
+
+def _ponta_a_ponta(base: str, mes_ano: str, repeticoes: int) -> dict:
+    from app.compressao import brotli_disponivel
+
+    codificacoes = ["identity", "gzip"] + (["br"] if brotli_disponivel() else [])
+    resultados = {}
+    with httpx.Client(base_url=base, timeout=120) as client:
+        for formato in ("json", "ndjson"):
+            url = f"/api/v1/vendas/mes/{mes_ano}?formato={formato}"
+            referencia = None
+            for codificacao in codificacoes:
+                cabecalhos = {"Accept-Encoding": codificacao}
+                latencias, tempos_app = [], []
+                inicio = time.perf_counter()
+                for _ in range(repeticoes):
+                    t0 = time.perf_counter()
+                    # iter_raw: os bytes como vieram da rede, sem descomprimir
+                    with client.stream("GET", url, headers=cabecalhos) as resposta:
+                        bruto = b"".join(resposta.iter_raw())
+                    latencias.append(time.perf_counter() - t0)
+                    tempos_app.append(_tempo_app_ms(resposta.headers.get("server-timing", "")))
+                corpo = _descomprimir(resposta.headers.get("content-encoding"), bruto)
+                assert resposta.status_code == 200
+                assert (resposta.headers.get("content-encoding") or "identity") == codificacao, resposta.headers
+                referencia = referencia or corpo
+                assert corpo == referencia, f"{formato}/{codificacao}: corpo descomprimido difere"
+                resultados[f"{formato}_{codificacao}"] = {
+                    **resumo_latencias(latencias, time.perf_counter() - inicio),
+                    "bytes": len(bruto),
+                    "app_p50_ms": round(percentil(tempos_app, 50), 2),
+                }
+
+        with client.stream("GET", f"/api/v1/vendas/stream?data={date.today()}", headers={"Accept-Encoding": "gzip"}) as stream:
+            resultados["stream_content_encoding"] = stream.headers.get("content-encoding", "nenhum")
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            assert "content-encoding" not in stream.headers, "text/event-stream foi comprimido"
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--porta-stub", type=int, default=54321)
+    parser.add_argument("--porta-api", type=int, default=8765)
+    args = parser.parse_args()
+
+    ultimo = date.today().replace(day=1) - timedelta(days=1)
+    mes = ultimo.replace(day=1)
+    stub = PostgrestStub()
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=calendar.monthrange(mes.year, mes.month)[1], inicio=mes)
+
+    with servir_stub(stub, args.porta_stub) as url:
+        configurar_ambiente(url, STUB_KEY)
+        from app.main import app
+        from app.routers.vendas import COLUNAS_VENDA
+
+        colunas = COLUNAS_VENDA.split(",")
+        linhas = [{c: v[c] for c in colunas} for v in stub.tabelas["vendas"]]
+        resultados = {"serializacao": asyncio.run(_serializacao(linhas, args.repeticoes))}
+        with servir_asgi(app, args.porta_api, lifespan="on") as base:
+            resultados["ponta_a_ponta"] = _ponta_a_ponta(base, mes.strftime("%Y-%m"), args.repeticoes)
+
+    imprimir({"benchmark": "serializacao", "vendas_no_mes": args.vendas, **resultados})
+
+
+if __name__ == "__main__":
+    main()
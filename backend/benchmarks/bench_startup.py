@@ -0,0 +1,129 @@
+"""
+Tempo de startup e comportamento dos probes.
+
+1. Import: tempo de `import app.main` em processos novos (mediana) e
+   confirmação de que dependências pesadas e opcionais (numpy, pyarrow,
+   psycopg) ficam fora do startup.
+2. Cold start: sobe `uvicorn app.main:app` em um subprocesso e mede o
+   tempo até o primeiro 200 de /health, com o banco rápido, travado
+   (stub com latência maior que o timeout do ping) e fora do ar (conexão
+   recusada). O startup não consulta o banco, então os três devem ficar
+   próximos.
+3. /ready: 200 com o banco rápido; 503 dentro de PRONTIDAO_TIMEOUT com o
+   banco travado ou fora do ar; a segunda chamada dentro do TTL vem do
+   cache, sem nova consulta.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_startup --latencia-travado-ms 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .common import imprimir
+from .postgrest_stub import STUB_KEY, servir_stub_processo
+
+PESADOS = ("numpy", "pyarrow", "psycopg")
+
+_IMPORT = """
+import sys, time
+inicio = time.perf_counter()
+import app.main
+print(__import__("json").dumps({
+    "segundos": time.perf_counter() - inicio,
+    "carregados": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def _medir_import(repeticoes: int) -> dict:
+    tempos, carregados = [], set()
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", _IMPORT % (PESADOS,)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        resultado = json.loads(saida)
+        tempos.append(resultado["segundos"])
+        carregados.update(resultado["carregados"])
+    return {
+        "mediana_ms": round(statistics.median(tempos) * 1000, 1),
+        "minimo_ms": round(min(tempos) * 1000, 1),
+        "dependencias_pesadas_carregadas": sorted(carregados),
+    }
+
+
+def _cold_start(url_banco: str, porta: int, timeout_ping: float) -> dict:
+    ambiente = {
+        **os.environ,
+        "SUPABASE_URL": url_banco,
+        "SUPABASE_KEY": STUB_KEY,
+        "PRONTIDAO_TIMEOUT": str(timeout_ping),
+        "PRONTIDAO_CACHE_TTL": "30",
+    }
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{porta}"
+    try:
+        while True:
+            try:
+                if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                if processo.poll() is not None:
+                    raise RuntimeError("uvicorn terminou antes de responder")
+                time.sleep(0.01)
+        ate_health = time.perf_counter() - inicio
+
+        probes = []
+        for _ in range(2):
+            t0 = time.perf_counter()
+            resposta = httpx.get(f"{base}/ready", timeout=timeout_ping + 10)
+            probes.append({
+                "status": resposta.status_code,
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+                "banco": resposta.json()["banco"],
+            })
+        return {"ate_health_ms": round(ate_health * 1000, 1), "ready": probes}
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--latencia-travado-ms", type=float, default=5000.0)
+    parser.add_argument("--timeout-ping", type=float, default=1.0)
+    parser.add_argument("--porta-stub", type=int, default=54321)
+    parser.add_argument("--porta-api", type=int, default=8765)
+    args = parser.parse_args()
+
+    resultados = {"import": _medir_import(args.repeticoes)}
+
+    with servir_stub_processo(args.porta_stub) as url:
+        resultados["banco_rapido"] = _cold_start(url, args.porta_api, args.timeout_ping)
+    with servir_stub_processo(args.porta_stub, latencia=args.latencia_travado_ms / 1000) as url:
+        resultados["banco_travado"] = _cold_start(url, args.porta_api, args.timeout_ping)
+    # Porta sem servidor: conexão recusada
+    resultados["banco_fora_do_ar"] = _cold_start(f"http://127.0.0.1:{args.porta_stub}", args.porta_api, args.timeout_ping)
+
+    imprimir({
+        "benchmark": "startup",
+        "timeout_ping_s": args.timeout_ping,
+        "latencia_travado_ms": args.latencia_travado_ms,
+        "resultados": resultados,
+    })
+
+
+if __name__ == "__main__":
+    main()
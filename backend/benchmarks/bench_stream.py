@@ -0,0 +1,211 @@
+"""
+Vendas ao vivo (GET /api/v1/vendas/stream) contra polling.
+
+Sobe a aplicação com uvicorn em um processo próprio e abre N conexões SSE
+para o dia de hoje. Mede:
+
+1. Conexões paradas: CPU do processo da aplicação (utime + stime de
+   /proc/<pid>/stat) durante --ocioso segundos e chamadas ao banco no
+   período (esperado: zero).
+2. Escritas: K vendas criadas, atualizadas e excluídas pela API; tempo até
+   a última das N conexões receber cada evento, e o total final de cada
+   conexão comparado com GET /vendas/total/dia.
+   Depois um POST /vendas/lote com --lote vendas (mais que a fila de
+   eventos de um assinante): nenhuma conexão pode cair e todas terminam
+   com o total atualizado.
+3. Polling equivalente: chamadas ao banco que as mesmas N telas fariam
+   consultando /vendas e /vendas/total/dia a cada --intervalo segundos.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_stream --conexoes 300 --vendas 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date
+
+import httpx
+
+from .common import imprimir, percentil
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+
+def _cpu_segundos(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        campos = f.read().rsplit(")", 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class _Conexao:
+    """Uma tela acompanhando o dia: guarda o último total e quando cada venda chegou"""
+
+    def __init__(self):
+        self.total = None
+        self.chegadas = {}
+        self.conectada = asyncio.Event()
+
+    async def acompanhar(self, client: httpx.AsyncClient, url: str) -> None:
+        async with client.stream("GET", url) as resposta:
+            resposta.raise_for_status()
+            evento = None
+            async for linha in resposta.aiter_lines():
+                if linha.startswith("event: "):
+                    evento = linha[7:]
+                elif linha.startswith("data: "):
+                    dados = json.loads(linha[6:])
+                    if evento == "total":
+                        self.total = dados
+                        self.conectada.set()
+                    else:
+                        self.total = dados["total"]
+                        chave = (dados["tipo"], dados["venda"]["id"])
+                        self.chegadas[chave] = time.perf_counter()
+
+
+async def _conferir_totais(client, conexoes, hoje: str) -> dict:
+    total = (await client.get(f"/api/v1/vendas/total/dia/{hoje}")).json()
+    esperado = {k: total[k] for k in ("total_faturado", "quantidade_itens")}
+    divergentes = sum(
+        1 for c in conexoes
+        if {k: c.total[k] for k in ("total_faturado", "quantidade_itens")} != esperado
+    )
+    assert divergentes == 0, f"{divergentes} conexões com total diferente de {esperado}"
+    return esperado
+
+
+async def _executar(base: str, stub, pid: int, args) -> dict:
+    hoje = date.today().isoformat()
+    limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    resultados = {}
+    async with httpx.AsyncClient(base_url=base, timeout=None, limits=limites) as leitores, \
+            httpx.AsyncClient(base_url=base, timeout=60) as client:
+        conexoes = [_Conexao() for _ in range(args.conexoes)]
+        requisicoes_antes = stub.requisicoes
+        inicio = time.perf_counter()
+        tarefas = [asyncio.create_task(c.acompanhar(leitores, f"/api/v1/vendas/stream?data={hoje}")) for c in conexoes]
+        await asyncio.wait_for(asyncio.gather(*(c.conectada.wait() for c in conexoes)), timeout=120)
+        resultados["conexao"] = {
+            "conexoes": args.conexoes,
+            "segundos_ate_todas": round(time.perf_counter() - inicio, 3),
+            "chamadas_ao_banco": stub.requisicoes - requisicoes_antes,
+        }
+
+        await asyncio.sleep(1)
+        requisicoes_antes = stub.requisicoes
+        cpu_antes = _cpu_segundos(pid)
+        await asyncio.sleep(args.ocioso)
+        cpu = _cpu_segundos(pid) - cpu_antes
+        resultados["ocioso"] = {
+            "segundos": args.ocioso,
+            "cpu_segundos": round(cpu, 3),
+            "cpu_percentual": round(cpu / args.ocioso * 100, 2),
+            "chamadas_ao_banco": stub.requisicoes - requisicoes_antes,
+        }
+
+        envios, latencias = {}, []
+        for i in range(args.escritas):
+            envios_antes = time.perf_counter()
+            venda = (await client.post("/api/v1/vendas", json={"data": hoje, "item": "Coxinha", "preco": 7.5})).json()
+            envios[("criada", venda["id"])] = envios_antes
+            if i % 3 == 1:
+                t0 = time.perf_counter()
+                (await client.put(f"/api/v1/vendas/{venda['id']}", json={"quantidade": 3})).raise_for_status()
+                envios[("atualizada", venda["id"])] = t0
+            elif i % 3 == 2:
+                t0 = time.perf_counter()
+                (await client.delete(f"/api/v1/vendas/{venda['id']}")).raise_for_status()
+                envios[("excluida", venda["id"])] = t0
+        await asyncio.sleep(1)
+        for chave, enviado in envios.items():
+            chegadas = [c.chegadas.get(chave) for c in conexoes]
+            assert None not in chegadas, f"Evento {chave} não chegou a todas as conexões"
+            latencias.append(max(chegadas) - enviado)
+
+        esperado = await _conferir_totais(client, conexoes, hoje)
+        resultados["escritas"] = {
+            "eventos": len(envios),
+            "entrega_a_todas_p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "entrega_a_todas_p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "total_final": esperado,
+            "conexoes_com_total_correto": len(conexoes),
+        }
+
+        lote = [{"data": hoje, "item": "Coxinha", "preco": 7.5} for _ in range(args.lote)]
+        t0 = time.perf_counter()
+        (await client.post("/api/v1/vendas/lote", json=lote)).raise_for_status()
+        await asyncio.sleep(1)
+        caidas = sum(1 for t in tarefas if t.done())
+        assert caidas == 0, f"{caidas} conexões encerradas pelo lote de {args.lote} vendas"
+        resultados["lote"] = {
+            "vendas": args.lote,
+            "segundos": round(time.perf_counter() - t0, 3),
+            "conexoes_ativas": len(tarefas),
+            "total_final": await _conferir_totais(client, conexoes, hoje),
+        }
+
+        # Uma tela fazendo polling: lista do dia + total a cada intervalo
+        requisicoes_antes = stub.requisicoes
+        (await client.get(f"/api/v1/vendas?data_filtro={hoje}")).raise_for_status()
+        (await client.get(f"/api/v1/vendas/total/dia/{hoje}")).raise_for_status()
+        por_ciclo = stub.requisicoes - requisicoes_antes
+        resultados["polling_equivalente"] = {
+            "intervalo_segundos": args.intervalo,
+            "chamadas_ao_banco_por_minuto": round(args.conexoes * por_ciclo * 60 / args.intervalo),
+            "stream_chamadas_ao_banco_por_minuto_ocioso": round(
+                resultados["ocioso"]["chamadas_ao_banco"] * 60 / args.ocioso
+            ),
+        }
+
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conexoes", type=int, default=300)
+    parser.add_argument("--vendas", type=int, default=2000, help="Vendas já registradas hoje")
+    parser.add_argument("--escritas", type=int, default=30)
+    parser.add_argument("--lote", type=int, default=500, help="Vendas do POST /vendas/lote")
+    parser.add_argument("--ocioso", type=float, default=10.0)
+    parser.add_argument("--intervalo", type=float, default=5.0, help="Intervalo do polling comparado")
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--porta-stub", type=int, default=54321)
+    parser.add_argument("--porta-api", type=int, default=8765)
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=1)
+
+    with servir_stub(stub, args.porta_stub) as url:
+        ambiente = {**os.environ, "SUPABASE_URL": url, "SUPABASE_KEY": STUB_KEY, "VENDAS_STREAM_MAX": str(args.conexoes)}
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.porta_api), "--log-level", "warning"],
+            env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base = f"http://127.0.0.1:{args.porta_api}"
+        try:
+            while True:
+                try:
+                    if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if processo.poll() is not None:
+                        raise RuntimeError("uvicorn terminou antes de responder")
+                    time.sleep(0.05)
+            resultados = asyncio.run(_executar(base, stub, processo.pid, args))
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    imprimir({"benchmark": "stream", "vendas_do_dia": args.vendas, **resultados})
+
+
+if __name__ == "__main__":
+    main()
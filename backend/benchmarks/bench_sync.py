@@ -0,0 +1,170 @@
+"""
+Sincronização offline (POST /api/v1/sync) contra o replay da fila local
+operação a operação (POST/PUT/DELETE /vendas).
+
+Simula um intervalo sem rede no balcão: N vendas criadas com id gerado no
+aparelho, parte delas corrigida e parte excluída. Cada estratégia roda em
+um stub novo, com latência por requisição ao banco (--latencia-ms), e o
+estado final das vendas tem de ser idêntico. Depois verifica:
+
+- reenviar o mesmo lote não muda nada (todas as operações ignoradas);
+- reenviar POST /vendas com o mesmo id retorna 200 sem duplicar;
+- uma edição feita no servidor depois da operação offline vence (a
+  operação atrasada é ignorada), e uma criação atrasada não ressuscita uma
+  venda excluída.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_sync --vendas 500 --latencia-ms 20
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import ITENS, STUB_KEY, PostgrestStub, servir_stub
+
+
+def _fila_offline(quantidade: int, seed: int = 7):
+    """Operações do balcão na ordem em que aconteceram"""
+    rng = random.Random(seed)
+    # Uma operação a cada 10 s, terminando antes de agora
+    inicio = datetime.now(timezone.utc) - timedelta(seconds=quantidade * 10 + 60)
+    hoje = date.today().isoformat()
+    operacoes, ids = [], []
+    for i in range(quantidade):
+        nome, _, preco = rng.choice(ITENS)
+        venda_id = str(uuid.uuid4())
+        ids.append(venda_id)
+        operacoes.append({
+            "op": "criar", "id": venda_id,
+            "alterado_em": (inicio + timedelta(seconds=i * 10)).isoformat(),
+            "venda": {"data": hoje, "item": nome, "preco": preco, "quantidade": rng.randint(1, 3)},
+        })
+        if i and i % 5 == 0:
+            alvo = rng.choice(ids[:-1])
+            operacoes.append({
+                "op": "atualizar", "id": alvo,
+                "alterado_em": (inicio + timedelta(seconds=i * 10 + 1)).isoformat(),
+                "venda": {"quantidade": rng.randint(1, 5)},
+            })
+        if i and i % 10 == 0:
+            alvo = ids.pop(rng.randrange(len(ids) - 1))
+            operacoes.append({
+                "op": "excluir", "id": alvo,
+                "alterado_em": (inicio + timedelta(seconds=i * 10 + 2)).isoformat(),
+            })
+    return operacoes
+
+
+def _estado(stub) -> dict:
+    return {
+        v["id"]: (v["data"], v["item"], float(v["preco"]), v["quantidade"])
+        for v in stub.tabelas["vendas"]
+    }
+
+
+async def _replay(client, operacoes):
+    """Estratégia antiga: uma requisição por operação da fila"""
+    for op in operacoes:
+        if op["op"] == "criar":
+            resposta = await client.post("/api/v1/vendas", json={**op["venda"], "id": op["id"]})
+        elif op["op"] == "atualizar":
+            resposta = await client.put(f"/api/v1/vendas/{op['id']}", json=op["venda"])
+        else:
+            resposta = await client.delete(f"/api/v1/vendas/{op['id']}")
+        resposta.raise_for_status()
+
+
+async def _verificacoes(client, stub, operacoes) -> dict:
+    estado = _estado(stub)
+    repetido = (await client.post("/api/v1/sync", json=operacoes)).json()
+    assert repetido["aplicadas"] == 0 and not repetido["erros"], repetido
+    assert _estado(stub) == estado, "Reenvio do lote alterou as vendas"
+
+    criacao = next(op for op in operacoes if op["op"] == "criar" and op["id"] in estado)
+    reenvio = await client.post("/api/v1/vendas", json={**criacao["venda"], "id": criacao["id"]})
+    assert reenvio.status_code == 200 and len(stub.tabelas["vendas"]) == len(estado), reenvio.text
+
+    # Edição no servidor depois da operação offline: a operação atrasada perde
+    editada = criacao["id"]
+    (await client.put(f"/api/v1/vendas/{editada}", json={"quantidade": 9})).raise_for_status()
+    atrasada = {
+        "op": "atualizar", "id": editada, "alterado_em": criacao["alterado_em"],
+        "venda": {"quantidade": 1},
+    }
+    # Criação atrasada de uma venda já excluída não a ressuscita
+    excluida = next(op for op in operacoes if op["op"] == "excluir")
+    ressurreicao = next(op for op in operacoes if op["op"] == "criar" and op["id"] == excluida["id"])
+    invalida = {"op": "criar", "id": str(uuid.uuid4()), "alterado_em": criacao["alterado_em"], "venda": {"item": "x"}}
+    resposta = (await client.post("/api/v1/sync", json=[atrasada, ressurreicao, invalida])).json()
+    assert [r["status"] for r in resposta["resultados"]] == ["ignorada", "ignorada"], resposta
+    assert resposta["resultados"][0]["venda"]["quantidade"] == 9
+    assert [e["linha"] for e in resposta["erros"]] == [3], resposta
+    assert excluida["id"] not in _estado(stub)
+    return {"reenvio_lote": "sem alterações", "reenvio_venda_status": reenvio.status_code, "ultima_escrita_vence": True}
+
+
+async def _executar(operacoes, estrategia: str, stub):
+    from app.database import close_supabase_client
+    from app.main import app
+
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=120) as client:
+        requisicoes_antes = stub.requisicoes
+        inicio = time.perf_counter()
+        if estrategia == "replay":
+            await _replay(client, operacoes)
+            resultado = {}
+        else:
+            resposta = await client.post("/api/v1/sync", json=operacoes)
+            resposta.raise_for_status()
+            corpo = resposta.json()
+            assert not corpo["erros"], corpo["erros"]
+            assert len(corpo["resultados"]) == len(operacoes), "Resultados de sincronizar_vendas truncados"
+            resultado = {"aplicadas": corpo["aplicadas"], "ignoradas": corpo["ignoradas"]}
+        resultado.update({
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "requisicoes_ao_banco": stub.requisicoes - requisicoes_antes,
+        })
+        estado = _estado(stub)
+        if estrategia == "sync":
+            resultado["verificacoes"] = await _verificacoes(client, stub, operacoes)
+    await close_supabase_client()
+    return resultado, estado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=500)
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    operacoes = _fila_offline(args.vendas)
+    resultados, estados = {}, {}
+    for estrategia in ("replay", "sync"):
+        stub = PostgrestStub(latencia=args.latencia_ms / 1000)
+        stub.seed_produtos()
+        with servir_stub(stub, args.porta) as url:
+            configurar_ambiente(url, STUB_KEY)
+            resultados[estrategia], estados[estrategia] = asyncio.run(_executar(operacoes, estrategia, stub))
+
+    if estados["replay"] != estados["sync"]:
+        raise AssertionError("O estado final do sync difere do replay operação a operação")
+
+    imprimir({
+        "benchmark": "sync",
+        "operacoes": len(operacoes),
+        "latencia_ms": args.latencia_ms,
+        "vendas_finais": len(estados["sync"]),
+        "estados_identicos": True,
+        "resultados": resultados,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+"""
+import json
+import os
+import statistics
+
+
+def configurar_ambiente(url: str, key: str) -> None:
+    """Aponta a aplicação para o stub local antes de importar app.database"""
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = key
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil por interpolação linear (p entre 0 e 100)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(ordenados) - 1)
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def resumo_latencias(latencias, duracao: float) -> dict:
+    """Resumo de uma rodada: throughput e percentis em milissegundos"""
+    return {
+        "requisicoes": len(latencias),
+        "throughput_rps": round(len(latencias) / duracao, 1) if duracao else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "media_ms": round(statistics.fmean(latencias) * 1000, 2) if latencias else 0.0,
+    }
+
+
+def imprimir(resultado: dict) -> None:
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
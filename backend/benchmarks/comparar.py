@@ -0,0 +1,89 @@
+"""
+Compara dois relatórios da suíte (benchmarks.suite --saida) endpoint a
+endpoint: variação de p50, p99 e throughput, e do pico de memória por
+escala. Variações de latência acima do limite são marcadas como
+regressão; com --falhar o processo termina com código 1 se houver alguma
+(útil para CI).
+
+Uso (a partir de backend/):
+    python -m benchmarks.comparar base.json novo.json --limite 10
+"""
+import argparse
+import json
+import sys
+
+from .common import imprimir
+
+
+def _variacao(base: float, novo: float):
+    if not base:
+        return None
+    return round((novo - base) / base * 100, 1)
+
+
+def comparar(base: dict, novo: dict, limite: float) -> dict:
+    escalas = {}
+    regressoes = []
+    for escala, dados_novo in novo["escalas"].items():
+        dados_base = base["escalas"].get(escala)
+        if not dados_base or "endpoints" not in dados_base or "endpoints" not in dados_novo:
+            continue
+
+        endpoints = {}
+        for nome, medido in dados_novo["endpoints"].items():
+            referencia = dados_base["endpoints"].get(nome)
+            if not referencia or "erro" in referencia or "erro" in medido:
+                continue
+            comparacao = {
+                "p50_ms": [referencia["p50_ms"], medido["p50_ms"], _variacao(referencia["p50_ms"], medido["p50_ms"])],
+                "p99_ms": [referencia["p99_ms"], medido["p99_ms"], _variacao(referencia["p99_ms"], medido["p99_ms"])],
+                "throughput_rps": [
+                    referencia["throughput_rps"], medido["throughput_rps"],
+                    _variacao(referencia["throughput_rps"], medido["throughput_rps"])
+                ],
+            }
+            variacao_p50 = comparacao["p50_ms"][2]
+            if variacao_p50 is not None and variacao_p50 > limite:
+                comparacao["regressao"] = True
+                regressoes.append(f"{escala}:{nome}")
+            endpoints[nome] = comparacao
+
+        escalas[escala] = {
+            "rss_pico_mb": [
+                dados_base["rss_pico_mb"], dados_novo["rss_pico_mb"],
+                _variacao(dados_base["rss_pico_mb"], dados_novo["rss_pico_mb"])
+            ],
+            "endpoints": endpoints,
+        }
+
+    return {
+        "base": base["metadados"].get("commit"),
+        "novo": novo["metadados"].get("commit"),
+        "formato": "[base, novo, variação %]",
+        "limite_regressao_pct": limite,
+        "regressoes": regressoes,
+        "escalas": escalas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--limite", type=float, default=10.0, help="Aumento de p50 (%%) considerado regressão")
+    parser.add_argument("--falhar", action="store_true", help="Código de saída 1 se houver regressão")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    with open(args.novo, encoding="utf-8") as arquivo:
+        novo = json.load(arquivo)
+
+    resultado = comparar(base, novo, args.limite)
+    imprimir(resultado)
+    if args.falhar and resultado["regressoes"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Verificação dos índices com EXPLAIN em um Postgres local.
+
+Aplica todas as migrations em um schema temporário, gera vendas sintéticas,
+roda ANALYZE e confere com EXPLAIN (FORMAT JSON) que as consultas quentes
+da API (equivalentes SQL das consultas PostgREST) usam os índices
+esperados, sem Seq Scan nas tabelas grandes. O schema é removido no fim,
+então pode apontar até para um banco com dados.
+
+Requer o pacote psycopg. Uso (a partir de backend/):
+    DATABASE_URL=postgresql://postgres@localhost/cantina python -m benchmarks.explain_indices --vendas 200000
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from app.migracoes import aplicar_pendentes, conectar
+
+SCHEMA = "explain_indices"
+
+HOJE = date.today()
+DIA = HOJE - timedelta(days=10)
+INICIO_MES = DIA.replace(day=1)
+FIM_MES = INICIO_MES + timedelta(days=30)
+
+# (nome, consulta, índices aceitos, tabelas que não podem ter Seq Scan)
+CONSULTAS = [
+    (
+        "listar_vendas (dia, ordem created_at)",
+        "select * from vendas where data = %(dia)s order by created_at",
+        {"vendas_data_created_at_idx", "vendas_data_item_preco_idx"},
+        {"vendas"},
+    ),
+    (
+        "listar_vendas_mes (página por keyset)",
+        """select * from vendas
+           where data >= %(inicio)s and data <= %(fim)s
+             and (data < %(dia)s
+                  or (data = %(dia)s and created_at > now() - interval '1 day')
+                  or (data = %(dia)s and created_at = now() and id > gen_random_uuid()))
+           order by data desc, created_at, id
+           limit 1000""",
+        # Ordem mista: varredura do índice de trás para frente + Incremental Sort por dia
+        {"vendas_data_created_at_idx", "vendas_data_item_preco_idx"},
+        {"vendas"},
+    ),
+    (
+        "exportacao (página crescente)",
+        """select * from vendas
+           where data >= %(inicio)s and data <= %(fim)s
+           order by data, created_at, id
+           limit 1000""",
+        {"vendas_data_created_at_idx"},
+        {"vendas"},
+    ),
+    (
+        "agregacao em Python (período do mês)",
+        "select data, item, preco, quantidade from vendas where data >= %(inicio)s and data <= %(fim)s",
+        {"vendas_data_created_at_idx", "vendas_data_item_preco_idx"},
+        {"vendas"},
+    ),
+    (
+        "agrupamento por item no dia",
+        "select item, sum(preco * quantidade) from vendas where data = %(dia)s group by item",
+        {"vendas_data_item_preco_idx", "vendas_data_created_at_idx"},
+        {"vendas"},
+    ),
+    (
+        "vendas_completas (exportação com categoria)",
+        """select * from vendas_completas
+           where data >= %(inicio)s and data <= %(fim)s
+           order by data, created_at, id
+           limit 1000""",
+        {"vendas_data_created_at_idx"},
+        {"vendas"},
+    ),
+    (
+        "analytics_agrupar (vendas_diarias no mês)",
+        """select item, sum(quantidade), sum(vendas), sum(faturamento)
+           from vendas_diarias where data between %(inicio)s and %(fim)s
+           group by item""",
+        {"vendas_diarias_pkey", "vendas_diarias_categoria_idx"},
+        {"vendas_diarias"},
+    ),
+    (
+        "produtos por nome (JOIN de vendas_completas)",
+        "select id from produtos where nome = %(nome)s",
+        {"produtos_nome_key"},
+        {"produtos"},
+    ),
+]
+
+
+def _nos(plano: dict):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def _popular(conexao, vendas: int, produtos: int) -> None:
+    conexao.execute("""
+        insert into produtos (nome, categoria, preco_padrao)
+        select 'Produto ' || i, 'Categoria ' || (i %% 12), 1 + (i %% 50)
+        from generate_series(1, %(produtos)s) i
+    """, {"produtos": produtos})
+
+    # Sem os triggers de vendas_diarias na carga; a consolidação é
+    # reconstruída de uma vez no fim
+    conexao.execute("alter table vendas disable trigger vendas_diarias_sync")
+    conexao.execute("""
+        insert into vendas (data, item, preco, quantidade, created_at)
+        select
+            d,
+            'Produto ' || (1 + (random() * (%(produtos)s - 1))::int),
+            1 + (random() * 49)::int,
+            1 + (random() * 3)::int,
+            d + random() * interval '10 hours' + interval '8 hours'
+        from (
+            select current_date - (random() * 729)::int as d
+            from generate_series(1, %(vendas)s)
+        ) s
+    """, {"vendas": vendas, "produtos": produtos})
+    conexao.execute("alter table vendas enable trigger vendas_diarias_sync")
+    conexao.execute("select vendas_diarias_reconstruir()")
+    conexao.execute("analyze")
+
+
+def verificar(conexao, vendas: int, produtos: int) -> dict:
+    conexao.execute(f"drop schema if exists {SCHEMA} cascade")
+    conexao.execute(f"create schema {SCHEMA}")
+    conexao.execute(f"set search_path to {SCHEMA}, public")
+    try:
+        aplicar_pendentes(conexao)
+        _popular(conexao, vendas, produtos)
+
+        parametros = {"dia": DIA, "inicio": INICIO_MES, "fim": FIM_MES, "nome": "Produto 42"}
+        resultados = {}
+        for nome, sql, indices, sem_seq_scan in CONSULTAS:
+            plano = conexao.execute(f"explain (format json) {sql}", parametros).fetchone()[0][0]["Plan"]
+            nos = list(_nos(plano))
+            usados = {n["Index Name"] for n in nos if "Index Name" in n}
+            seq_scans = {n["Relation Name"] for n in nos if n["Node Type"] == "Seq Scan"}
+
+            if not usados & indices:
+                raise AssertionError(f"{nome}: nenhum dos índices {sorted(indices)} usado ({json.dumps(plano)})")
+            if seq_scans & sem_seq_scan:
+                raise AssertionError(f"{nome}: Seq Scan em {sorted(seq_scans & sem_seq_scan)}")
+
+            resultados[nome] = {
+                "indices": sorted(usados),
+                "nos": [n["Node Type"] for n in nos],
+                "custo": plano["Total Cost"],
+            }
+        return resultados
+    finally:
+        conexao.execute(f"drop schema if exists {SCHEMA} cascade")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendas", type=int, default=200000)
+    parser.add_argument("--produtos", type=int, default=2000)
+    args = parser.parse_args()
+
+    with conectar() as conexao:
+        resultados = verificar(conexao, args.vendas, args.produtos)
+
+    print(json.dumps({
+        "verificacao": "explain_indices",
+        "vendas": args.vendas,
+        "produtos": args.produtos,
+        "consultas": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,682 @@
+"""
+Servidor local compatível com o subconjunto da API PostgREST usado pela
+Cantina Escolar API. Mantém as tabelas em memória e serve para rodar os
+benchmarks sem depender de um projeto Supabase real.
+"""
+import asyncio
+import bisect
+import json
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Chave no formato JWT aceita pelo supabase-py (apenas para benchmarks)
+STUB_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.stub"
+
+ITENS = [
+    ("Suco de Laranja", "bebida", 5.50),
+    ("Refrigerante", "bebida", 6.00),
+    ("Água", "bebida", 3.00),
+    ("Coxinha", "salgado", 7.00),
+    ("Pão de Queijo", "salgado", 4.50),
+    ("Esfiha", "salgado", 6.50),
+    ("Bolo de Chocolate", "doce", 5.00),
+    ("Brigadeiro", "doce", 2.50),
+    ("Sanduíche Natural", "lanche", 9.00),
+    ("Misto Quente", "lanche", 8.00),
+]
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+# Colunas com índice único (produtos_nome_key)
+_UNICAS = {"produtos": "nome"}
+
+# Ordem do índice de vendas, a mesma da paginação por keyset
+_ORDEM_INDICE = ["data", "created_at", "id"]
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _instante(valor: str) -> datetime:
+    return datetime.fromisoformat(valor)
+
+
+def _coerce(valor: str, referencia):
+    """Converte o valor do filtro para o tipo da coluna"""
+    if valor == "null":
+        return None
+    if isinstance(referencia, bool):
+        return valor.lower() == "true"
+    if isinstance(referencia, int):
+        return int(float(valor))
+    if isinstance(referencia, float):
+        return float(valor)
+    return valor.strip('"')
+
+
+def _compara(op: str, atual, arg: str) -> bool:
+    if op == "is":
+        if arg == "null":
+            return atual is None
+        return atual is (arg == "true")
+    if op == "in":
+        opcoes = [o.strip('"') for o in arg.strip("()").split(",")]
+        return atual is not None and str(atual) in opcoes
+    esperado = _coerce(arg, atual)
+    if op == "eq":
+        return atual == esperado
+    if op == "neq":
+        return atual != esperado
+    if atual is None or esperado is None:
+        return False
+    if op == "gt":
+        return atual > esperado
+    if op == "gte":
+        return atual >= esperado
+    if op == "lt":
+        return atual < esperado
+    if op == "lte":
+        return atual <= esperado
+    raise ValueError(f"Operador não suportado: {op}")
+
+
+def _dividir(expressao: str):
+    """Divide "a,b(c,d),e" nas vírgulas de nível zero (fora de parênteses/aspas)"""
+    partes, atual, nivel, aspas = [], "", 0, False
+    for c in expressao:
+        if c == '"':
+            aspas = not aspas
+        elif not aspas and c == "(":
+            nivel += 1
+        elif not aspas and c == ")":
+            nivel -= 1
+        elif not aspas and c == "," and nivel == 0:
+            partes.append(atual)
+            atual = ""
+            continue
+        atual += c
+    partes.append(atual)
+    return partes
+
+
+def _avalia(linha: dict, coluna: str, expressao: str) -> bool:
+    """Avalia um filtro "coluna=op.valor" ou um grupo lógico or=(...)/and=(...)"""
+    if coluna in ("or", "and"):
+        resultados = (_avalia_item(linha, parte) for parte in _dividir(expressao.strip()[1:-1]))
+        return any(resultados) if coluna == "or" else all(resultados)
+    negado = expressao.startswith("not.")
+    if negado:
+        expressao = expressao[4:]
+    op, _, arg = expressao.partition(".")
+    return _compara(op, linha.get(coluna), arg) != negado
+
+
+def _avalia_item(linha: dict, item: str) -> bool:
+    """Item de um grupo lógico: "coluna.op.valor" ou "and(...)"/"or(...)" aninhado"""
+    for grupo in ("and", "or"):
+        if item.startswith(f"{grupo}("):
+            return _avalia(linha, grupo, item[len(grupo):])
+    coluna, _, expressao = item.partition(".")
+    return _avalia(linha, coluna, expressao)
+
+
+def _limites_item(item: str):
+    """Limites (min, max) de data implicados por um item de filtro, ou None"""
+    if item.startswith("and("):
+        limites = [_limites_item(p) for p in _dividir(item[4:-1])]
+        limites = [l for l in limites if l is not None]
+        return limites[0] if limites else None
+    coluna, _, expressao = item.partition(".")
+    if coluna != "data" or expressao.startswith("not."):
+        return None
+    op, _, arg = expressao.partition(".")
+    arg = arg.strip('"')
+    if op == "eq":
+        return arg, arg
+    if op in ("gt", "gte"):
+        return arg, None
+    if op in ("lt", "lte"):
+        return None, arg
+    return None
+
+
+def _limites_data(params):
+    """
+    Faixa de datas que contém todas as linhas aceitas pelos filtros (limites
+    inclusivos, None = aberto). Usada só para recortar o índice; os filtros
+    continuam sendo avaliados linha a linha.
+    """
+    minimo, maximo = None, None
+    for coluna, expressao in params:
+        if coluna == "or":
+            limites = [_limites_item(p) for p in _dividir(expressao.strip()[1:-1])]
+            if not limites or None in limites:
+                continue
+            baixos = [l[0] for l in limites]
+            altos = [l[1] for l in limites]
+            limite = (None if None in baixos else min(baixos), None if None in altos else max(altos))
+        elif coluna == "data":
+            limite = _limites_item(f"data.{expressao}")
+            if limite is None:
+                continue
+        else:
+            continue
+        if limite[0] is not None and (minimo is None or limite[0] > minimo):
+            minimo = limite[0]
+        if limite[1] is not None and (maximo is None or limite[1] < maximo):
+            maximo = limite[1]
+    return minimo, maximo
+
+
+class PostgrestStub:
+    """
+    Banco em memória exposto como PostgREST.
+    Suporta select, filtros simples, order, limit/offset, insert,
+    update, delete, a view vendas_completas e as funções RPC das migrations.
+    Como o PostgREST com db-max-rows, selects e RPCs devolvem no máximo
+    `max_linhas` linhas, sem erro (None desativa o limite).
+    """
+
+    def __init__(self, latencia: float = 0.0, rpc: bool = True, max_linhas: Optional[int] = 1000):
+        self.latencia = latencia
+        self.max_linhas = max_linhas
+        self.tabelas = {"vendas": [], "produtos": [], "vendas_excluidas": []}
+        self.requisicoes = 0
+        self.bytes_enviados = 0
+        self._indice = self._diarias = None
+        self.funcoes = {
+            "analytics_agrupar": self._analytics_agrupar,
+            "analytics_agrupar_dimensoes": self._analytics_agrupar_dimensoes,
+            "vendas_diarias_reconstruir": self._vendas_diarias_reconstruir,
+            "sincronizar_vendas": self._sincronizar_vendas,
+            "versao_vendas": self._versao_vendas,
+        } if rpc else {}
+        self.app = Starlette(routes=[
+            Route("/rest/v1/rpc/{funcao}", self._handle_rpc, methods=["POST"]),
+            Route("/rest/v1/{tabela}", self._handle, methods=["GET", "HEAD", "POST", "PATCH", "DELETE"]),
+        ])
+
+    # ==================== DADOS ====================
+
+    def seed_produtos(self) -> None:
+        agora = _agora()
+        self.tabelas["produtos"] = [
+            {
+                "id": str(uuid.uuid4()),
+                "nome": nome,
+                "categoria": categoria,
+                "preco_padrao": preco,
+                "ativo": True,
+                "created_at": agora,
+                "updated_at": agora,
+            }
+            for nome, categoria, preco in ITENS
+        ]
+
+    def seed_vendas(self, quantidade: int, dias: int = 365, inicio: date = None, seed: int = 42) -> None:
+        """Gera vendas sintéticas distribuídas pelos últimos `dias` dias"""
+        rng = random.Random(seed)
+        inicio = inicio or (date.today() - timedelta(days=dias - 1))
+        base = datetime.combine(inicio, datetime.min.time(), tzinfo=timezone.utc)
+        vendas = []
+        for _ in range(quantidade):
+            nome, _, preco = rng.choice(ITENS)
+            offset = rng.randrange(dias)
+            criado = (base + timedelta(days=offset, seconds=rng.randrange(36000, 64800))).isoformat()
+            vendas.append({
+                "id": str(uuid.uuid4()),
+                "data": (inicio + timedelta(days=offset)).isoformat(),
+                "item": nome,
+                "preco": preco,
+                "quantidade": 1,
+                "created_at": criado,
+                "updated_at": criado,
+            })
+        self.tabelas["vendas"] = vendas
+        self._indice = self._diarias = None
+
+    def _linhas(self, tabela: str):
+        if tabela == "vendas_completas":
+            categorias = {p["nome"]: p["categoria"] for p in self.tabelas["produtos"]}
+            return [{**v, "categoria": categorias.get(v["item"])} for v in self.tabelas["vendas"]]
+        if tabela not in self.tabelas:
+            raise KeyError(tabela)
+        return self.tabelas[tabela]
+
+    def _candidatas(self, tabela: str, params, dias_decrescentes: bool = False):
+        """
+        Linhas de vendas (ou vendas_completas) dentro da faixa de datas dos
+        filtros, na ordem do índice (data, created_at, id), ou com os dias
+        do último para o primeiro (data desc, created_at, id). O índice é
+        reconstruído depois de qualquer escrita em vendas.
+        """
+        if self._indice is None:
+            self._indice = sorted(self.tabelas["vendas"], key=lambda v: (v["data"], v["created_at"], v["id"]))
+            self._datas_indice = [v["data"] for v in self._indice]
+
+        minimo, maximo = _limites_data(params)
+        a = bisect.bisect_left(self._datas_indice, minimo) if minimo else 0
+        b = bisect.bisect_right(self._datas_indice, maximo) if maximo else len(self._indice)
+        linhas = self._dias_decrescentes(a, b) if dias_decrescentes else (self._indice[i] for i in range(a, b))
+
+        if tabela == "vendas_completas":
+            categorias = {p["nome"]: p["categoria"] for p in self.tabelas["produtos"]}
+            linhas = ({**v, "categoria": categorias.get(v["item"])} for v in linhas)
+        return linhas
+
+    def _dias_decrescentes(self, a: int, b: int):
+        """Posições [a, b) do índice, um dia de cada vez a partir do último"""
+        fim = b
+        while fim > a:
+            inicio = max(a, bisect.bisect_left(self._datas_indice, self._datas_indice[fim - 1]))
+            yield from self._indice[inicio:fim]
+            fim = inicio
+
+    # ==================== FUNÇÕES (RPC) ====================
+
+    def _consolidacao(self):
+        """
+        Equivalente em memória de vendas_diarias: (data, item, quantidade,
+        vendas, centavos) ordenado por data. Reconstruída depois de qualquer
+        escrita em vendas (no banco, os triggers a mantêm em dia).
+        """
+        if self._diarias is None:
+            grupos = {}
+            for v in self.tabelas["vendas"]:
+                qtd = v.get("quantidade") or 1
+                grupo = grupos.setdefault((v["data"], v["item"]), [0, 0, 0])
+                grupo[0] += qtd
+                grupo[1] += 1
+                grupo[2] += round(float(v["preco"]) * 100) * qtd
+            self._diarias = [(data, item, *grupos[(data, item)]) for data, item in sorted(grupos)]
+            self._datas_diarias = [linha[0] for linha in self._diarias]
+        return self._diarias
+
+    def _analytics_agrupar(self, p_inicio: str, p_fim: str, p_dimensao: str):
+        """
+        Equivalente em memória de analytics_agrupar: lê a consolidação
+        diária no período, como a função SQL, com a categoria do catálogo.
+        """
+        diarias = self._consolidacao()
+        a = bisect.bisect_left(self._datas_diarias, p_inicio)
+        b = bisect.bisect_right(self._datas_diarias, p_fim)
+        categorias = {p["nome"]: p["categoria"] for p in self.tabelas["produtos"]}
+        grupos = {}
+        for data, item, qtd, vendas, centavos in diarias[a:b]:
+            if p_dimensao == "item":
+                chave = item
+            elif p_dimensao == "data":
+                chave = data
+            elif p_dimensao == "mes":
+                chave = data[:7]
+            elif p_dimensao == "dia_semana":
+                chave = str(date.fromisoformat(data).isoweekday() - 1)
+            else:
+                chave = categorias.get(item) or "Sem Categoria"
+            grupo = grupos.setdefault(chave, [0, 0, 0])
+            grupo[0] += qtd
+            grupo[1] += vendas
+            grupo[2] += centavos
+        return [
+            {"chave": chave, "quantidade": q, "vendas": n, "faturamento": f / 100}
+            for chave, (q, n, f) in grupos.items()
+        ]
+
+    def _analytics_agrupar_dimensoes(self, p_inicio: str, p_fim: str, p_dimensoes):
+        return [
+            {"dimensao": dimensao, **linha}
+            for dimensao in p_dimensoes
+            for linha in self._analytics_agrupar(p_inicio, p_fim, dimensao)
+        ]
+
+    def _vendas_diarias_reconstruir(self, p_inicio: str = None, p_fim: str = None):
+        chaves = {
+            (v["data"], v["item"])
+            for v in self.tabelas["vendas"]
+            if (p_inicio is None or v["data"] >= p_inicio) and (p_fim is None or v["data"] <= p_fim)
+        }
+        return len(chaves)
+
+    def _excluir_vendas(self, removidas, alterado_em: str = None) -> None:
+        """Remove as vendas e grava as lápides, como o trigger vendas_excluidas_sync"""
+        agora = _agora()
+        ids = {v["id"] for v in removidas}
+        self.tabelas["vendas"] = [v for v in self.tabelas["vendas"] if v["id"] not in ids]
+        lapides = {l["id"]: l for l in self.tabelas["vendas_excluidas"]}
+        for v in removidas:
+            lapides[v["id"]] = {"id": v["id"], "data": v["data"], "alterado_em": alterado_em or agora, "excluido_em": agora}
+        self.tabelas["vendas_excluidas"] = list(lapides.values())
+        self._indice = self._diarias = None
+
+    def _mover_venda(self, linha: dict) -> None:
+        """Lápide do dia antigo de uma venda que muda de data (trigger vendas_mudanca_data)"""
+        agora = _agora()
+        self.tabelas["vendas_excluidas"] = [l for l in self.tabelas["vendas_excluidas"] if l["id"] != linha["id"]]
+        self.tabelas["vendas_excluidas"].append(
+            {"id": linha["id"], "data": linha["data"], "alterado_em": agora, "excluido_em": agora}
+        )
+
+    def _versao_vendas(self, p_inicio: str, p_fim: str):
+        vendas = [v for v in self.tabelas["vendas"] if p_inicio <= v["data"] <= p_fim]
+        excluidas = [
+            l["excluido_em"] for l in self.tabelas["vendas_excluidas"]
+            if l["data"] is not None and p_inicio <= l["data"] <= p_fim
+        ]
+        return [{
+            "linhas": len(vendas),
+            "alterado_em": max((v["updated_at"] for v in vendas), default=None),
+            "excluido_em": max(excluidas, default=None),
+        }]
+
+    def _sincronizar_vendas(self, p_operacoes):
+        """Equivalente em memória de sincronizar_vendas (última escrita vence)"""
+        por_id = {v["id"]: v for v in self.tabelas["vendas"]}
+        resultados = []
+        for posicao, op in enumerate(p_operacoes, start=1):
+            em = _instante(op["alterado_em"])
+            dados = op.get("venda") or {}
+            linha = por_id.get(op["id"])
+            lapide = next((l for l in self.tabelas["vendas_excluidas"] if l["id"] == op["id"]), None)
+            versao = _instante(linha.get("alterado_em") or linha["updated_at"]) if linha else None
+            status, datas = "ignorada", []
+
+            if op["op"] == "criar":
+                if linha is not None:
+                    if versao < em:
+                        datas = [linha["data"], dados["data"]]
+                        if linha["data"] != dados["data"]:
+                            self._mover_venda(linha)
+                        linha.update(dados, alterado_em=op["alterado_em"], updated_at=_agora())
+                        linha.setdefault("quantidade", 1)
+                        status = "aplicada"
+                elif lapide is None or _instante(lapide["alterado_em"]) < em:
+                    agora = _agora()
+                    linha = {
+                        "id": op["id"], "quantidade": 1, **dados,
+                        "alterado_em": op["alterado_em"], "created_at": agora, "updated_at": agora,
+                    }
+                    self.tabelas["vendas"].append(linha)
+                    por_id[op["id"]] = linha
+                    self.tabelas["vendas_excluidas"] = [l for l in self.tabelas["vendas_excluidas"] if l["id"] != op["id"]]
+                    status, datas = "aplicada", [linha["data"]]
+            elif op["op"] == "atualizar":
+                if linha is None:
+                    status = "ignorada" if lapide else "nao_encontrada"
+                elif versao < em:
+                    linha.update(dados, alterado_em=op["alterado_em"], updated_at=_agora())
+                    status, datas = "aplicada", [linha["data"]]
+            elif op["op"] == "excluir":
+                if linha is None:
+                    status = "ignorada" if lapide else "nao_encontrada"
+                    if lapide is None:
+                        self.tabelas["vendas_excluidas"].append(
+                            {"id": op["id"], "data": None, "alterado_em": op["alterado_em"], "excluido_em": _agora()}
+                        )
+                    elif _instante(lapide["alterado_em"]) < em:
+                        lapide["alterado_em"] = op["alterado_em"]
+                elif versao <= em:
+                    self._excluir_vendas([linha], op["alterado_em"])
+                    del por_id[op["id"]]
+                    status, datas, linha = "aplicada", [linha["data"]], None
+
+            resultados.append({"posicao": posicao, "status": status, "venda": dict(linha) if linha else None, "datas": datas})
+        self._indice = self._diarias = None
+        return resultados
+
+    # ==================== HTTP ====================
+
+    async def _handle_rpc(self, request: Request) -> Response:
+        self.requisicoes += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        funcao = self.funcoes.get(request.path_params["funcao"])
+        if funcao is None:
+            return JSONResponse({
+                "code": "PGRST202",
+                "message": f"Could not find the function public.{request.path_params['funcao']} in the schema cache",
+            }, status_code=404)
+        resultado = funcao(**json.loads(await request.body()))
+        if isinstance(resultado, list):
+            params = list(request.query_params.multi_items())
+            resultado = self._ordena(resultado, params)
+            resultado = self._pagina(resultado, dict(params), request.headers.get("Range"))
+        return self._json(self._limitar(resultado))
+
+    async def _handle(self, request: Request) -> Response:
+        self.requisicoes += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        tabela = request.path_params["tabela"]
+        try:
+            linhas = self._linhas(tabela)
+        except KeyError:
+            return JSONResponse({"message": f"relation \"{tabela}\" does not exist", "code": "42P01"}, status_code=404)
+
+        if request.method == "POST":
+            corpo = json.loads(await request.body() or b"[]")
+            return self._insert(
+                tabela,
+                corpo if isinstance(corpo, list) else [corpo],
+                request.query_params.get("on_conflict"),
+                request.headers.get("Prefer", "")
+            )
+
+        params = request.query_params.multi_items()
+        if tabela == "vendas" and request.method in ("PATCH", "DELETE"):
+            self._indice = self._diarias = None
+
+        if tabela in ("vendas", "vendas_completas") and request.method == "GET":
+            return self._select_vendas(tabela, params, request.headers.get("Range"))
+
+        filtradas = [l for l in linhas if self._filtra(l, params)]
+
+        if request.method == "PATCH":
+            mudancas = json.loads(await request.body())
+            for linha in filtradas:
+                linha.update(mudancas)
+                linha["updated_at"] = _agora()
+                if tabela == "vendas":
+                    linha["alterado_em"] = linha["updated_at"]
+            return self._json(filtradas)
+
+        if request.method == "DELETE" and tabela == "vendas":
+            self._excluir_vendas(filtradas)
+            return self._json(filtradas)
+
+        if request.method == "DELETE":
+            ids = {id(l) for l in filtradas}
+            self.tabelas[tabela] = [l for l in linhas if id(l) not in ids]
+            return self._json(filtradas)
+
+        resultado = self._ordena(filtradas, params)
+        resultado = self._pagina(resultado, dict(params), request.headers.get("Range"))
+        resultado = self._projeta(self._limitar(resultado), dict(params).get("select", "*"))
+        if request.method == "HEAD":
+            return Response(headers={"Content-Range": f"0-{len(resultado) - 1}/{len(filtradas)}"})
+        return self._json(resultado)
+
+    def _select_vendas(self, tabela: str, params, header_range) -> Response:
+        ordem = [c for chave, valor in params if chave == "order" for c in valor.split(",")]
+        colunas = [c.split(".")[0] for c in ordem]
+        decrescentes = [".desc" in c for c in ordem]
+        # data desc, created_at, id (listagem do mês): dias de trás para frente
+        dias_decrescentes = colunas == _ORDEM_INDICE and decrescentes == [True, False, False]
+        candidatas = (
+            l for l in self._candidatas(tabela, params, dias_decrescentes)
+            if self._filtra(l, params)
+        )
+
+        no_indice = colunas == _ORDEM_INDICE and (dias_decrescentes or not any(decrescentes))
+        if no_indice and not header_range and "limit" in dict(params):
+            # Já na ordem pedida: para assim que a página estiver completa
+            inicio = int(dict(params).get("offset", 0))
+            fim = inicio + int(dict(params)["limit"])
+            resultado = [l for _, l in zip(range(fim), candidatas)][inicio:]
+        else:
+            resultado = self._ordena(list(candidatas), params)
+            resultado = self._pagina(resultado, dict(params), header_range)
+        return self._json(self._projeta(self._limitar(resultado), dict(params).get("select", "*")))
+
+    def _limitar(self, linhas):
+        """Trunca como o db-max-rows do PostgREST"""
+        if self.max_linhas is not None and isinstance(linhas, list):
+            return linhas[:self.max_linhas]
+        return linhas
+
+    def _json(self, conteudo, status_code: int = 200) -> Response:
+        resposta = JSONResponse(conteudo, status_code=status_code)
+        if isinstance(conteudo, list):
+            # Como o PostgREST: faixa das linhas devolvidas, sem o total
+            resposta.headers["Content-Range"] = f"0-{len(conteudo) - 1}/*" if conteudo else "*/*"
+        self.bytes_enviados += len(resposta.body)
+        return resposta
+
+    def _insert(self, tabela: str, novas, on_conflict: str = None, prefer: str = "") -> Response:
+        """INSERT, com ON CONFLICT (on_conflict) DO NOTHING/UPDATE conforme o Prefer"""
+        if len({frozenset(nova) for nova in novas}) > 1:
+            # Insert em lote: o PostgREST exige as mesmas colunas em todos os objetos
+            return self._json({"code": "PGRST102", "message": "All object keys must match"}, 400)
+        agora = _agora()
+        unica = "id" if on_conflict == "id" else _UNICAS.get(tabela)
+        existentes = {l[unica]: l for l in self.tabelas[tabela]} if unica else {}
+        if on_conflict and on_conflict != unica:
+            return self._json({"code": "42P10", "message": "there is no unique constraint matching the ON CONFLICT specification"}, 400)
+
+        criadas, alteradas = [], []
+        for nova in novas:
+            atual = existentes.get(nova.get(unica)) if unica else None
+            if atual is not None:
+                if not on_conflict:
+                    return self._json({"code": "23505", "message": f"duplicate key value violates unique constraint \"{tabela}_{unica}_key\""}, 409)
+                if any(atual is l for l in alteradas):
+                    return self._json({"code": "21000", "message": "ON CONFLICT DO UPDATE command cannot affect row a second time"}, 500)
+                if "resolution=merge-duplicates" in prefer:
+                    atual.update(nova)
+                    atual["updated_at"] = agora
+                    alteradas.append(atual)
+                continue
+
+            linha = {"id": str(uuid.uuid4()), "created_at": agora, "updated_at": agora, **nova}
+            if tabela == "vendas":
+                linha.setdefault("quantidade", 1)
+                linha.setdefault("alterado_em", agora)
+            if tabela == "produtos":
+                linha.setdefault("ativo", True)
+            criadas.append(linha)
+            if unica:
+                existentes[linha[unica]] = linha
+        self.tabelas[tabela].extend(criadas)
+        criadas = alteradas + criadas
+        if tabela == "vendas":
+            self._indice = self._diarias = None
+        return self._json(criadas, status_code=201)
+
+    @staticmethod
+    def _filtra(linha: dict, params) -> bool:
+        return all(
+            _avalia(linha, coluna, expressao)
+            for coluna, expressao in params
+            if coluna not in _RESERVED_PARAMS
+        )
+
+    @staticmethod
+    def _ordena(linhas, params):
+        criterios = []
+        for chave, valor in params:
+            if chave == "order":
+                criterios.extend(valor.split(","))
+        # Ordenação estável: aplica do critério menos para o mais significativo
+        for criterio in reversed(criterios):
+            coluna, *mods = criterio.split(".")
+            linhas = sorted(
+                linhas,
+                key=lambda l: (l.get(coluna) is None, l.get(coluna) or ""),
+                reverse="desc" in mods,
+            )
+        return linhas
+
+    @staticmethod
+    def _pagina(linhas, params: dict, header_range):
+        inicio = int(params.get("offset", 0))
+        fim = None
+        if "limit" in params:
+            fim = inicio + int(params["limit"])
+        if header_range:
+            a, _, b = header_range.partition("-")
+            inicio, fim = int(a), int(b) + 1
+        return linhas[inicio:fim]
+
+    @staticmethod
+    def _projeta(linhas, select: str):
+        colunas = [c.strip() for c in select.split(",")]
+        if "*" in colunas:
+            return linhas
+        return [{c: l.get(c) for c in colunas} for l in linhas]
+
+
+@contextmanager
+def servir_asgi(app, porta: int, lifespan: str = "off"):
+    """Sobe uma aplicação ASGI em uma thread com uvicorn e retorna a URL base"""
+    config = uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning", lifespan=lifespan)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{porta}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def servir_stub(stub: PostgrestStub, porta: int = 54321):
+    """Sobe o stub em uma thread com uvicorn e retorna a URL base"""
+    return servir_asgi(stub.app, porta)
+
+
+def _rodar_stub(porta: int, latencia: float, vendas: int, dias: int) -> None:
+    stub = PostgrestStub(latencia=latencia)
+    stub.seed_produtos()
+    stub.seed_vendas(vendas, dias=dias)
+    uvicorn.run(stub.app, host="127.0.0.1", port=porta, log_level="warning", lifespan="off")
+
+
+@contextmanager
+def servir_stub_processo(porta: int = 54321, latencia: float = 0.0, vendas: int = 0, dias: int = 365):
+    """
+    Sobe o stub em um processo separado, para que o custo de CPU do stub
+    não dispute o GIL com a aplicação medida.
+    """
+    processo = multiprocessing.Process(target=_rodar_stub, args=(porta, latencia, vendas, dias), daemon=True)
+    processo.start()
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        while True:
+            try:
+                httpx.get(f"{url}/rest/v1/produtos?limit=1", timeout=latencia + 1)
+                break
+            except httpx.TransportError:
+                if not processo.is_alive():
+                    raise RuntimeError(f"Stub terminou durante a carga (código {processo.exitcode})")
+                time.sleep(0.05)
+        yield url
+    finally:
+        processo.terminate()
+        processo.join()
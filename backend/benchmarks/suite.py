@@ -0,0 +1,316 @@
+"""
+Suíte de benchmarks reproduzível: sobe o stub PostgREST em um processo
+separado com N vendas sintéticas (10k, 100k e 1M por padrão), roda a
+aplicação FastAPI em processo contra ele e exercita os endpoints de
+/vendas, /produtos e /analytics.
+
+Cada escala roda em um subprocesso próprio, para que o pico de memória
+(RSS) de uma não contamine a seguinte. Por endpoint são reportados
+throughput, percentis de latência, tamanho da resposta, o tempo gasto no
+banco (do cabeçalho Server-Timing) e o pico de alocações Python de uma
+requisição (tracemalloc, medido fora das rodadas cronometradas). Nas
+respostas em streaming (ndjson, exportação) o Server-Timing só cobre o
+que aconteceu antes do primeiro byte.
+
+O cache de analytics fica desligado por padrão, para medir o trabalho de
+cada requisição; use --com-cache para medir o caminho quente. O relatório
+JSON traz o commit e o ambiente, para comparar execuções entre commits
+com benchmarks.comparar.
+
+Uso (a partir de backend/):
+    python -m benchmarks.suite --saida resultados.json
+    python -m benchmarks.suite --escalas 10000 --grupos vendas --segundos 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+from .common import configurar_ambiente, imprimir, percentil, resumo_latencias
+from .postgrest_stub import ITENS, STUB_KEY, servir_stub_processo
+
+ESCALAS = (10000, 100000, 1000000)
+GRUPOS = ("vendas", "produtos", "analytics")
+
+# Vendas espalhadas pelo último ano, como em uma cantina em uso
+DIAS = 365
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) chamadas, (\d+) linhas"')
+
+
+class Endpoint:
+    """Uma requisição da suíte; `corpo(i)` gera o corpo da i-ésima chamada"""
+
+    def __init__(self, grupo: str, nome: str, metodo: str, caminho: str, corpo=None, escrita: bool = False):
+        self.grupo = grupo
+        self.nome = nome
+        self.metodo = metodo
+        self.caminho = caminho
+        self.corpo = corpo
+        self.escrita = escrita
+
+    async def chamar(self, client: httpx.AsyncClient, i: int) -> httpx.Response:
+        corpo = self.corpo(i) if self.corpo else None
+        return await client.request(self.metodo, self.caminho, json=corpo)
+
+
+def _venda(i: int) -> dict:
+    nome, _, preco = ITENS[i % len(ITENS)]
+    return {"data": date.today().isoformat(), "item": nome, "preco": preco, "quantidade": 1 + i % 3}
+
+
+def _endpoints(produto_id: str, venda_id: str):
+    hoje = date.today()
+    mes = hoje.strftime("%Y-%m")
+    trinta_dias = (hoje - timedelta(days=29)).isoformat()
+    ano = (hoje - timedelta(days=DIAS - 1)).isoformat()
+    periodo_mes = f"data_inicio={trinta_dias}&data_fim={hoje.isoformat()}"
+    periodo_ano = f"data_inicio={ano}&data_fim={hoje.isoformat()}"
+    importacao = [
+        {"nome": f"Importado {i}", "categoria": f"Categoria {i % 12}", "preco_padrao": 4.5}
+        for i in range(200)
+    ]
+
+    # Leituras primeiro: as escritas mudam os dados (e o índice do stub)
+    return [
+        Endpoint("vendas", "listar_dia", "GET", f"/api/v1/vendas?data_filtro={hoje.isoformat()}"),
+        Endpoint("vendas", "listar_mes", "GET", f"/api/v1/vendas/mes/{mes}"),
+        Endpoint("vendas", "listar_mes_ndjson", "GET", f"/api/v1/vendas/mes/{mes}?formato=ndjson"),
+        Endpoint("vendas", "total_dia", "GET", f"/api/v1/vendas/total/dia/{hoje.isoformat()}"),
+        Endpoint("vendas", "total_mes", "GET", f"/api/v1/vendas/total/mes/{mes}"),
+        Endpoint("vendas", "exportar_csv_30_dias", "GET", f"/api/v1/vendas/export?inicio={trinta_dias}&fim={hoje.isoformat()}"),
+        Endpoint("produtos", "listar", "GET", "/api/v1/produtos"),
+        Endpoint("produtos", "obter", "GET", f"/api/v1/produtos/{produto_id}"),
+        Endpoint("produtos", "categorias", "GET", "/api/v1/produtos/categorias/listar"),
+        Endpoint("analytics", "mais_vendidos_30_dias", "GET", f"/api/v1/analytics/mais-vendidos?{periodo_mes}"),
+        Endpoint("analytics", "mais_vendidos_ano", "GET", f"/api/v1/analytics/mais-vendidos?{periodo_ano}"),
+        Endpoint("analytics", "faturamento_diario", "GET", f"/api/v1/analytics/faturamento-diario?mes_ano={mes}"),
+        Endpoint("analytics", "vendas_por_categoria", "GET", f"/api/v1/analytics/vendas-por-categoria?{periodo_mes}"),
+        Endpoint("analytics", "comparativo_mensal", "GET", "/api/v1/analytics/comparativo-mensal"),
+        Endpoint("analytics", "estatisticas_gerais", "GET", f"/api/v1/analytics/estatisticas-gerais?{periodo_ano}"),
+        Endpoint("analytics", "tendencia_semanal", "GET", f"/api/v1/analytics/tendencia-semanal?{periodo_ano}"),
+        Endpoint("analytics", "dashboard_ano", "GET", f"/api/v1/analytics/dashboard?{periodo_ano}"),
+        Endpoint("vendas", "criar", "POST", "/api/v1/vendas", _venda, escrita=True),
+        Endpoint("vendas", "criar_lote_100", "POST", "/api/v1/vendas/lote",
+                 lambda i: [_venda(i * 100 + j) for j in range(100)], escrita=True),
+        Endpoint("vendas", "atualizar", "PUT", f"/api/v1/vendas/{venda_id}",
+                 lambda i: {"quantidade": 1 + i % 5}, escrita=True),
+        Endpoint("produtos", "criar", "POST", "/api/v1/produtos",
+                 lambda i: {"nome": f"Produto Suíte {i}", "categoria": "suite", "preco_padrao": 3.5}, escrita=True),
+        Endpoint("produtos", "atualizar", "PUT", f"/api/v1/produtos/{produto_id}",
+                 lambda i: {"preco_padrao": 5 + i % 2}, escrita=True),
+        Endpoint("produtos", "importar_200", "POST", "/api/v1/produtos/importar",
+                 lambda i: importacao, escrita=True),
+    ]
+
+
+def _server_timing(resposta: httpx.Response):
+    encontrado = _SERVER_TIMING_DB.search(resposta.headers.get("server-timing", ""))
+    if not encontrado:
+        return None
+    return float(encontrado.group(1)), int(encontrado.group(2)), int(encontrado.group(3))
+
+
+async def _pico_python(client, endpoint: Endpoint, i: int) -> int:
+    """Pico de memória Python (KB) alocada durante uma requisição"""
+    tracemalloc.start()
+    try:
+        (await endpoint.chamar(client, i)).raise_for_status()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+async def _medir(client, endpoint: Endpoint, args) -> dict:
+    # Aquecimento (catálogo, pool de conexões) e validação da resposta
+    resposta = await endpoint.chamar(client, 0)
+    if resposta.status_code >= 400:
+        return {"erro": f"HTTP {resposta.status_code}: {resposta.text[:200]}"}
+    pico_python_kb = await _pico_python(client, endpoint, 1)
+
+    latencias, bytes_resposta, db_ms, db_chamadas, db_linhas = [], [], [], [], []
+    contador = iter(range(2, sys.maxsize))
+    inicio = time.perf_counter()
+
+    async def trabalhador():
+        while len(latencias) < args.max_requisicoes:
+            decorrido = time.perf_counter() - inicio
+            if decorrido >= args.segundos and len(latencias) >= args.min_requisicoes:
+                return
+            t0 = time.perf_counter()
+            resposta = await endpoint.chamar(client, next(contador))
+            latencias.append(time.perf_counter() - t0)
+            resposta.raise_for_status()
+            bytes_resposta.append(len(resposta.content))
+            timing = _server_timing(resposta)
+            if timing:
+                db_ms.append(timing[0])
+                db_chamadas.append(timing[1])
+                db_linhas.append(timing[2])
+
+    await asyncio.gather(*(trabalhador() for _ in range(args.concorrencia)))
+    resultado = resumo_latencias(latencias, time.perf_counter() - inicio)
+    resultado["p95_ms"] = round(percentil(latencias, 95) * 1000, 2)
+    resultado["bytes_resposta"] = round(sum(bytes_resposta) / len(bytes_resposta))
+    if db_ms:
+        resultado["db_ms_media"] = round(sum(db_ms) / len(db_ms), 2)
+        resultado["db_chamadas_media"] = round(sum(db_chamadas) / len(db_chamadas), 2)
+        resultado["db_linhas_media"] = round(sum(db_linhas) / len(db_linhas))
+    resultado["pico_python_kb"] = pico_python_kb
+    return resultado
+
+
+async def _executar_escala(args) -> dict:
+    from app.database import close_supabase_client
+    from app.main import app
+
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api", timeout=600) as client:
+        produtos = await client.get("/api/v1/produtos")
+        produtos.raise_for_status()
+        venda = await client.post("/api/v1/vendas", json=_venda(0))
+        venda.raise_for_status()
+
+        for endpoint in _endpoints(produtos.json()[0]["id"], venda.json()["id"]):
+            if endpoint.grupo not in args.grupos or (endpoint.escrita and args.somente_leitura):
+                continue
+            print(f"  {endpoint.grupo}/{endpoint.nome}", file=sys.stderr)
+            resultados[f"{endpoint.grupo}/{endpoint.nome}"] = await _medir(client, endpoint, args)
+    await close_supabase_client()
+    return resultados
+
+
+def _rss_mb() -> float:
+    # ru_maxrss em KB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _rodar_escala(args) -> dict:
+    """Executado no subprocesso de uma escala"""
+    inicio = time.perf_counter()
+    with servir_stub_processo(args.porta, args.latencia_ms / 1000, args.escala, DIAS) as url:
+        carga = time.perf_counter() - inicio
+        configurar_ambiente(url, STUB_KEY)
+        os.environ.setdefault("ANALYTICS_CACHE_TTL", "60" if args.com_cache else "0")
+        os.environ.setdefault("METRICAS_ATIVAS", "true")
+        import app.main  # noqa: F401 (memória base da aplicação)
+        rss_base = _rss_mb()
+        endpoints = asyncio.run(_executar_escala(args))
+
+    return {
+        "vendas": args.escala,
+        "carga_stub_segundos": round(carga, 1),
+        "rss_base_mb": rss_base,
+        "rss_pico_mb": _rss_mb(),
+        "endpoints": endpoints,
+    }
+
+
+def _commit() -> dict:
+    try:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=raiz, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        sujo = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--", "."], cwd=raiz, capture_output=True, text=True
+        ).stdout.strip())
+        return {"commit": commit, "alteracoes_locais": sujo}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "alteracoes_locais": None}
+
+
+def _metadados(args) -> dict:
+    try:
+        import numpy  # noqa: F401
+        numpy_versao = numpy.__version__
+    except ImportError:
+        numpy_versao = None
+    return {
+        **_commit(),
+        "data_hora": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy_versao,
+        "parametros": {
+            "segundos": args.segundos,
+            "min_requisicoes": args.min_requisicoes,
+            "max_requisicoes": args.max_requisicoes,
+            "concorrencia": args.concorrencia,
+            "latencia_stub_ms": args.latencia_ms,
+            "com_cache": args.com_cache,
+            "agregacao_sql": os.getenv("ANALYTICS_AGREGACAO_SQL", "true").lower() != "false",
+            "dias": DIAS,
+        },
+    }
+
+
+def _argumentos_escala(args, escala: int):
+    argumentos = [
+        sys.executable, "-m", "benchmarks.suite", "--escala", str(escala),
+        "--grupos", ",".join(args.grupos),
+        "--segundos", str(args.segundos),
+        "--min-requisicoes", str(args.min_requisicoes),
+        "--max-requisicoes", str(args.max_requisicoes),
+        "--concorrencia", str(args.concorrencia),
+        "--latencia-ms", str(args.latencia_ms),
+        "--porta", str(args.porta),
+    ]
+    if args.com_cache:
+        argumentos.append("--com-cache")
+    if args.somente_leitura:
+        argumentos.append("--somente-leitura")
+    return argumentos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", default=",".join(str(e) for e in ESCALAS), help="Quantidades de vendas")
+    parser.add_argument("--grupos", default=",".join(GRUPOS), help="vendas, produtos, analytics")
+    parser.add_argument("--segundos", type=float, default=3.0, help="Duração mínima de cada endpoint")
+    parser.add_argument("--min-requisicoes", type=int, default=5)
+    parser.add_argument("--max-requisicoes", type=int, default=500)
+    parser.add_argument("--concorrencia", type=int, default=1)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência simulada do stub")
+    parser.add_argument("--com-cache", action="store_true", help="Mantém o cache de analytics ligado")
+    parser.add_argument("--somente-leitura", action="store_true", help="Pula os endpoints de escrita")
+    parser.add_argument("--porta", type=int, default=54321)
+    parser.add_argument("--saida", help="Arquivo JSON do relatório (padrão: só stdout)")
+    parser.add_argument("--escala", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.grupos = [g for g in args.grupos.split(",") if g]
+
+    if args.escala is not None:
+        # Subprocesso de uma escala: JSON no stdout, progresso no stderr
+        print(json.dumps(_rodar_escala(args)))
+        return
+
+    escalas = {}
+    for escala in (int(e) for e in args.escalas.split(",")):
+        print(f"Escala {escala} vendas", file=sys.stderr)
+        processo = subprocess.run(_argumentos_escala(args, escala), stdout=subprocess.PIPE, text=True)
+        if processo.returncode != 0:
+            escalas[str(escala)] = {"erro": f"subprocesso terminou com código {processo.returncode}"}
+            continue
+        escalas[str(escala)] = json.loads(processo.stdout.strip().splitlines()[-1])
+
+    relatorio = {"benchmark": "suite", "metadados": _metadados(args), "escalas": escalas}
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    imprimir(relatorio)
+
+
+if __name__ == "__main__":
+    main()
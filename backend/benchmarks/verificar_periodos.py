@@ -0,0 +1,143 @@
+"""
+Verificação dos períodos (app.periodos) e das linhas lidas por endpoint.
+
+1. Limites: meses com 28/29/30/31 dias, virada de ano, N meses cruzando
+   anos, semanas de segunda a domingo e períodos invertidos.
+2. Linhas lidas x linhas usadas: com o stub e o caminho em Python (sem a
+   função SQL e sem cache), cada endpoint deve ler do banco exatamente as
+   vendas do período que ele responde, contadas a partir do Server-Timing
+   (db;desc="N chamadas, M linhas"); a listagem do mês lê também a linha
+   de versao_vendas que vira o ETag. No caminho SQL, o comparativo mensal
+   deve receber uma linha por mês retornado.
+
+Termina com AssertionError na primeira divergência.
+
+Uso (a partir de backend/):
+    python -m benchmarks.verificar_periodos --vendas 20000
+"""
+import argparse
+import asyncio
+import os
+import re
+from datetime import date, timedelta
+
+import httpx
+
+from .common import configurar_ambiente, imprimir
+from .postgrest_stub import STUB_KEY, PostgrestStub, servir_stub
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=[\d.]+;desc="(\d+) chamadas, (\d+) linhas"')
+
+
+def _verificar_limites() -> int:
+    from app import periodos
+
+    casos = [
+        (periodos.mes("2024-02").limites(), (date(2024, 2, 1), date(2024, 2, 29))),
+        (periodos.mes("2023-02").limites(), (date(2023, 2, 1), date(2023, 2, 28))),
+        (periodos.mes("2024-04").limites(), (date(2024, 4, 1), date(2024, 4, 30))),
+        (periodos.mes("2024-12").limites(), (date(2024, 12, 1), date(2024, 12, 31))),
+        (periodos.dia(date(2024, 12, 31)).fim_exclusivo, date(2025, 1, 1)),
+        (periodos.semana(date(2024, 1, 3)).limites(), (date(2024, 1, 1), date(2024, 1, 7))),
+        (periodos.semana(date(2024, 12, 29)).limites(), (date(2024, 12, 23), date(2024, 12, 29))),
+        (periodos.meses_ate(1, date(2024, 3, 15)).limites(), (date(2024, 3, 1), date(2024, 3, 15))),
+        (periodos.meses_ate(3, date(2024, 2, 29)).limites(), (date(2023, 12, 1), date(2024, 2, 29))),
+        (periodos.meses_ate(12, date(2024, 1, 31)).limites(), (date(2023, 2, 1), date(2024, 1, 31))),
+        (periodos.meses_ate(25, date(2024, 6, 10)).inicio, date(2022, 6, 1)),
+        (periodos.entre(date(2024, 1, 1), date(2024, 1, 1)).dias, 1),
+    ]
+    for obtido, esperado in casos:
+        assert obtido == esperado, f"{obtido} != {esperado}"
+
+    for invalido in ("2024-13", "2024-00", "2024-1", "24-01", ""):
+        try:
+            periodos.mes(invalido)
+        except ValueError:
+            continue
+        raise AssertionError(f"mes({invalido!r}) deveria falhar")
+    try:
+        periodos.entre(date(2024, 1, 2), date(2024, 1, 1))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("entre() com fim anterior ao início deveria falhar")
+    return len(casos)
+
+
+def _linhas(resposta: httpx.Response) -> int:
+    encontrado = _SERVER_TIMING_DB.search(resposta.headers.get("server-timing", ""))
+    assert encontrado, f"Sem Server-Timing em {resposta.request.url}"
+    return int(encontrado.group(2))
+
+
+async def _verificar_linhas(stub: PostgrestStub) -> dict:
+    from app import agregacoes, periodos
+    from app.database import close_supabase_client
+    from app.main import app
+
+    hoje = date.today()
+    mes_atual = hoje.strftime("%Y-%m")
+    mes_anterior = (hoje.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+    trinta_dias = periodos.entre(hoje - timedelta(days=29), hoje)
+
+    def vendas_no(periodo) -> int:
+        return sum(1 for v in stub.tabelas["vendas"] if periodo.contem(date.fromisoformat(v["data"])))
+
+    # (caminho, período, linhas lidas além das vendas)
+    casos = [
+        (f"/api/v1/vendas/mes/{mes_anterior}", periodos.mes(mes_anterior), 1),
+        (f"/api/v1/analytics/faturamento-diario?mes_ano={mes_atual}", periodos.mes(mes_atual), 0),
+        ("/api/v1/analytics/comparativo-mensal?quantidade_meses=3", periodos.meses_ate(3, hoje), 0),
+        ("/api/v1/analytics/comparativo-mensal?quantidade_meses=12", periodos.meses_ate(12, hoje), 0),
+        (f"/api/v1/analytics/mais-vendidos?data_inicio={trinta_dias.inicio}&data_fim={hoje}", trinta_dias, 0),
+        (f"/api/v1/analytics/estatisticas-gerais?data_inicio={trinta_dias.inicio}&data_fim={hoje}",
+         trinta_dias, 0),
+    ]
+
+    resultados = {}
+    async with httpx.AsyncClient(app=app, base_url="http://api") as client:
+        agregacoes.AGREGACAO_SQL = False
+        for caminho, periodo, extras in casos:
+            resposta = await client.get(caminho)
+            resposta.raise_for_status()
+            lidas, usadas = _linhas(resposta) - extras, vendas_no(periodo)
+            assert lidas == usadas, f"{caminho}: {lidas} linhas lidas, {usadas} no período"
+            resultados[caminho] = {"linhas_lidas": lidas, "vendas_no_periodo": usadas}
+
+        agregacoes.AGREGACAO_SQL = True
+        caminho = "/api/v1/analytics/comparativo-mensal?quantidade_meses=12"
+        resposta = await client.get(caminho)
+        resposta.raise_for_status()
+        meses = len(resposta.json())
+        assert _linhas(resposta) == meses, f"{caminho} (SQL): {_linhas(resposta)} linhas para {meses} meses"
+        resultados[f"{caminho} (SQL)"] = {"linhas_lidas": meses, "meses_retornados": meses}
+
+        resposta = await client.get(f"/api/v1/analytics/mais-vendidos?data_inicio={hoje}&data_fim={trinta_dias.inicio}")
+        assert resposta.status_code == 400, f"Período invertido retornou {resposta.status_code}"
+
+    await close_supabase_client()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=20000)
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+
+    stub = PostgrestStub()
+    stub.seed_produtos()
+    stub.seed_vendas(args.vendas, dias=args.dias)
+
+    casos_limites = _verificar_limites()
+    with servir_stub(stub, args.porta) as url:
+        configurar_ambiente(url, STUB_KEY)
+        os.environ["ANALYTICS_CACHE_TTL"] = "0"
+        resultados = asyncio.run(_verificar_linhas(stub))
+
+    imprimir({"verificacao": "periodos", "casos_de_limite": casos_limites, "endpoints": resultados})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+-- Esquema base da Cantina Escolar: tabelas produtos e vendas, a view
+-- vendas_completas e os índices das consultas da API.
+--
+-- Idempotente, como todas as migrations: pode rodar em um banco criado
+-- antes pelo painel do Supabase (nada é recriado se já existir).
+
+-- ==================== TABELAS ====================
+
+create table if not exists produtos (
+    id uuid primary key default gen_random_uuid(),
+    nome text not null,
+    categoria text,
+    preco_padrao numeric(10, 2) not null check (preco_padrao > 0),
+    ativo boolean not null default true,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create table if not exists vendas (
+    id uuid primary key default gen_random_uuid(),
+    data date not null,
+    item text not null,
+    preco numeric(10, 2) not null check (preco > 0),
+    quantidade integer default 1,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+
+-- Atualiza updated_at em qualquer UPDATE (a API não envia o campo)
+create or replace function definir_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists produtos_updated_at on produtos;
+create trigger produtos_updated_at
+    before update on produtos
+    for each row execute function definir_updated_at();
+
+drop trigger if exists vendas_updated_at on vendas;
+create trigger vendas_updated_at
+    before update on vendas
+    for each row execute function definir_updated_at();
+
+
+-- ==================== VIEW ====================
+
+-- Vendas com a categoria do produto (analytics por categoria e exportação)
+create or replace view vendas_completas as
+    select
+        v.id,
+        v.data,
+        v.item,
+        v.preco,
+        v.quantidade,
+        v.created_at,
+        v.updated_at,
+        p.categoria
+    from vendas v
+    left join produtos p on p.nome = v.item;
+
+
+-- ==================== ÍNDICES ====================
+
+-- Listagens por dia/mês ordenadas por created_at e a paginação por
+-- keyset (data, created_at, id) da listagem mensal e da exportação
+create index if not exists vendas_data_created_at_idx on vendas (data, created_at, id);
+
+-- Agrupamentos por item dentro de um período: coberto pelo prefixo de
+-- vendas_data_item_preco_idx (0004_quantidade_vendas.sql)
+
+-- Busca por nome em criar_produto e no JOIN de vendas_completas; o nome
+-- identifica o produto nas vendas, então é único
+create unique index if not exists produtos_nome_key on produtos (nome);
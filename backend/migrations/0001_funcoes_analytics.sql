@@ -0,0 +1,54 @@
+-- Agregação de vendas no banco para os endpoints de analytics.
+-- Exposta pelo PostgREST como POST /rest/v1/rpc/analytics_agrupar.
+--
+-- Retorna uma linha por chave da dimensão pedida:
+--   quantidade  = soma das unidades vendidas
+--   vendas      = número de linhas de venda
+--   faturamento = soma de preco * quantidade
+
+create or replace function analytics_agrupar(
+    p_inicio date,
+    p_fim date,
+    p_dimensao text
+)
+returns table (
+    chave text,
+    quantidade bigint,
+    vendas bigint,
+    faturamento numeric
+)
+language plpgsql
+stable
+as $$
+begin
+    if p_dimensao = 'categoria' then
+        return query
+            select
+                coalesce(v.categoria, 'Sem Categoria')::text,
+                sum(coalesce(v.quantidade, 1))::bigint,
+                count(*)::bigint,
+                sum(v.preco * coalesce(v.quantidade, 1))::numeric
+            from vendas_completas v
+            where v.data between p_inicio and p_fim
+            group by 1;
+    elsif p_dimensao in ('item', 'data', 'mes', 'dia_semana') then
+        return query
+            select
+                case p_dimensao
+                    when 'item' then v.item
+                    when 'data' then to_char(v.data, 'YYYY-MM-DD')
+                    when 'mes' then to_char(v.data, 'YYYY-MM')
+                    -- 0 = segunda-feira, como date.weekday() do Python
+                    else (extract(isodow from v.data)::int - 1)::text
+                end::text,
+                sum(coalesce(v.quantidade, 1))::bigint,
+                count(*)::bigint,
+                sum(v.preco * coalesce(v.quantidade, 1))::numeric
+            from vendas v
+            where v.data between p_inicio and p_fim
+            group by 1;
+    else
+        raise exception 'Dimensão inválida: %', p_dimensao;
+    end if;
+end;
+$$;
@@ -0,0 +1,167 @@
+-- Consolidação diária de vendas (data x item x categoria), mantida de forma
+-- incremental por triggers em vendas e produtos. Os totais e analytics leem
+-- desta tabela, então o custo cresce com o número de dias, não de vendas.
+
+create table if not exists vendas_diarias (
+    data date not null,
+    item text not null,
+    categoria text,
+    vendas bigint not null default 0,
+    quantidade bigint not null default 0,
+    faturamento numeric(14, 2) not null default 0,
+    primary key (data, item)
+);
+
+create index if not exists vendas_diarias_categoria_idx on vendas_diarias (data, categoria);
+
+
+-- Aplica um delta (+1 ou -1 venda) na linha consolidada de (data, item)
+create or replace function vendas_diarias_aplicar(
+    p_data date,
+    p_item text,
+    p_sinal integer,
+    p_quantidade integer,
+    p_preco numeric
+)
+returns void
+language plpgsql
+as $$
+begin
+    insert into vendas_diarias as vd (data, item, categoria, vendas, quantidade, faturamento)
+    values (
+        p_data,
+        p_item,
+        (select p.categoria from produtos p where p.nome = p_item limit 1),
+        p_sinal,
+        p_sinal * p_quantidade,
+        p_sinal * p_quantidade * p_preco
+    )
+    on conflict (data, item) do update set
+        vendas = vd.vendas + excluded.vendas,
+        quantidade = vd.quantidade + excluded.quantidade,
+        faturamento = vd.faturamento + excluded.faturamento;
+
+    delete from vendas_diarias
+    where data = p_data and item = p_item and vendas <= 0;
+end;
+$$;
+
+
+create or replace function vendas_diarias_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform vendas_diarias_aplicar(old.data, old.item, -1, coalesce(old.quantidade, 1), old.preco);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform vendas_diarias_aplicar(new.data, new.item, 1, coalesce(new.quantidade, 1), new.preco);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists vendas_diarias_sync on vendas;
+create trigger vendas_diarias_sync
+    after insert or update of data, item, preco, quantidade or delete on vendas
+    for each row execute function vendas_diarias_trigger();
+
+
+-- Mantém a categoria consolidada quando o produto muda de nome ou categoria
+create or replace function vendas_diarias_produto_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    update vendas_diarias set categoria = new.categoria where item = new.nome;
+    if new.nome is distinct from old.nome then
+        update vendas_diarias
+        set categoria = (select p.categoria from produtos p where p.nome = old.nome limit 1)
+        where item = old.nome;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists vendas_diarias_produto_sync on produtos;
+create trigger vendas_diarias_produto_sync
+    after insert or update of nome, categoria on produtos
+    for each row execute function vendas_diarias_produto_trigger();
+
+
+-- Reconstrói a consolidação a partir de vendas (backfill / correção).
+-- Sem parâmetros reconstrói tudo; retorna o número de linhas geradas.
+create or replace function vendas_diarias_reconstruir(
+    p_inicio date default null,
+    p_fim date default null
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_linhas bigint;
+begin
+    delete from vendas_diarias
+    where (p_inicio is null or data >= p_inicio)
+      and (p_fim is null or data <= p_fim);
+
+    insert into vendas_diarias (data, item, categoria, vendas, quantidade, faturamento)
+    select
+        v.data,
+        v.item,
+        (select p.categoria from produtos p where p.nome = v.item limit 1),
+        count(*),
+        sum(coalesce(v.quantidade, 1)),
+        sum(v.preco * coalesce(v.quantidade, 1))
+    from vendas v
+    where (p_inicio is null or v.data >= p_inicio)
+      and (p_fim is null or v.data <= p_fim)
+    group by v.data, v.item;
+
+    get diagnostics v_linhas = row_count;
+    return v_linhas;
+end;
+$$;
+
+
+-- analytics_agrupar passa a ler da consolidação diária
+create or replace function analytics_agrupar(
+    p_inicio date,
+    p_fim date,
+    p_dimensao text
+)
+returns table (
+    chave text,
+    quantidade bigint,
+    vendas bigint,
+    faturamento numeric
+)
+language plpgsql
+stable
+as $$
+begin
+    if p_dimensao not in ('item', 'data', 'mes', 'dia_semana', 'categoria') then
+        raise exception 'Dimensão inválida: %', p_dimensao;
+    end if;
+
+    return query
+        select
+            case p_dimensao
+                when 'item' then vd.item
+                when 'data' then to_char(vd.data, 'YYYY-MM-DD')
+                when 'mes' then to_char(vd.data, 'YYYY-MM')
+                when 'categoria' then coalesce(vd.categoria, 'Sem Categoria')
+                -- 0 = segunda-feira, como date.weekday() do Python
+                else (extract(isodow from vd.data)::int - 1)::text
+            end::text,
+            sum(vd.quantidade)::bigint,
+            sum(vd.vendas)::bigint,
+            sum(vd.faturamento)::numeric
+        from vendas_diarias vd
+        where vd.data between p_inicio and p_fim
+        group by 1;
+end;
+$$;
+
+select vendas_diarias_reconstruir();
@@ -0,0 +1,45 @@
+-- Agrupa a consolidação diária por várias dimensões em uma única chamada
+-- e uma única leitura de vendas_diarias (usada pelo dashboard). Cada linha
+-- do resultado traz a dimensão a que pertence.
+
+create or replace function analytics_agrupar_dimensoes(
+    p_inicio date,
+    p_fim date,
+    p_dimensoes text[]
+)
+returns table (
+    dimensao text,
+    chave text,
+    quantidade bigint,
+    vendas bigint,
+    faturamento numeric
+)
+language plpgsql
+stable
+as $$
+begin
+    if not p_dimensoes <@ array['item', 'data', 'mes', 'dia_semana', 'categoria'] then
+        raise exception 'Dimensão inválida: %', p_dimensoes;
+    end if;
+
+    return query
+        select
+            d.dimensao,
+            d.chave,
+            sum(vd.quantidade)::bigint,
+            sum(vd.vendas)::bigint,
+            sum(vd.faturamento)::numeric
+        from vendas_diarias vd
+        cross join lateral (values
+            ('item', vd.item),
+            ('data', to_char(vd.data, 'YYYY-MM-DD')),
+            ('mes', to_char(vd.data, 'YYYY-MM')),
+            -- 0 = segunda-feira, como date.weekday() do Python
+            ('dia_semana', (extract(isodow from vd.data)::int - 1)::text),
+            ('categoria', coalesce(vd.categoria, 'Sem Categoria'))
+        ) as d(dimensao, chave)
+        where vd.data between p_inicio and p_fim
+          and d.dimensao = any(p_dimensoes)
+        group by d.dimensao, d.chave;
+end;
+$$;
@@ -0,0 +1,50 @@
+-- Quantidade como parte do modelo de vendas: várias unidades do mesmo item
+-- e preço no mesmo dia são uma única linha com quantidade > 1.
+--
+-- 1. quantidade passa a ser obrigatória (padrão 1, sempre positiva)
+-- 2. índice (data, item, preco) para localizar linhas equivalentes
+-- 3. compacta as linhas duplicadas já existentes (mesmo dia, item e preço)
+--    em uma só, somando as quantidades; a linha mantida é a mais antiga
+
+alter table vendas add column if not exists quantidade integer;
+update vendas set quantidade = 1 where quantidade is null;
+alter table vendas alter column quantidade set default 1;
+alter table vendas alter column quantidade set not null;
+
+alter table vendas drop constraint if exists vendas_quantidade_positiva;
+alter table vendas add constraint vendas_quantidade_positiva check (quantidade > 0);
+
+create index if not exists vendas_data_item_preco_idx on vendas (data, item, preco);
+
+
+-- A compactação não muda faturamento nem unidades por dia; os triggers de
+-- vendas_diarias ficam desligados durante a operação e a consolidação é
+-- reconstruída no fim (a contagem de linhas por dia diminui).
+alter table vendas disable trigger vendas_diarias_sync;
+
+with grupos as (
+    select
+        id,
+        first_value(id) over w as manter,
+        sum(quantidade) over (partition by data, item, preco) as total
+    from vendas
+    window w as (partition by data, item, preco order by created_at, id)
+),
+atualizadas as (
+    update vendas v
+    set quantidade = g.total,
+        updated_at = now()
+    from grupos g
+    where v.id = g.id
+      and g.id = g.manter
+      and g.total <> v.quantidade
+    returning v.id
+)
+delete from vendas v
+using grupos g
+where v.id = g.id
+  and g.id <> g.manter;
+
+alter table vendas enable trigger vendas_diarias_sync;
+
+select vendas_diarias_reconstruir();
@@ -0,0 +1,174 @@
+-- Sincronização offline do balcão (POST /api/v1/sync).
+--
+-- O aparelho grava as vendas numa fila local e envia as operações em lote
+-- quando a rede volta. Cada venda tem id gerado pelo cliente (uuid) e cada
+-- operação traz o instante em que aconteceu no aparelho (alterado_em).
+-- Conflitos são resolvidos por "última escrita vence" sobre alterado_em:
+--
+--   vendas.alterado_em   versão da linha; edições fora da sincronização
+--                        (PUT /vendas) avançam para now() via trigger
+--   vendas_excluidas     lápide de cada venda excluída, para que uma
+--                        operação atrasada não ressuscite a venda;
+--                        excluido_em é o instante do servidor
+
+alter table vendas add column if not exists alterado_em timestamptz;
+update vendas set alterado_em = updated_at where alterado_em is null;
+alter table vendas alter column alterado_em set default now();
+alter table vendas alter column alterado_em set not null;
+
+create table if not exists vendas_excluidas (
+    id uuid primary key,
+    data date,
+    alterado_em timestamptz not null,
+    excluido_em timestamptz not null default now()
+);
+
+create index if not exists vendas_excluidas_excluido_em_idx on vendas_excluidas (excluido_em);
+
+
+-- UPDATE sem alterado_em explícito (edição pela API) vale como escrita agora
+create or replace function definir_alterado_em()
+returns trigger
+language plpgsql
+as $$
+begin
+    if new.alterado_em is not distinct from old.alterado_em then
+        new.alterado_em = now();
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists vendas_alterado_em on vendas;
+create trigger vendas_alterado_em
+    before update on vendas
+    for each row execute function definir_alterado_em();
+
+
+-- Toda exclusão (pela API ou pela sincronização) deixa uma lápide
+create or replace function vendas_excluidas_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into vendas_excluidas (id, data, alterado_em)
+    values (old.id, old.data, now())
+    on conflict (id) do update set
+        data = excluded.data,
+        alterado_em = excluded.alterado_em,
+        excluido_em = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists vendas_excluidas_sync on vendas;
+create trigger vendas_excluidas_sync
+    after delete on vendas
+    for each row execute function vendas_excluidas_trigger();
+
+
+-- Aplica um lote de operações em uma transação, na ordem recebida.
+-- Cada operação: {"op": "criar"|"atualizar"|"excluir", "id", "alterado_em",
+-- "venda": {data, item, preco, quantidade}} (em atualizar, só os campos
+-- alterados). Retorna uma linha por operação com o status (aplicada,
+-- ignorada ou nao_encontrada), a venda como ficou no banco (null se
+-- excluída) e as datas afetadas (para invalidar caches).
+create or replace function sincronizar_vendas(p_operacoes jsonb)
+returns table (posicao integer, status text, venda jsonb, datas date[])
+language plpgsql
+as $$
+declare
+    v_op jsonb;
+    v_id uuid;
+    v_em timestamptz;
+    v_dados jsonb;
+    v_linha vendas;
+    v_existe boolean;
+    v_lapide vendas_excluidas;
+begin
+    for v_op, posicao in
+        select o.valor, o.indice::integer
+        from jsonb_array_elements(p_operacoes) with ordinality as o(valor, indice)
+    loop
+        v_id := (v_op ->> 'id')::uuid;
+        v_em := (v_op ->> 'alterado_em')::timestamptz;
+        v_dados := coalesce(v_op -> 'venda', '{}'::jsonb);
+
+        select * into v_linha from vendas where id = v_id for update;
+        v_existe := found;
+        select * into v_lapide from vendas_excluidas where id = v_id;
+
+        status := 'ignorada';
+        venda := case when v_existe then to_jsonb(v_linha) end;
+        datas := '{}';
+
+        if v_op ->> 'op' = 'criar' then
+            if v_existe then
+                -- Reenvio da mesma criação ou versão mais nova no banco: nada a fazer
+                if v_linha.alterado_em < v_em then
+                    datas := array[v_linha.data];
+                    update vendas set
+                        data = (v_dados ->> 'data')::date,
+                        item = v_dados ->> 'item',
+                        preco = (v_dados ->> 'preco')::numeric,
+                        quantidade = coalesce((v_dados ->> 'quantidade')::integer, 1),
+                        alterado_em = v_em
+                    where id = v_id
+                    returning * into v_linha;
+                    status := 'aplicada';
+                    venda := to_jsonb(v_linha);
+                    datas := datas || v_linha.data;
+                end if;
+            elsif v_lapide.id is null or v_lapide.alterado_em < v_em then
+                insert into vendas (id, data, item, preco, quantidade, alterado_em)
+                values (
+                    v_id,
+                    (v_dados ->> 'data')::date,
+                    v_dados ->> 'item',
+                    (v_dados ->> 'preco')::numeric,
+                    coalesce((v_dados ->> 'quantidade')::integer, 1),
+                    v_em
+                )
+                returning * into v_linha;
+                delete from vendas_excluidas where id = v_id;
+                status := 'aplicada';
+                venda := to_jsonb(v_linha);
+                datas := array[v_linha.data];
+            end if;
+
+        elsif v_op ->> 'op' = 'atualizar' then
+            if not v_existe then
+                status := case when v_lapide.id is null then 'nao_encontrada' else 'ignorada' end;
+            elsif v_linha.alterado_em < v_em then
+                update vendas set
+                    item = coalesce(v_dados ->> 'item', item),
+                    preco = coalesce((v_dados ->> 'preco')::numeric, preco),
+                    quantidade = coalesce((v_dados ->> 'quantidade')::integer, quantidade),
+                    alterado_em = v_em
+                where id = v_id
+                returning * into v_linha;
+                status := 'aplicada';
+                venda := to_jsonb(v_linha);
+                datas := array[v_linha.data];
+            end if;
+
+        elsif v_op ->> 'op' = 'excluir' then
+            if not v_existe then
+                status := case when v_lapide.id is null then 'nao_encontrada' else 'ignorada' end;
+                -- Sem a venda (ainda): a lápide impede uma criação mais antiga atrasada
+                insert into vendas_excluidas (id, data, alterado_em)
+                values (v_id, null, v_em)
+                on conflict (id) do update set alterado_em = greatest(vendas_excluidas.alterado_em, excluded.alterado_em);
+            elsif v_linha.alterado_em <= v_em then
+                delete from vendas where id = v_id;
+                update vendas_excluidas set alterado_em = v_em where id = v_id;
+                status := 'aplicada';
+                venda := null;
+                datas := array[v_linha.data];
+            end if;
+        end if;
+
+        return next;
+    end loop;
+end;
+$$;
@@ -0,0 +1,52 @@
+-- Listagens incrementais de vendas (ETag e parâmetro desde em GET /vendas
+-- e GET /vendas/mes/{mes_ano}).
+--
+--   versao_vendas        contagem e instantes da última alteração e da
+--                        última exclusão de um período: muda a cada escrita
+--                        que afeta o período e vira o ETag da listagem, sem
+--                        ler as linhas
+--   vendas_excluidas     (0005) também recebe a venda que muda de data, como
+--                        lápide do dia antigo
+
+create index if not exists vendas_excluidas_data_idx on vendas_excluidas (data, excluido_em);
+
+
+-- Venda movida para outra data (sincronização): sai da listagem do dia
+-- antigo como uma exclusão
+create or replace function vendas_mudanca_data_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into vendas_excluidas (id, data, alterado_em)
+    values (old.id, old.data, now())
+    on conflict (id) do update set
+        data = excluded.data,
+        excluido_em = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists vendas_mudanca_data on vendas;
+create trigger vendas_mudanca_data
+    after update of data on vendas
+    for each row
+    when (old.data is distinct from new.data)
+    execute function vendas_mudanca_data_trigger();
+
+
+create or replace function versao_vendas(p_inicio date, p_fim date)
+returns table (linhas bigint, alterado_em timestamptz, excluido_em timestamptz)
+language sql
+stable
+as $$
+    select
+        v.linhas,
+        v.alterado_em,
+        (select max(e.excluido_em) from vendas_excluidas e where e.data between p_inicio and p_fim)
+    from (
+        select count(*) as linhas, max(updated_at) as alterado_em
+        from vendas
+        where data between p_inicio and p_fim
+    ) v;
+$$;